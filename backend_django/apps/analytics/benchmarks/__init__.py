@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for the analytics request paths.
+
+Runs the pivot, trends, overview and significance paths and rollup SQL
+generation against a local DuckDB stand-in for BigQuery loaded with
+synthetic data (no network or GCP access). See the run_benchmarks
+management command.
+"""
@@ -0,0 +1,207 @@
+"""
+Synthetic search-analytics dataset and the ORM fixtures that describe it.
+
+The generated table has the shape of the production search tables: one row
+per (date, country, channel, device, search_term) with event counts. The
+fixtures create the BigQueryTable, its SchemaConfig (dimensions, volume and
+conversion metrics through MetricService, like the schema editor does) and
+a few rollups. Rollup tables are built with RollupService.generate_create_sql
+on the local engine, so the rollup SQL generation is exercised as well.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .local_bigquery import LocalBigQueryClient
+
+PROJECT_ID = 'benchmark-project'
+DATASET = 'search'
+TABLE_NAME = 'search_daily'
+
+COUNTRIES = ['US', 'GB', 'DE', 'FR', 'ES', 'IT', 'BR', 'MX', 'JP', 'IN']
+CHANNELS = ['web', 'app', 'email', 'ads']
+DEVICES = ['desktop', 'mobile', 'tablet']
+
+# (dimension_id, data_type)
+DIMENSIONS = [
+    ('date', 'DATE'),
+    ('country', 'STRING'),
+    ('channel', 'STRING'),
+    ('device', 'STRING'),
+    ('search_term', 'STRING'),
+    ('n_words', 'INTEGER'),
+]
+
+# (metric_id, display name, formula, format_type, category)
+METRICS = [
+    ('queries', 'Queries', 'SUM(queries)', 'number', 'volume'),
+    ('queries_pdp', 'Queries with PDP', 'SUM(queries_pdp)', 'number', 'volume'),
+    ('queries_a2c', 'Queries with A2C', 'SUM(queries_a2c)', 'number', 'volume'),
+    ('purchases', 'Purchases', 'SUM(purchases)', 'number', 'volume'),
+    ('revenue', 'Revenue', 'SUM(revenue)', 'currency', 'volume'),
+    ('ctr', 'CTR', '{queries_pdp} / {queries}', 'percent', 'conversion'),
+    ('a2c_rate', 'A2C Rate', '{queries_a2c} / {queries}', 'percent', 'conversion'),
+    ('conversion_rate', 'Conversion Rate', '{purchases} / {queries}', 'percent', 'conversion'),
+    ('revenue_per_query', 'Revenue per Query', '{revenue} / {queries}', 'currency', 'revenue'),
+]
+
+# (rollup_id, dimensions)
+ROLLUPS = [
+    ('by_date', ['date']),
+    ('by_date_country_channel', ['date', 'country', 'channel']),
+    ('by_date_country_channel_device', ['date', 'country', 'channel', 'device']),
+]
+
+
+@dataclass
+class DatasetSize:
+    """Size of the synthetic table: days x countries x channels x devices x terms (sparse)."""
+    days: int = 90
+    search_terms: int = 2000
+    density: float = 0.05  # Fraction of (date, country, channel, device, term) cells with traffic
+    seed: int = 42
+
+    @property
+    def end_date(self) -> date:
+        return date(2026, 1, 1) + timedelta(days=self.days - 1)
+
+    @property
+    def start_date(self) -> date:
+        return date(2026, 1, 1)
+
+
+def generate_search_data(size: DatasetSize) -> pd.DataFrame:
+    """Generate the raw table: Zipf-distributed term traffic with a funnel of events."""
+    rng = np.random.default_rng(size.seed)
+
+    terms = np.array([f"term {i}" for i in range(size.search_terms)])
+    term_words = rng.integers(1, 6, size.search_terms)
+    term_weight = 1.0 / np.arange(1, size.search_terms + 1) ** 1.1
+
+    cells = size.days * len(COUNTRIES) * len(CHANNELS) * len(DEVICES) * size.search_terms
+    n_rows = max(int(cells * size.density), 1)
+
+    term_index = rng.choice(size.search_terms, n_rows, p=term_weight / term_weight.sum())
+    dates = np.array([size.start_date + timedelta(days=i) for i in range(size.days)])
+
+    queries = rng.poisson(50 * term_weight[term_index] / term_weight[0] + 1) + 1
+    queries_pdp = rng.binomial(queries, 0.45)
+    queries_a2c = rng.binomial(queries_pdp, 0.2)
+    purchases = rng.binomial(queries_a2c, 0.35)
+
+    return pd.DataFrame({
+        'date': dates[rng.integers(0, size.days, n_rows)],
+        'country': rng.choice(COUNTRIES, n_rows),
+        'channel': rng.choice(CHANNELS, n_rows),
+        'device': rng.choice(DEVICES, n_rows),
+        'search_term': terms[term_index],
+        'n_words': term_words[term_index],
+        'queries': queries,
+        'queries_pdp': queries_pdp,
+        'queries_a2c': queries_a2c,
+        'purchases': purchases,
+        'revenue': np.round(purchases * rng.gamma(2.0, 25.0, n_rows), 2),
+    })
+
+
+def create_fixtures(
+    client: LocalBigQueryClient,
+    size: DatasetSize,
+    mirror_rollups: bool = False
+) -> Tuple[object, Dict[str, int]]:
+    """
+    Load the synthetic table into the local engine and create its ORM configuration.
+
+    With mirror_rollups, rollups are also published as local Parquet mirrors
+    (rollup_mirror.py), so routed rollup queries run on the local_rollups engine.
+
+    Returns:
+        (BigQueryTable, {'rows': raw rows, '<rollup_id>_rows': rollup rows, ...})
+    """
+    from apps.analytics.services.rollup_mirror import get_rollup_mirror
+    from apps.rollups.models import Rollup, RollupConfig, RollupStatus
+    from apps.rollups.services import RollupService
+    from apps.schemas.models import Dimension, SchemaConfig
+    from apps.schemas.services.metric_service import MetricService
+    from apps.tables.models import BigQueryTable
+    from apps.users.models import User
+
+    data = generate_search_data(size)
+
+    owner = User.objects.create_user(email='benchmark@example.com', name='Benchmark')
+    table = BigQueryTable.objects.create(
+        owner=owner,
+        name='Benchmark search table',
+        project_id=PROJECT_ID,
+        dataset=DATASET,
+        table_name=TABLE_NAME,
+    )
+    client.load_table(table.full_table_path, data)
+
+    schema_config = SchemaConfig.objects.create(
+        bigquery_table=table,
+        primary_sort_metric='queries',
+        avg_per_day_metric='queries',
+    )
+    filter_types = {'DATE': 'date_range', 'INTEGER': 'range'}
+    Dimension.objects.bulk_create([
+        Dimension(
+            schema_config=schema_config,
+            dimension_id=dimension_id,
+            column_name=dimension_id,
+            display_name=dimension_id.replace('_', ' ').title(),
+            data_type=data_type,
+            filter_type=filter_types.get(data_type, 'multi'),
+            sort_order=index,
+        )
+        for index, (dimension_id, data_type) in enumerate(DIMENSIONS)
+    ])
+
+    metric_service = MetricService(schema_config)
+    for index, (metric_id, display_name, formula, format_type, category) in enumerate(METRICS):
+        metric_service.create_metric(
+            display_name=display_name,
+            formula=formula,
+            metric_id=metric_id,
+            format_type=format_type,
+            category=category,
+            sort_order=index,
+        )
+
+    RollupConfig.objects.create(bigquery_table=table, default_project=PROJECT_ID, default_dataset=DATASET)
+    rollup_service = RollupService(client, table)
+    stats = {'rows': len(data)}
+    for rollup_id, dimensions in ROLLUPS:
+        rollup = Rollup.objects.create(
+            bigquery_table=table,
+            name=rollup_id,
+            rollup_id=rollup_id,
+            rollup_table=f"rollup_{rollup_id}",
+            dimensions=dimensions,
+            metrics=[m[0] for m in METRICS if m[4] == 'volume'],
+            status=RollupStatus.PENDING,
+        )
+        sql, target_path = rollup_service.generate_create_sql(rollup, schema_config)
+        client.query(sql).result()
+        rollup_table = client.get_table(target_path)
+        rollup.min_date = size.start_date
+        rollup.max_date = size.end_date
+        rollup.save(update_fields=['min_date', 'max_date'])
+        rollup.mark_ready(row_count=rollup_table.num_rows, size_bytes=rollup_table.num_bytes)
+        stats[f"{rollup_id}_rows"] = rollup_table.num_rows
+        if mirror_rollups:
+            get_rollup_mirror().publish(rollup, client)
+
+    return table, stats
+
+
+def top_values(client: LocalBigQueryClient, table_path: str, column: str, count: int) -> List[str]:
+    """Most frequent values of a column (for filters and significance columns)."""
+    rows = client.query(
+        f"SELECT {column} AS value FROM `{table_path}` GROUP BY {column} "
+        f"ORDER BY SUM(queries) DESC LIMIT {count}"
+    ).result()
+    return [str(row.value) for row in rows]
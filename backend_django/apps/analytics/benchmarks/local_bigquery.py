@@ -0,0 +1,209 @@
+"""
+Local stand-in for the BigQuery client, backed by DuckDB.
+
+LocalBigQueryClient implements the part of google.cloud.bigquery.Client the
+services use (query, get_table, delete_table, cancel_job) and runs the SQL
+in an in-process DuckDB database after translating BigQuery-only syntax
+(query_engines.to_duckdb_sql, shared with the local rollup engine). Jobs
+expose the QueryJob attributes read by BigQueryService (result,
+to_dataframe, to_arrow, byte counts, timestamps).
+
+Tables are registered under their full BigQuery path ("project.dataset.table")
+so generated SQL runs unchanged apart from the dialect rewrite. Every job is
+counted, which the benchmark runner reports per scenario.
+"""
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+from google.cloud.exceptions import NotFound
+
+from apps.analytics.services.query_engines import (
+    DUCKDB_MACROS,
+    normalize_duckdb_result,
+    referenced_tables,
+    to_duckdb_sql,
+)
+
+
+class LocalRow:
+    """Result row with attribute and key access, like bigquery.Row."""
+
+    def __init__(self, values: Dict[str, Any]):
+        self._values = values
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._values.values())[key]
+        return self._values[key]
+
+    def keys(self):
+        return self._values.keys()
+
+    def items(self):
+        return self._values.items()
+
+
+class LocalRowIterator:
+    """Completed query result (the RowIterator returned by QueryJob.result())."""
+
+    def __init__(self, table: pa.Table, page_size: Optional[int] = None):
+        self._table = table
+        self.page_size = page_size or 10000
+        self.total_rows = table.num_rows
+
+    def __iter__(self) -> Iterator[LocalRow]:
+        for row in self._table.to_pylist():
+            yield LocalRow(row)
+
+    def to_arrow(self, bqstorage_client=None, create_bqstorage_client: bool = True, **kwargs) -> pa.Table:
+        return self._table
+
+    def to_dataframe(self, bqstorage_client=None, create_bqstorage_client: bool = True, **kwargs) -> pd.DataFrame:
+        return self._table.to_pandas()
+
+    def to_arrow_iterable(self, bqstorage_client=None, **kwargs) -> Iterator[pa.RecordBatch]:
+        yield from self._table.to_batches(max_chunksize=self.page_size)
+
+
+class LocalQueryJob:
+    """A query that has already run locally (synchronously)."""
+
+    location = 'local'
+
+    def __init__(self, client: 'LocalBigQueryClient', query: str, dry_run: bool = False):
+        self.job_id = f"local_{uuid.uuid4().hex}"
+        self.query = query
+        self.created = datetime.now(timezone.utc)
+        self.started = self.created
+        self.error_result = None
+        self.total_bytes_processed = client.estimate_bytes(query)
+        self.total_bytes_billed = 0 if dry_run else self.total_bytes_processed
+        self._result = None if dry_run else client.execute(query)
+        self.ended = datetime.now(timezone.utc)
+
+    def result(self, page_size: Optional[int] = None, **kwargs) -> LocalRowIterator:
+        return LocalRowIterator(self._result, page_size)
+
+    def to_arrow(self, **kwargs) -> pa.Table:
+        return self.result().to_arrow(**kwargs)
+
+    def to_dataframe(self, **kwargs) -> pd.DataFrame:
+        return self.result().to_dataframe(**kwargs)
+
+    def cancel(self) -> bool:
+        return False  # Local jobs finish before query() returns
+
+
+class LocalTable:
+    """Table metadata (the bigquery.Table fields the services read)."""
+
+    def __init__(self, table_id: str, num_rows: int, num_bytes: int, schema: List['LocalField']):
+        self.table_id = table_id
+        self.num_rows = num_rows
+        self.num_bytes = num_bytes
+        self.schema = schema
+
+
+class LocalField:
+    def __init__(self, name: str, field_type: str):
+        self.name = name
+        self.field_type = field_type
+
+
+class LocalBigQueryClient:
+    """In-process DuckDB database answering BigQuery queries."""
+
+    def __init__(self):
+        import duckdb
+
+        self._connection = duckdb.connect(database=':memory:')
+        for macro in DUCKDB_MACROS:
+            self._connection.execute(macro)
+        self._lock = threading.Lock()
+        self.job_count = 0
+        self.dry_run_count = 0
+        self.bytes_processed = 0
+
+    def load_table(self, table_path: str, data: pd.DataFrame) -> None:
+        """Create (or replace) a table from a DataFrame under its BigQuery path."""
+        # Through Arrow so that datetime.date columns load as DATE
+        arrow_table = pa.Table.from_pandas(data, preserve_index=False)
+        with self._lock:
+            self._connection.register('_load_frame', arrow_table)
+            self._connection.execute(f'CREATE OR REPLACE TABLE "{table_path}" AS SELECT * FROM _load_frame')
+            self._connection.unregister('_load_frame')
+
+    def execute(self, query: str) -> pa.Table:
+        # DuckDB connections are not safe for concurrent use; the query pool runs several jobs at once
+        with self._lock:
+            return normalize_duckdb_result(self._connection.execute(to_duckdb_sql(query)).arrow())
+
+    def estimate_bytes(self, query: str) -> int:
+        """Size of every referenced table: a full-scan estimate like an unpruned dry run."""
+        total = 0
+        for table_path in referenced_tables(query):
+            try:
+                total += self.get_table(table_path).num_bytes
+            except NotFound:
+                continue
+        return total
+
+    def query(self, query: str, job_config=None, **kwargs) -> LocalQueryJob:
+        dry_run = bool(getattr(job_config, 'dry_run', False))
+        job = LocalQueryJob(self, query, dry_run=dry_run)
+        with self._lock:
+            if dry_run:
+                self.dry_run_count += 1
+            else:
+                self.job_count += 1
+                self.bytes_processed += job.total_bytes_processed
+        return job
+
+    def get_table(self, table_path: str) -> LocalTable:
+        with self._lock:
+            stats = self._connection.execute(
+                "SELECT estimated_size, column_count FROM duckdb_tables() WHERE table_name = ?",
+                [table_path]
+            ).fetchone()
+            if stats is None:
+                raise NotFound(f"Table {table_path} not found")
+            columns = self._connection.execute(f'DESCRIBE "{table_path}"').fetchall()
+
+        num_rows, column_count = stats
+        # Approximation: 8 bytes per value (BigQuery bills INT64/FLOAT64/DATE at 8 bytes)
+        return LocalTable(
+            table_path,
+            num_rows=num_rows,
+            num_bytes=num_rows * column_count * 8,
+            schema=[LocalField(name, field_type) for name, field_type, *_ in columns]
+        )
+
+    def delete_table(self, table_path: str, not_found_ok: bool = False) -> None:
+        with self._lock:
+            self._connection.execute(f'DROP TABLE IF EXISTS "{table_path}"')
+
+    def list_tables(self, dataset: str) -> List[LocalTable]:
+        with self._lock:
+            names = [row[0] for row in self._connection.execute('SHOW TABLES').fetchall()]
+        return [self.get_table(name) for name in names if name.startswith(f"{dataset}.")]
+
+    def cancel_job(self, job_id: str, location: Optional[str] = None, **kwargs) -> None:
+        return None
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'jobs': self.job_count,
+                'dry_runs': self.dry_run_count,
+                'bytes_processed': self.bytes_processed,
+            }
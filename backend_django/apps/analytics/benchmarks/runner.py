@@ -0,0 +1,169 @@
+"""
+Benchmark runner: repeated scenario runs, metrics and baselines.
+
+Each scenario is a callable run `iterations` times (after `warmup` runs that
+are not measured). Per scenario the runner reports:
+
+- latency percentiles (p50/p95/p99, mean, min, max) in ms
+- ORM queries per run (default database connection of the running thread)
+- memory high-water mark of one extra run (tracemalloc peak; allocations
+  tracked by Python, which includes NumPy/pandas buffers but not Arrow's)
+- BigQuery jobs and dry runs per run (counted by the local engine)
+
+Results can be saved as a JSON baseline and later runs compared against it:
+a scenario regresses when its p50 latency, queries or jobs per run grow by
+more than the threshold.
+"""
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .local_bigquery import LocalBigQueryClient
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[], Any]
+    description: str = ''
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    min_ms: float
+    max_ms: float
+    orm_queries: float
+    peak_memory_kb: float
+    bq_jobs: float
+    bq_dry_runs: float
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Regression:
+    scenario: str
+    measure: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return (self.current - self.baseline) / self.baseline if self.baseline else float('inf')
+
+
+class BenchmarkRunner:
+    """Runs scenarios against the local engine and collects their measures."""
+
+    def __init__(self, client: LocalBigQueryClient, iterations: int = 20, warmup: int = 2):
+        self.client = client
+        self.iterations = iterations
+        self.warmup = warmup
+
+    def run(self, scenario: Scenario) -> ScenarioResult:
+        errors = []
+        for _ in range(self.warmup):
+            self._run_once(scenario, errors)
+
+        latencies, queries, jobs, dry_runs = [], [], [], []
+        for _ in range(self.iterations):
+            before = self.client.counters()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                self._run_once(scenario, errors)
+                latencies.append((time.perf_counter() - start) * 1000)
+            after = self.client.counters()
+
+            queries.append(len(captured.captured_queries))
+            jobs.append(after['jobs'] - before['jobs'])
+            dry_runs.append(after['dry_runs'] - before['dry_runs'])
+
+        # Separate run: tracing allocations would inflate the timed runs
+        tracemalloc.start()
+        try:
+            self._run_once(scenario, errors)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        values = np.array(latencies)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return ScenarioResult(
+            name=scenario.name,
+            iterations=self.iterations,
+            p50_ms=round(float(p50), 2),
+            p95_ms=round(float(p95), 2),
+            p99_ms=round(float(p99), 2),
+            mean_ms=round(float(values.mean()), 2),
+            min_ms=round(float(values.min()), 2),
+            max_ms=round(float(values.max()), 2),
+            orm_queries=float(np.mean(queries)),
+            peak_memory_kb=round(peak / 1024, 1),
+            bq_jobs=float(np.mean(jobs)),
+            bq_dry_runs=float(np.mean(dry_runs)),
+            errors=sorted(set(errors)),
+        )
+
+    @staticmethod
+    def _run_once(scenario: Scenario, errors: List[str]) -> None:
+        try:
+            result = scenario.run()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return
+        # Services report failures as an error key rather than raising
+        if isinstance(result, dict) and result.get('error'):
+            errors.append(str(result['error']))
+
+
+def save_baseline(path: str, results: List[ScenarioResult], metadata: Dict[str, Any]) -> None:
+    with open(path, 'w') as f:
+        json.dump({'metadata': metadata, 'results': [asdict(r) for r in results]}, f, indent=2)
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, Any]]:
+    """Baseline results keyed by scenario name."""
+    with open(path) as f:
+        data = json.load(f)
+    return {result['name']: result for result in data.get('results', [])}
+
+
+# Measures compared against a baseline (lower is better for all)
+COMPARED_MEASURES = ('p50_ms', 'orm_queries', 'bq_jobs')
+
+
+def compare(
+    results: List[ScenarioResult],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float = 0.2,
+    measures: Optional[tuple] = None
+) -> List[Regression]:
+    """
+    Find measures that grew by more than threshold (a fraction) since the baseline.
+
+    Scenarios missing from the baseline are not compared.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        for measure in measures or COMPARED_MEASURES:
+            current = getattr(result, measure)
+            previous = base.get(measure)
+            if previous is None:
+                continue
+            if current > previous * (1 + threshold) and current - previous > 1e-9:
+                regressions.append(Regression(result.name, measure, previous, current))
+    return regressions
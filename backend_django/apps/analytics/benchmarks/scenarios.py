@@ -0,0 +1,110 @@
+"""
+Benchmark scenarios: the request paths that dominate dashboard latency.
+
+Each scenario builds its services the way a request does (a new DataService
+per run), so per-request ORM work (schema, routing) is measured too.
+"""
+from typing import Dict, List
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .dataset import DatasetSize, top_values
+from .local_bigquery import LocalBigQueryClient
+from .runner import Scenario
+
+
+def build_scenarios(client: LocalBigQueryClient, table, size: DatasetSize) -> List[Scenario]:
+    """All scenarios for the fixture table."""
+    from apps.analytics.services import DataService
+    from apps.analytics.views import SignificanceView
+    from apps.rollups.services import RollupService
+
+    user = table.owner
+    filters: Dict = {
+        'start_date': size.start_date.isoformat(),
+        'end_date': size.end_date.isoformat(),
+        'date_range_type': 'absolute',
+        'dimension_filters': {},
+    }
+    countries = top_values(client, table.full_table_path, 'country', 3)
+    filtered = {**filters, 'dimension_filters': {'country': countries[:1], 'channel': ['web']}}
+
+    def data_service() -> DataService:
+        return DataService(table, user)
+
+    def significance() -> Dict:
+        factory = APIRequestFactory()
+        request = factory.post(
+            f"/api/significance/?table_id={table.id}",
+            {
+                'control_column': {'column_index': 0, 'dimension_filters': {'country': countries[:1]}},
+                'treatment_columns': [
+                    {'column_index': index, 'dimension_filters': {'country': [country]}}
+                    for index, country in enumerate(countries[1:], start=1)
+                ],
+                'metric_ids': ['ctr', 'a2c_rate', 'conversion_rate'],
+                'filters': filters,
+            },
+            format='json'
+        )
+        force_authenticate(request, user=user)
+        response = SignificanceView.as_view()(request)
+        response.render()
+        if response.status_code >= 400:
+            return {'error': f"HTTP {response.status_code}: {response.data}"}
+        return response.data
+
+    def rollup_sql() -> List[str]:
+        from apps.rollups.models import Rollup
+
+        schema_config = table.schema_config
+        rollup_service = RollupService(client, table)
+        return [
+            rollup_service.generate_create_sql(rollup, schema_config)[0]
+            for rollup in Rollup.objects.filter(bigquery_table=table)
+        ]
+
+    return [
+        Scenario(
+            'pivot_country',
+            lambda: data_service().get_pivot_data(['country'], filters, limit=50),
+            'Pivot by one rollup dimension'
+        ),
+        Scenario(
+            'pivot_country_channel_filtered',
+            lambda: data_service().get_pivot_data(['country', 'channel'], filtered, limit=50),
+            'Pivot by two dimensions with dimension filters'
+        ),
+        Scenario(
+            'pivot_search_term_raw',
+            lambda: data_service().get_pivot_data(
+                ['search_term'], filters, limit=100, require_rollup=False
+            ),
+            'Pivot by a high-cardinality dimension on the raw table'
+        ),
+        Scenario(
+            'trends_daily',
+            lambda: data_service().get_trends_data(filters, granularity='daily'),
+            'Daily time series'
+        ),
+        Scenario(
+            'trends_weekly_filtered',
+            lambda: data_service().get_trends_data(filtered, granularity='weekly'),
+            'Weekly time series with dimension filters'
+        ),
+        Scenario(
+            'overview',
+            lambda: data_service().get_overview_metrics(filters),
+            'Overview KPI cards'
+        ),
+        Scenario(
+            'significance',
+            significance,
+            'SignificanceView: control vs treatment countries'
+        ),
+        Scenario(
+            'rollup_sql',
+            rollup_sql,
+            'Rollup CREATE SQL generation for every rollup (no execution)'
+        ),
+    ]
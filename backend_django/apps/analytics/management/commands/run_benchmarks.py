@@ -0,0 +1,192 @@
+"""
+Run the offline analytics benchmarks.
+
+Creates a throwaway test database (like the test runner), loads synthetic
+search data into a local DuckDB engine that stands in for BigQuery, and runs
+each scenario (apps/analytics/benchmarks/scenarios.py). Reports latency
+percentiles, ORM queries, memory high-water mark and BigQuery jobs per
+scenario; results can be saved as a baseline and compared on later runs.
+
+Requires the duckdb package and a PostgreSQL server (the schema uses
+PostgreSQL-only fields). The query cache is disabled unless --with-cache is
+given, so every run reaches the engine. Rollup queries run on the BigQuery
+stand-in unless --local-rollups mirrors the rollups to Parquet (in a
+temporary directory) for the local_rollups engine.
+
+    python manage.py run_benchmarks --days 90 --terms 2000 --save-baseline bench.json
+    python manage.py run_benchmarks --compare bench.json --threshold 0.2
+"""
+import platform
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = "Benchmark the analytics request paths against a local BigQuery stand-in."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Days of synthetic data")
+        parser.add_argument('--terms', type=int, default=2000, help="Distinct search terms")
+        parser.add_argument(
+            '--density', type=float, default=0.05,
+            help="Fraction of (date, country, channel, device, term) cells with traffic"
+        )
+        parser.add_argument('--iterations', type=int, default=20, help="Measured runs per scenario")
+        parser.add_argument('--warmup', type=int, default=2, help="Unmeasured runs per scenario")
+        parser.add_argument(
+            '--scenario', action='append', default=None,
+            help="Only run this scenario (repeatable)"
+        )
+        parser.add_argument('--with-cache', action='store_true', help="Keep the query cache enabled")
+        parser.add_argument(
+            '--local-rollups', action='store_true',
+            help="Mirror rollups to Parquet and serve them with the local_rollups engine"
+        )
+        parser.add_argument('--save-baseline', metavar='PATH', help="Write results to a JSON baseline")
+        parser.add_argument('--compare', metavar='PATH', help="Compare results with a JSON baseline")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Allowed growth over the baseline before a measure counts as a regression (fraction)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import duckdb  # noqa: F401
+        except ImportError:
+            raise CommandError("The benchmarks need the duckdb package (pip install duckdb)")
+
+        mirror_dir = tempfile.mkdtemp(prefix='benchmark-rollups-')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        try:
+            with override_settings(
+                QUERY_CACHE_ENABLED=options['with_cache'],
+                QUERY_COALESCING_ENABLED=options['with_cache'],
+                QUERY_ENGINES=['local_rollups', 'bigquery'] if options['local_rollups'] else ['bigquery'],
+                LOCAL_ROLLUP_DIR=mirror_dir,
+            ):
+                results, metadata = self._run(options)
+        finally:
+            self._close_other_connections()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=False)
+            shutil.rmtree(mirror_dir, ignore_errors=True)
+
+        self._report(results)
+
+        if options['save_baseline']:
+            from apps.analytics.benchmarks.runner import save_baseline
+
+            save_baseline(options['save_baseline'], results, metadata)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+
+        if options['compare']:
+            self._compare(results, options['compare'], options['threshold'])
+
+    def _run(self, options):
+        from apps.analytics.benchmarks.dataset import DatasetSize, create_fixtures
+        from apps.analytics.benchmarks.local_bigquery import LocalBigQueryClient
+        from apps.analytics.benchmarks.runner import BenchmarkRunner
+        from apps.analytics.benchmarks.scenarios import build_scenarios
+        from apps.analytics.services import query_engines, rollup_cube, rollup_index, rollup_mirror
+        from apps.analytics.services.bigquery_client_registry import get_client_registry
+        from apps.analytics.services.query_log_writer import get_query_log_writer
+
+        size = DatasetSize(days=options['days'], search_terms=options['terms'], density=options['density'])
+        client = LocalBigQueryClient()
+        registry = get_client_registry()
+
+        # Engines and the mirror are rebuilt under the overridden settings
+        with mock.patch.object(registry, 'get_client', return_value=client), \
+                mock.patch.object(registry, 'get_bqstorage_client', return_value=None), \
+                mock.patch.object(query_engines, '_query_engines', None), \
+                mock.patch.object(rollup_mirror, '_rollup_mirror', None), \
+                mock.patch.object(rollup_cube, '_rollup_cubes', None), \
+                mock.patch.object(rollup_index, '_rollup_indexes', None):
+            table, stats = create_fixtures(client, size, mirror_rollups=options['local_rollups'])
+            self.stdout.write(
+                f"Synthetic data: {size.days} days, {size.search_terms} terms, "
+                + ', '.join(f"{key}={value}" for key, value in stats.items())
+            )
+
+            scenarios = build_scenarios(client, table, size)
+            if options['scenario']:
+                unknown = set(options['scenario']) - {s.name for s in scenarios}
+                if unknown:
+                    raise CommandError(
+                        f"Unknown scenario(s) {sorted(unknown)}. "
+                        f"Available: {', '.join(s.name for s in scenarios)}"
+                    )
+                scenarios = [s for s in scenarios if s.name in options['scenario']]
+
+            runner = BenchmarkRunner(client, iterations=options['iterations'], warmup=options['warmup'])
+            results = []
+            for scenario in scenarios:
+                self.stdout.write(f"Running {scenario.name} ({scenario.description})...")
+                results.append(runner.run(scenario))
+
+            get_query_log_writer().flush()
+
+        metadata = {
+            'days': size.days,
+            'search_terms': size.search_terms,
+            'density': size.density,
+            'iterations': options['iterations'],
+            'with_cache': options['with_cache'],
+            'local_rollups': options['local_rollups'],
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            **stats,
+        }
+        return results, metadata
+
+    @staticmethod
+    def _close_other_connections():
+        """Disconnect background threads (e.g. the query log writer) from the test database."""
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+            )
+
+    def _report(self, results):
+        header = (
+            f"{'scenario':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'ORM q':>7} {'BQ jobs':>8} {'dry runs':>8} {'peak KB':>10}"
+        )
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for r in results:
+            self.stdout.write(
+                f"{r.name:<32} {r.p50_ms:>9.2f} {r.p95_ms:>9.2f} {r.p99_ms:>9.2f} "
+                f"{r.orm_queries:>7.1f} {r.bq_jobs:>8.1f} {r.bq_dry_runs:>8.1f} {r.peak_memory_kb:>10.1f}"
+            )
+        for r in results:
+            for error in r.errors:
+                self.stdout.write(self.style.WARNING(f"{r.name}: {error}"))
+
+    def _compare(self, results, path, threshold):
+        from apps.analytics.benchmarks.runner import compare, load_baseline
+
+        try:
+            baseline = load_baseline(path)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read baseline {path}: {e}")
+
+        regressions = compare(results, baseline, threshold)
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions above {threshold:.0%} against {path}"))
+            return
+
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(
+                f"{regression.scenario}: {regression.measure} {regression.baseline:g} -> "
+                f"{regression.current:g} ({regression.change:+.0%})"
+            ))
+        raise CommandError(f"{len(regressions)} regression(s) against {path}")
@@ -0,0 +1,172 @@
+"""
+Request middleware for the analytics API.
+
+ServerTimingMiddleware times each API request by stage (services/timing.py),
+reports the stages in the Server-Timing response header and feeds the
+rolling latency summary.
+
+Request id and disconnect handling for BigQuery job cancellation:
+
+QueryCancellationMiddleware tags each request with an id (the client's
+X-Request-ID header, or a generated one), so BigQuery jobs started while
+handling it can be cancelled by request (see services/query_job_registry.py).
+The id is echoed back in the X-Request-ID response header.
+
+With gunicorn sync workers the client socket is available in the WSGI
+environ; while the view runs, a watcher thread polls it and cancels the
+request's jobs as soon as the client disconnects (e.g. the tab was closed or
+the fetch aborted).
+"""
+
+import logging
+import re
+import select
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+
+from .services.query_job_registry import (
+    get_job_registry,
+    reset_current_request_id,
+    set_current_request_id,
+)
+from .services.timing import end_request_timings, get_latency_summary, start_request_timings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Client ids are stored on ActiveQueryJob rows: keep them short and plain
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+
+class _DisconnectWatcher(threading.Thread):
+    """Cancels a request's jobs when its client closes the connection."""
+
+    def __init__(self, sock: socket.socket, request, request_id: str, poll_seconds: float):
+        super().__init__(name=f"disconnect-{request_id[:8]}", daemon=True)
+        self.sock = sock
+        self.request = request
+        self.request_id = request_id
+        self.poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _disconnected(self) -> bool:
+        readable, _, _ = select.select([self.sock], [], [], 0)
+        if not readable:
+            return False
+        try:
+            # Readable with no data means EOF; unread body bytes are left in place
+            return self.sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+
+    def run(self) -> None:
+        try:
+            self._watch()
+        finally:
+            # cancel_request opens this thread's own database connection
+            connections.close_all()
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                if not self._disconnected():
+                    continue
+            except (OSError, ValueError):
+                return  # Socket closed under us: the response is done
+
+            if self._stopped.is_set():
+                return
+            logger.info(f"Client disconnected, cancelling queries for request {self.request_id}")
+            try:
+                # Request ids are client-supplied: only cancel this request's user's jobs.
+                # DRF sets the authenticated user on the underlying request.
+                get_job_registry().cancel_request(
+                    self.request_id, user=getattr(self.request, 'user', None)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to cancel queries for request {self.request_id}: {e}")
+            return
+
+
+class ServerTimingMiddleware:
+    """Records per-stage timings of API requests (Server-Timing header and latency summary)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.SERVER_TIMING_ENABLED
+
+    def __call__(self, request):
+        if not self.enabled or not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        timings, token = start_request_timings()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request_timings(token)
+        timings.record('total', (time.perf_counter() - start) * 1000)
+
+        response['Server-Timing'] = timings.header()
+
+        # Keyed by URL pattern so that path parameters don't split the summary;
+        # unresolved paths (404s) share one key so clients can't grow it
+        match = getattr(request, 'resolver_match', None)
+        endpoint = f"/{match.route}" if match is not None and match.route else '<unmatched>'
+        get_latency_summary().add(f"{request.method} {endpoint}", timings)
+        return response
+
+
+class QueryCancellationMiddleware:
+    """Assigns a request id to each request and cancels its queries on disconnect."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cancel_on_disconnect = settings.QUERY_CANCEL_ON_DISCONNECT
+        self.poll_seconds = settings.QUERY_DISCONNECT_POLL_SECONDS
+
+    @staticmethod
+    def _request_id(request) -> str:
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if _REQUEST_ID_RE.match(request_id):
+            return request_id
+        return uuid.uuid4().hex
+
+    def _start_watcher(self, request, request_id: str) -> Optional[_DisconnectWatcher]:
+        if not self.cancel_on_disconnect:
+            return None
+        sock = request.META.get('gunicorn.socket')
+        if sock is None:
+            return None  # runserver / other servers don't expose the socket
+
+        watcher = _DisconnectWatcher(sock, request, request_id, self.poll_seconds)
+        watcher.start()
+        return watcher
+
+    def __call__(self, request):
+        request_id = self._request_id(request)
+        request.request_id = request_id
+
+        token = set_current_request_id(request_id)
+        watcher = self._start_watcher(request, request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            if watcher is not None:
+                watcher.stop()
+            reset_current_request_id(token)
+
+        response[REQUEST_ID_HEADER] = request_id
+        return response
@@ -7,6 +7,8 @@ These are for FastAPI frontend compatibility - the frontend calls
 from django.urls import path
 from .views import (
     PivotView,
+    PivotBatchView,
+    PivotExportView,
     PivotChildrenView,
     DimensionValuesView
 )
@@ -15,6 +17,12 @@ urlpatterns = [
     # /api/pivot/ - Main pivot table endpoint
     path('pivot/', PivotView.as_view(), name='pivot'),
 
+    # /api/pivot/batch/ - All columns of a multi-column pivot in one scan
+    path('pivot/batch/', PivotBatchView.as_view(), name='pivot-batch'),
+
+    # /api/pivot/export/ - Stream every pivot group as CSV, NDJSON or Parquet
+    path('pivot/export/', PivotExportView.as_view(), name='pivot-export'),
+
     # /api/pivot/children/ - Get children for pivot rows
     path('pivot/children/', PivotChildrenView.as_view(), name='pivot-children-all'),
 
@@ -0,0 +1,17 @@
+"""
+API renderers.
+
+TimedJSONRenderer is DRF's JSONRenderer with rendering recorded as the
+'render' timing stage (services/timing.py).
+"""
+from rest_framework.renderers import JSONRenderer
+
+from .services.timing import timed
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSON renderer that records its time in the request's Server-Timing."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -54,6 +54,46 @@ class FilterParamsSerializer(serializers.Serializer):
     dimension_filters = serializers.DictField(required=False, default=dict)
 
 
+class PivotBatchRequestSerializer(serializers.Serializer):
+    """Request for all columns of a multi-column pivot."""
+    dimensions = serializers.ListField(
+        child=serializers.CharField(),
+        help_text="Row dimensions"
+    )
+    table_dimensions = serializers.ListField(
+        child=serializers.CharField(),
+        help_text="Dimensions that split the table into columns"
+    )
+    combinations = serializers.ListField(
+        child=serializers.DictField(child=serializers.CharField(allow_blank=True)),
+        help_text="Table-dimension values of each column (e.g., [{'country': 'USA'}])"
+    )
+    primary_index = serializers.IntegerField(
+        default=0,
+        help_text="Index of the column whose top rows define the rows of every column"
+    )
+    filters = FilterParamsSerializer(
+        help_text="Base filters (date range, etc.)"
+    )
+    limit = serializers.IntegerField(default=100, min_value=1)
+    custom_metrics = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
+    require_rollup = serializers.BooleanField(default=True)
+
+
+class PivotBatchResponseSerializer(serializers.Serializer):
+    """Serializer for multi-column pivot response."""
+    columns = PivotResponseSerializer(many=True, required=False, default=list)
+    available_dimensions = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        default=list
+    )
+    error = serializers.CharField(required=False, allow_null=True)
+    error_type = serializers.CharField(required=False, allow_null=True)
+    required_dimensions = serializers.ListField(child=serializers.CharField(), required=False)
+    available_rollups = serializers.ListField(required=False)
+
+
 # =============================================================================
 # Significance Testing Serializers
 # =============================================================================
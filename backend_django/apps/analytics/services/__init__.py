@@ -1,18 +1,51 @@
-from .bigquery_service import BigQueryService
+from .bigquery_service import BigQueryService, PivotResult
 from .data_service import DataService
 from .statistical_service import StatisticalService, SignificanceResult, ProportionSignificanceResult
 from .query_cache_service import QueryCacheService, get_query_cache
+from .query_coalescer import QueryCoalescer, get_query_coalescer
+from .query_budget import QueryBudgetService, get_query_budget
+from .query_job_registry import QueryJobRegistry, get_job_registry
+from .export_writers import EXPORT_FORMATS, encode_batches
+from .query_log_writer import QueryLogWriter, get_query_log_writer
+from .query_engines import BaseQueryEngine, get_query_engines
+from .rollup_cube import RollupCube, RollupCubeStore, get_rollup_cubes
+from .rollup_index import RollupIndex, RollupIndexStore, get_rollup_index
+from .rollup_mirror import RollupMirror, get_rollup_mirror
+from .timing import LatencySummary, get_latency_summary
 from .query_router_service import QueryRouterService, RouteDecision
 from .post_processing_service import PostProcessingService
 
 __all__ = [
     'BigQueryService',
+    'PivotResult',
     'DataService',
     'StatisticalService',
     'SignificanceResult',
     'ProportionSignificanceResult',
     'QueryCacheService',
     'get_query_cache',
+    'QueryCoalescer',
+    'get_query_coalescer',
+    'QueryBudgetService',
+    'get_query_budget',
+    'QueryJobRegistry',
+    'get_job_registry',
+    'EXPORT_FORMATS',
+    'encode_batches',
+    'QueryLogWriter',
+    'get_query_log_writer',
+    'BaseQueryEngine',
+    'get_query_engines',
+    'RollupCube',
+    'RollupCubeStore',
+    'get_rollup_cubes',
+    'RollupIndex',
+    'RollupIndexStore',
+    'get_rollup_index',
+    'RollupMirror',
+    'get_rollup_mirror',
+    'LatencySummary',
+    'get_latency_summary',
     'QueryRouterService',
     'RouteDecision',
     'PostProcessingService',
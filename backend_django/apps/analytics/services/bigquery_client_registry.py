@@ -0,0 +1,274 @@
+"""
+Process-wide registry of BigQuery clients.
+
+DataService/BigQueryService are created per request; building a new
+bigquery.Client each time repeats the OAuth credential lookup, token refresh
+and HTTP session/TLS setup. The registry keeps one client per
+(credential owner, billing project) and reuses its pooled HTTP session.
+
+- Tokens are refreshed proactively (before expiry) under a per-key lock, so
+  concurrent requests for the same user trigger a single refresh.
+- The refreshed token is written into the pooled client's credentials in
+  place, keeping its connection pool.
+- Clients idle for longer than BIGQUERY_CLIENT_IDLE_SECONDS are closed.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+import google.auth
+from django.conf import settings
+from django.utils import timezone
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from requests.adapters import HTTPAdapter
+from rest_framework.exceptions import AuthenticationFailed
+
+if TYPE_CHECKING:
+    from apps.users.models import User
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Tuple[str, str]
+
+
+class _ClientEntry:
+    """A pooled client and the credentials it was built with."""
+
+    def __init__(self, client: bigquery.Client, credentials, token_expiry=None):
+        self.client = client
+        self.credentials = credentials
+        self.token_expiry = token_expiry  # None for ADC (google-auth refreshes those itself)
+        self.last_used = time.monotonic()
+        self.bqstorage_client = None
+
+
+class BigQueryClientRegistry:
+    """Pools BigQuery clients per (user or ADC, billing project)."""
+
+    # How often the idle sweep runs (piggybacks on get_client calls)
+    SWEEP_INTERVAL_SECONDS = 60
+
+    # Same window GCPOAuthService.get_valid_credentials refreshes in
+    TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+    def __init__(self):
+        self.idle_seconds = settings.BIGQUERY_CLIENT_IDLE_SECONDS
+        self.pool_size = settings.BIGQUERY_HTTP_POOL_SIZE
+
+        self._lock = threading.Lock()
+        self._entries: Dict[ClientKey, _ClientEntry] = {}
+        self._key_locks: Dict[ClientKey, threading.Lock] = {}
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def _uses_oauth(user: Optional['User']) -> bool:
+        """Whether the user has OAuth tokens for BigQuery (in-memory check, no DB)."""
+        return bool(
+            user
+            and getattr(user, 'is_authenticated', False)
+            and user.has_bigquery_access()
+        )
+
+    def _key(self, user: Optional['User'], billing_project: str) -> ClientKey:
+        owner = f"user:{user.pk}" if self._uses_oauth(user) else 'adc'
+        return (owner, billing_project or '')
+
+    def _key_lock(self, key: ClientKey) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def _needs_refresh(self, entry: _ClientEntry) -> bool:
+        if entry.token_expiry is None:
+            return False
+        return entry.token_expiry <= timezone.now() + self.TOKEN_REFRESH_MARGIN
+
+    def get_client(self, user: Optional['User'], billing_project: str) -> bigquery.Client:
+        """
+        Get a pooled client for the user's OAuth credentials, falling back to
+        Application Default Credentials (ADC) if OAuth is not configured.
+
+        Raises:
+            AuthenticationFailed: If no credentials are available
+        """
+        self._sweep_idle()
+
+        key = self._key(user, billing_project)
+        entry = self._entries.get(key)
+        if entry is not None and not self._needs_refresh(entry):
+            entry.last_used = time.monotonic()
+            return entry.client
+
+        # Build or refresh under the key lock: one refresh per key at a time
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and not self._needs_refresh(entry):
+                entry.last_used = time.monotonic()
+                return entry.client
+
+            if key[0] == 'adc':
+                entry = self._build_adc_entry(billing_project)
+            elif entry is not None:
+                entry = self._refresh_oauth_entry(entry, user, billing_project)
+            else:
+                entry = self._build_oauth_entry(user, billing_project)
+
+            with self._lock:
+                self._entries[key] = entry
+            return entry.client
+
+    def get_bqstorage_client(self, user: Optional['User'], billing_project: str):
+        """
+        Get the pooled BigQuery Storage Read API client sharing the credentials
+        of get_client(user, billing_project).
+
+        Returns None if google-cloud-bigquery-storage is not installed.
+        """
+        try:
+            from google.cloud import bigquery_storage
+        except ImportError:
+            return None
+
+        self.get_client(user, billing_project)
+        entry = self._entries.get(self._key(user, billing_project))
+        if entry is None:
+            return None
+
+        if entry.bqstorage_client is None:
+            with self._key_lock(self._key(user, billing_project)):
+                if entry.bqstorage_client is None:
+                    entry.bqstorage_client = bigquery_storage.BigQueryReadClient(
+                        credentials=entry.credentials
+                    )
+        return entry.bqstorage_client
+
+    def invalidate(self, user: Optional['User'], billing_project: str) -> None:
+        """Drop the pooled client for a user/billing project (e.g. after re-authorization)."""
+        key = self._key(user, billing_project)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._close(entry)
+
+    def invalidate_user(self, user: 'User') -> None:
+        """Drop every pooled client built with a user's credentials."""
+        owner = f"user:{user.pk}"
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == owner]
+            entries = [self._entries.pop(key) for key in keys]
+        for entry in entries:
+            self._close(entry)
+
+    def _session(self, credentials) -> AuthorizedSession:
+        """Authorized HTTP session sized for concurrent queries on one client."""
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size
+        )
+        session.mount('https://', adapter)
+        return session
+
+    def _build_oauth_entry(self, user: 'User', billing_project: str) -> _ClientEntry:
+        from apps.users.gcp_oauth_service import GCPOAuthService
+
+        credentials = GCPOAuthService.get_valid_credentials(user)
+        if not credentials:
+            # Refresh failed and tokens were cleared: fall back like a user without OAuth
+            return self._build_adc_entry(billing_project)
+
+        client = bigquery.Client(
+            project=billing_project,
+            credentials=credentials,
+            _http=self._session(credentials)
+        )
+        logger.info(f"Using OAuth credentials for user {user.email}")
+        return _ClientEntry(client, credentials, user.gcp_token_expiry)
+
+    def _refresh_oauth_entry(
+        self,
+        entry: _ClientEntry,
+        user: 'User',
+        billing_project: str
+    ) -> _ClientEntry:
+        """Refresh the token of a pooled client in place, keeping its HTTP session."""
+        from apps.users.gcp_oauth_service import GCPOAuthService
+
+        credentials = GCPOAuthService.get_valid_credentials(user)
+        if not credentials:
+            self._close(entry)
+            return self._build_adc_entry(billing_project)
+
+        entry.credentials.token = credentials.token
+        entry.token_expiry = user.gcp_token_expiry
+        entry.last_used = time.monotonic()
+        logger.info(f"Refreshed pooled BigQuery client token for user {user.email}")
+        return entry
+
+    def _build_adc_entry(self, billing_project: str) -> _ClientEntry:
+        # Fall back to Application Default Credentials (gcloud CLI)
+        try:
+            credentials, _ = google.auth.default(scopes=bigquery.Client.SCOPE)
+            client = bigquery.Client(
+                project=billing_project,
+                credentials=credentials,
+                _http=self._session(credentials)
+            )
+            logger.info("Using Application Default Credentials (gcloud CLI)")
+            return _ClientEntry(client, credentials)
+        except Exception as e:
+            logger.error(f"Failed to create BigQuery client with ADC: {e}")
+            raise AuthenticationFailed(
+                "BigQuery access not available. Please run 'gcloud auth application-default login' "
+                "or authorize BigQuery access in Settings."
+            )
+
+    def _sweep_idle(self) -> None:
+        """Close clients that have not been used for idle_seconds."""
+        now = time.monotonic()
+        if now - self._last_sweep < self.SWEEP_INTERVAL_SECONDS:
+            return
+
+        with self._lock:
+            self._last_sweep = now
+            idle_keys = [
+                key for key, entry in self._entries.items()
+                if now - entry.last_used > self.idle_seconds
+            ]
+            idle_entries = [self._entries.pop(key) for key in idle_keys]
+            for key in idle_keys:
+                self._key_locks.pop(key, None)
+
+        for entry in idle_entries:
+            self._close(entry)
+
+        if idle_entries:
+            logger.info(f"Evicted {len(idle_entries)} idle BigQuery clients")
+
+    @staticmethod
+    def _close(entry: _ClientEntry) -> None:
+        try:
+            entry.client.close()
+            if entry.bqstorage_client is not None:
+                entry.bqstorage_client._transport.grpc_channel.close()
+        except Exception as e:
+            logger.warning(f"Failed to close BigQuery client: {e}")
+
+
+# Global instance
+_client_registry: Optional[BigQueryClientRegistry] = None
+
+
+def get_client_registry() -> BigQueryClientRegistry:
+    """Get the BigQuery client registry instance (singleton)."""
+    global _client_registry
+    if _client_registry is None:
+        _client_registry = BigQueryClientRegistry()
+    return _client_registry
@@ -6,25 +6,56 @@ This service uses per-user OAuth credentials for BigQuery access.
 Each user must authorize BigQuery access before querying data.
 """
 import logging
+import threading
 import time
-from typing import Optional, Dict, List, Tuple, Any, TYPE_CHECKING
+from dataclasses import dataclass
+from typing import Optional, Dict, Iterator, List, Tuple, Any, Union, TYPE_CHECKING
 from datetime import datetime, timedelta
 
+from django.conf import settings
 from google.cloud import bigquery
 from rest_framework.exceptions import AuthenticationFailed
 import pandas as pd
+import pyarrow as pa
 
+from apps.core.exceptions import BigQueryError
 from apps.tables.models import BigQueryTable
+from .bigquery_client_registry import get_client_registry
+from .query_budget import get_query_budget
+from .query_cache_service import QueryCacheService, get_query_cache
+from .query_coalescer import get_query_coalescer
+from .query_engines import get_query_engines
+from .query_job_registry import get_job_registry
+from .query_log_writer import get_query_log_writer
+from .timing import record as record_timing, timed, timed_stage
 
 if TYPE_CHECKING:
+    from apps.schemas.snapshot import SchemaSnapshot
     from apps.users.models import User
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class PivotResult:
+    """Pivot page with the grand totals and group count from the same scan."""
+    rows: pd.DataFrame
+    totals: Optional[pd.DataFrame] = None  # One-row DataFrame over all groups
+    total_count: Optional[int] = None  # Number of groups across all pages
+
+
 class BigQueryService:
     """Service for querying BigQuery data using per-user OAuth credentials."""
 
+    # Supported execute_query result formats
+    RESULT_FORMATS = ('pandas', 'arrow')
+
+    # Max SUM(IF(...)) columns per batched aggregate query (BigQuery allows 10,000)
+    MAX_AGGREGATE_COLUMNS = 5000
+
+    # Rows per result page when streaming without the Storage Read API
+    EXPORT_PAGE_SIZE = 10000
+
     def __init__(self, bigquery_table: BigQueryTable, user: 'User'):
         """
         Initialize BigQuery service with user's OAuth credentials.
@@ -54,8 +85,12 @@ class BigQueryService:
         # Initialize client (lazy-loaded)
         self._client = None
 
-        # Schema configuration (loaded lazily)
-        self._schema_config = None
+        # Schema snapshot (loaded lazily, see apps/schemas/snapshot.py)
+        self._schema = None
+
+        # Jobs currently running for this service (queries may run concurrently)
+        self._active_jobs: Dict[str, Any] = {}
+        self._jobs_lock = threading.Lock()
 
     @property
     def client(self) -> bigquery.Client:
@@ -66,55 +101,37 @@ class BigQueryService:
         Credentials (ADC) from gcloud CLI if OAuth not configured.
         """
         if self._client is None:
-            credentials = None
-
-            # Try user's OAuth credentials first
-            if self.user:
-                from apps.users.gcp_oauth_service import GCPOAuthService
-                credentials = GCPOAuthService.get_valid_credentials(self.user)
-
-            if credentials:
-                # Use user's OAuth credentials
-                self._client = bigquery.Client(
-                    project=self.billing_project,
-                    credentials=credentials
-                )
-                logger.info(f"Using OAuth credentials for user {self.user.email}")
-            else:
-                # Fall back to Application Default Credentials (gcloud CLI)
-                try:
-                    self._client = bigquery.Client(project=self.billing_project)
-                    logger.info("Using Application Default Credentials (gcloud CLI)")
-                except Exception as e:
-                    logger.error(f"Failed to create BigQuery client with ADC: {e}")
-                    raise AuthenticationFailed(
-                        "BigQuery access not available. Please run 'gcloud auth application-default login' "
-                        "or authorize BigQuery access in Settings."
-                    )
+            # Pooled per (user, billing project): reuses HTTP sessions and refreshes tokens ahead of expiry
+            self._client = get_client_registry().get_client(self.user, self.billing_project)
 
         return self._client
 
     def refresh_client(self) -> None:
         """Force refresh the BigQuery client (e.g., after token refresh)."""
+        get_client_registry().invalidate(self.user, self.billing_project)
         self._client = None
 
     @property
-    def schema_config(self):
-        """Lazy-load schema configuration."""
-        if self._schema_config is None:
+    def schema(self) -> Optional['SchemaSnapshot']:
+        """Lazy-load the schema snapshot (metrics, dimensions, data types)."""
+        if self._schema is None:
             self._load_schema()
-        return self._schema_config
+        return self._schema
+
+    @property
+    def schema_config(self):
+        """Schema configuration of the snapshot."""
+        return self.schema.schema_config if self.schema else None
 
+    @timed_stage('schema')
     def _load_schema(self) -> None:
-        """Load schema configuration from SchemaService."""
+        """Load the schema snapshot (cached per process, see apps/schemas/snapshot.py)."""
         try:
-            from apps.schemas.models import SchemaConfig
-            self._schema_config = SchemaConfig.objects.filter(
-                bigquery_table=self.bigquery_table
-            ).first()
+            from apps.schemas.snapshot import get_schema_snapshot
+            self._schema = get_schema_snapshot(self.bigquery_table.id)
         except Exception as e:
             logger.warning(f"Failed to load schema: {e}")
-            self._schema_config = None
+            self._schema = None
 
     def set_date_limits(
         self,
@@ -210,12 +227,9 @@ class BigQueryService:
         """
         conditions = []
 
-        # Handle relative dates
-        if date_range_type == "relative" and relative_date_preset:
-            start_date, end_date = self._resolve_relative_dates(relative_date_preset)
-
-        # Clamp dates to allowed limits
-        start_date, end_date = self._clamp_dates(start_date, end_date)
+        start_date, end_date = self.resolve_date_range(
+            start_date, end_date, date_range_type, relative_date_preset
+        )
 
         # Add date conditions
         if start_date:
@@ -226,84 +240,103 @@ class BigQueryService:
         # Add dimension filters
         if dimension_filters:
             for dim_id, values in dimension_filters.items():
-                if not values:
-                    continue
-
-                # Handle special __NULL__ and __EMPTY__ markers
-                null_marker = "__NULL__"
-                empty_marker = "__EMPTY__"
-                has_null = null_marker in values
-                has_empty = empty_marker in values
-                non_special_values = [v for v in values if v not in (null_marker, empty_marker)]
+                condition = self._build_dimension_condition(dim_id, values)
+                if condition:
+                    conditions.append(condition)
 
-                filter_parts = []
+        if conditions:
+            return "WHERE " + " AND ".join(conditions)
+        return ""
 
-                # Determine data type from schema (default to STRING)
-                data_type = self._get_dimension_data_type(dim_id)
+    def resolve_date_range(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        date_range_type: str = "absolute",
+        relative_date_preset: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Dates a filter covers: relative presets resolved, clamped to allowed limits.
 
-                # Numeric types don't need quotes
-                is_numeric = data_type in ("INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC", "BOOLEAN", "BOOL")
+        Returns:
+            Tuple of (start_date, end_date), either may be None (unbounded)
+        """
+        # Handle relative dates
+        if date_range_type == "relative" and relative_date_preset:
+            start_date, end_date = self._resolve_relative_dates(relative_date_preset)
 
-                if non_special_values:
-                    if is_numeric:
-                        # For numeric types, don't quote values
-                        if len(non_special_values) == 1:
-                            filter_parts.append(f"{dim_id} = {non_special_values[0]}")
-                        else:
-                            values_str = ", ".join(non_special_values)
-                            filter_parts.append(f"{dim_id} IN ({values_str})")
-                    else:
-                        # For string types, quote values
-                        if len(non_special_values) == 1:
-                            escaped_value = non_special_values[0].replace("'", "''")
-                            filter_parts.append(f"{dim_id} = '{escaped_value}'")
-                        else:
-                            escaped_values = [v.replace("'", "''") for v in non_special_values]
-                            values_str = "', '".join(escaped_values)
-                            filter_parts.append(f"{dim_id} IN ('{values_str}')")
+        # Clamp dates to allowed limits
+        return self._clamp_dates(start_date, end_date)
 
-                if has_null:
-                    filter_parts.append(f"{dim_id} IS NULL")
+    def _build_dimension_condition(self, dim_id: str, values: List[str]) -> Optional[str]:
+        """
+        Build the condition matching any of a dimension's filter values.
 
-                if has_empty:
-                    filter_parts.append(f"{dim_id} = ''")
+        Args:
+            dim_id: Dimension column name
+            values: Filter values (supports __NULL__ and __EMPTY__ markers)
 
-                if filter_parts:
-                    if len(filter_parts) == 1:
-                        conditions.append(filter_parts[0])
-                    else:
-                        conditions.append(f"({' OR '.join(filter_parts)})")
+        Returns:
+            SQL condition, or None if there are no values
+        """
+        if not values:
+            return None
 
-        if conditions:
-            return "WHERE " + " AND ".join(conditions)
-        return ""
+        # Handle special __NULL__ and __EMPTY__ markers
+        null_marker = "__NULL__"
+        empty_marker = "__EMPTY__"
+        has_null = null_marker in values
+        has_empty = empty_marker in values
+        non_special_values = [v for v in values if v not in (null_marker, empty_marker)]
+
+        filter_parts = []
+
+        # Determine data type from schema (default to STRING)
+        data_type = self._get_dimension_data_type(dim_id)
+
+        # Numeric types don't need quotes
+        is_numeric = data_type in ("INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC", "BOOLEAN", "BOOL")
+
+        if non_special_values:
+            if is_numeric:
+                # For numeric types, don't quote values
+                if len(non_special_values) == 1:
+                    filter_parts.append(f"{dim_id} = {non_special_values[0]}")
+                else:
+                    values_str = ", ".join(non_special_values)
+                    filter_parts.append(f"{dim_id} IN ({values_str})")
+            else:
+                # For string types, quote values
+                if len(non_special_values) == 1:
+                    escaped_value = non_special_values[0].replace("'", "''")
+                    filter_parts.append(f"{dim_id} = '{escaped_value}'")
+                else:
+                    escaped_values = [v.replace("'", "''") for v in non_special_values]
+                    values_str = "', '".join(escaped_values)
+                    filter_parts.append(f"{dim_id} IN ('{values_str}')")
+
+        if has_null:
+            filter_parts.append(f"{dim_id} IS NULL")
+
+        if has_empty:
+            filter_parts.append(f"{dim_id} = ''")
+
+        if not filter_parts:
+            return None
+        if len(filter_parts) == 1:
+            return filter_parts[0]
+        return f"({' OR '.join(filter_parts)})"
 
     def _get_dimension_data_type(self, dim_id: str) -> str:
-        """Get the data type for a dimension, including joined dimensions."""
-        if not self.schema_config:
+        """Get the data type for a dimension, including joined and calculated dimensions."""
+        if not self.schema:
             logger.warning(f"_get_dimension_data_type: no schema_config for dim_id={dim_id}")
             return "STRING"
 
-        # First check regular dimensions
-        try:
-            dim = self.schema_config.dimensions.get(dimension_id=dim_id)
-            logger.debug(f"_get_dimension_data_type: found regular dim {dim_id} -> {dim.data_type}")
-            return dim.data_type
-        except Exception:
-            pass
-
-        # Check joined dimensions
-        try:
-            from apps.schemas.models import JoinedDimensionStatus
-            for source in self.schema_config.joined_dimension_sources.filter(
-                status=JoinedDimensionStatus.READY
-            ).prefetch_related('columns'):
-                for col in source.columns.all():
-                    if col.dimension_id == dim_id:
-                        logger.info(f"_get_dimension_data_type: found joined dim {dim_id} -> {col.data_type}")
-                        return col.data_type
-        except Exception as e:
-            logger.error(f"_get_dimension_data_type: error checking joined dims: {e}")
+        # One lookup in the snapshot's dimension catalog (regular, calculated or joined)
+        info = self.schema.dimension(dim_id)
+        if info:
+            return info.data_type
 
         logger.warning(f"_get_dimension_data_type: dim_id={dim_id} not found, defaulting to STRING")
         return "STRING"
@@ -346,7 +379,7 @@ class BigQueryService:
         Returns:
             Comma-separated SELECT clause with aggregated metrics
         """
-        if not self.schema_config:
+        if not self.schema:
             raise ValueError("Schema not loaded")
 
         select_parts = []
@@ -355,7 +388,7 @@ class BigQueryService:
             select_parts.append("search_term")
 
         # Add calculated metrics with their SQL expressions
-        for metric in self.schema_config.calculated_metrics.all():
+        for metric in self.schema.metrics:
             select_parts.append(f"{metric.sql_expression} as {metric.metric_id}")
 
         return ",\n                ".join(select_parts)
@@ -365,25 +398,175 @@ class BigQueryService:
         query: str,
         query_type: str = "unknown",
         endpoint: str = "unknown",
-        filters: Optional[Dict] = None
-    ) -> pd.DataFrame:
+        filters: Optional[Dict] = None,
+        use_cache: bool = True,
+        result_format: str = 'pandas'
+    ) -> Union[pd.DataFrame, pa.Table]:
         """
         Execute a BigQuery query and return results as DataFrame.
 
+        Results are read through the query cache: the normalized SQL hash is
+        looked up first and BigQuery is only hit on a miss. Fresh results are
+        written back tagged with query_type and table_id.
+
+        On a miss, concurrent identical queries are coalesced: one caller runs
+        the BigQuery job and the others (threads in this worker, or other
+        workers via the shared cache and a lease) receive its result. The
+        query runs on the first configured engine that can answer it
+        (query_engines.py): small mirrored rollups locally, the rest on BigQuery.
+
         Args:
             query: SQL query to execute
-            query_type: Type of query (for logging)
+            query_type: Type of query (for logging and cache tagging)
             endpoint: API endpoint that triggered the query (for logging)
             filters: Applied filters (for logging)
+            use_cache: If False, bypass the cache for both lookup and store
+            result_format: 'pandas' for a DataFrame, 'arrow' for a pyarrow Table
+                (columnar, no pandas conversion; see columnar.py)
 
         Returns:
-            DataFrame with query results
+            DataFrame (or Arrow table) with query results
         """
+        if result_format not in self.RESULT_FORMATS:
+            raise ValueError(f"Unknown result_format '{result_format}'")
+
         start_time = time.time()
+        cache_key = QueryCacheService.sql_to_cache_key(query)
+
+        query_cache = None
+        if use_cache and getattr(settings, 'QUERY_CACHE_ENABLED', True):
+            query_cache = get_query_cache()
+
+            with timed('cache'):
+                cached = query_cache.get(cache_key)
+            if cached is not None:
+                result = self._from_cached_result(cached, result_format)
+                self._log_query(
+                    query=query,
+                    query_type=query_type,
+                    endpoint=endpoint,
+                    filters=filters,
+                    execution_time=time.time() - start_time,
+                    row_count=len(result),
+                    cache_hit=True
+                )
+                return result
+
+        def run_job() -> Union[pd.DataFrame, pa.Table]:
+            result = self._run_on_engine(query, query_type, endpoint, filters, start_time, result_format)
+            if query_cache is not None:
+                query_cache.set(
+                    cache_key=cache_key,
+                    query_type=query_type,
+                    table_id=self.table_id,
+                    sql_query=query,
+                    result=self._to_cached_result(result),
+                    row_count=len(result)
+                )
+            return result
+
+        if not getattr(settings, 'QUERY_COALESCING_ENABLED', True):
+            return run_job()
+
+        fetch_shared = None
+        if query_cache is not None:
+            def fetch_shared() -> Optional[Union[pd.DataFrame, pa.Table]]:
+                shared_result = query_cache.get(cache_key)
+                if shared_result is None:
+                    return None
+                return self._from_cached_result(shared_result, result_format)
+
+        # Arrow tables are immutable and can be shared; DataFrames are copied per caller
+        result, shared = get_query_coalescer().run(
+            f"{cache_key}:{result_format}",
+            run_job,
+            fetch_shared=fetch_shared,
+            copy_result=(lambda df: df.copy()) if result_format == 'pandas' else None
+        )
+
+        if shared:
+            # Served by another caller's job: no BigQuery work for this request
+            self._log_query(
+                query=query,
+                query_type=query_type,
+                endpoint=endpoint,
+                filters=filters,
+                execution_time=time.time() - start_time,
+                row_count=len(result),
+                cache_hit=True
+            )
+
+        return result
+
+    @property
+    def bqstorage_client(self):
+        """Pooled BigQuery Storage Read API client, or None if unavailable."""
+        if not getattr(settings, 'BIGQUERY_USE_STORAGE_API', True):
+            return None
+        return get_client_registry().get_bqstorage_client(self.user, self.billing_project)
+
+    def _run_on_engine(
+        self,
+        query: str,
+        query_type: str,
+        endpoint: str,
+        filters: Optional[Dict],
+        start_time: float,
+        result_format: str
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """Run a query on the first engine that can answer it, falling through on engine errors."""
+        for engine in get_query_engines():
+            if not engine.can_execute(query):
+                continue
+            try:
+                return engine.execute(self, query, query_type, endpoint, filters, start_time, result_format)
+            except Exception as e:
+                if not engine.fallback_on_error:
+                    raise
+                logger.warning(f"Query engine '{engine.name}' failed, trying the next one: {e}")
+        raise ValueError(f"No query engine can run this query (QUERY_ENGINES={settings.QUERY_ENGINES})")
+
+    def _run_query_job(
+        self,
+        query: str,
+        query_type: str,
+        endpoint: str,
+        filters: Optional[Dict],
+        start_time: float,
+        result_format: str = 'pandas'
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """
+        Run a query job on BigQuery and log it.
+
+        Results are downloaded through the Storage Read API when available
+        (the client library skips it for results that fit in the first page).
+        Queue/run time (from the job statistics) and download time are
+        recorded as request timing stages (timing.py).
+
+        The job is registered under the current request id and user so it can
+        be cancelled from any worker (see query_job_registry.py).
 
+        Raises:
+            QueryBudgetError: If the pre-flight estimate exceeds a byte limit or budget
+            BigQueryError: code 'query_cancelled' if the job was cancelled while running
+        """
+        query_job = None
         try:
-            query_job = self.client.query(query)
-            df = query_job.to_dataframe()
+            query_job = self._start_query_job(query, query_type, endpoint)
+            bqstorage_client = self.bqstorage_client
+            rows = query_job.result()
+            self._record_job_timings(query_job)
+            with timed('download'):
+                if result_format == 'arrow':
+                    result = rows.to_arrow(
+                        bqstorage_client=bqstorage_client,
+                        create_bqstorage_client=False
+                    )
+                else:
+                    result = rows.to_dataframe(
+                        bqstorage_client=bqstorage_client,
+                        create_bqstorage_client=False
+                    )
 
             execution_time = time.time() - start_time
             bytes_processed = query_job.total_bytes_processed or 0
@@ -398,11 +581,9 @@ class BigQueryService:
                 execution_time=execution_time,
                 bytes_processed=bytes_processed,
                 bytes_billed=bytes_billed,
-                row_count=len(df)
+                row_count=len(result)
             )
 
-            return df
-
         except Exception as e:
             execution_time = time.time() - start_time
             self._log_query(
@@ -413,7 +594,206 @@ class BigQueryService:
                 execution_time=execution_time,
                 error=str(e)
             )
+            self._raise_if_cancelled(query_job, e)
+            raise
+
+        finally:
+            if query_job is not None:
+                self._release_query_job(query_job)
+
+        return result
+
+    @staticmethod
+    def _record_job_timings(query_job: bigquery.QueryJob) -> None:
+        """Record how long a finished job waited in the BigQuery queue and ran."""
+        created, started, ended = query_job.created, query_job.started, query_job.ended
+        if created and started:
+            record_timing('bq_queue', (started - created).total_seconds() * 1000)
+        if started and ended:
+            record_timing('bq_exec', (ended - started).total_seconds() * 1000)
+
+    def _start_query_job(self, query: str, query_type: str, endpoint: str) -> bigquery.QueryJob:
+        """
+        Start a query job after the pre-flight budget check and register it
+        for cancellation. Release it with _release_query_job.
+        """
+        # Pre-flight: reject oversized / over-budget queries before they run
+        get_query_budget().check(self.client, query, self.user, self.bigquery_table, endpoint)
+
+        job_config = None
+        if settings.QUERY_MAX_BYTES_PER_QUERY:
+            # Hard backstop in case the estimate was skipped or stale
+            job_config = bigquery.QueryJobConfig(
+                maximum_bytes_billed=settings.QUERY_MAX_BYTES_PER_QUERY
+            )
+        query_job = self.client.query(query, job_config=job_config)
+        with self._jobs_lock:
+            self._active_jobs[query_job.job_id] = query_job
+        get_job_registry().register(
+            query_job, self.user, self.bigquery_table, self.billing_project, query_type
+        )
+        return query_job
+
+    def _release_query_job(self, query_job: bigquery.QueryJob) -> None:
+        """Stop tracking a job that has finished, failed or been cancelled."""
+        with self._jobs_lock:
+            self._active_jobs.pop(query_job.job_id, None)
+        get_job_registry().unregister(query_job)
+
+    @staticmethod
+    def _raise_if_cancelled(query_job: Optional[bigquery.QueryJob], error: Exception) -> None:
+        """Turn the failure of a cancelled job into BigQueryError(code='query_cancelled')."""
+        if get_job_registry().was_cancelled(query_job):
+            raise BigQueryError(
+                "Query was cancelled",
+                code='query_cancelled',
+                details={'job_id': query_job.job_id}
+            ) from error
+
+    def stream_query(
+        self,
+        query: str,
+        query_type: str = "export",
+        endpoint: str = "unknown",
+        filters: Optional[Dict] = None
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Run a query once and stream its result as Arrow record batches.
+
+        The job is started and awaited before this returns, so errors (invalid
+        SQL, budget, cancellation) are raised here rather than mid-stream.
+        Result pages are then downloaded one at a time (Storage Read API
+        streams when available, else REST pages of EXPORT_PAGE_SIZE rows), so
+        memory stays bounded by a page whatever the result size. Results
+        bypass the query cache.
+
+        Returns:
+            Iterator of record batches; the query is logged when it is exhausted or closed
+
+        Raises:
+            QueryBudgetError: If the pre-flight estimate exceeds a byte limit or budget
+            BigQueryError: code 'query_cancelled' if the job was cancelled while running
+        """
+        start_time = time.time()
+        query_job = None
+        try:
+            query_job = self._start_query_job(query, query_type, endpoint)
+            rows = query_job.result(page_size=self.EXPORT_PAGE_SIZE)
+        except Exception as e:
+            self._log_query(
+                query=query,
+                query_type=query_type,
+                endpoint=endpoint,
+                filters=filters,
+                execution_time=time.time() - start_time,
+                error=str(e)
+            )
+            self._raise_if_cancelled(query_job, e)
             raise
+        finally:
+            # Once the job is done only the download remains: nothing to cancel
+            if query_job is not None:
+                self._release_query_job(query_job)
+
+        return self._iter_result_batches(query_job, rows, query, query_type, endpoint, filters, start_time)
+
+    def _iter_result_batches(
+        self,
+        query_job: bigquery.QueryJob,
+        rows,
+        query: str,
+        query_type: str,
+        endpoint: str,
+        filters: Optional[Dict],
+        start_time: float
+    ) -> Iterator[pa.RecordBatch]:
+        row_count = 0
+        error = None
+        try:
+            for batch in rows.to_arrow_iterable(bqstorage_client=self.bqstorage_client):
+                row_count += batch.num_rows
+                yield batch
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            # Also runs when the consumer stops early (e.g. the client disconnected)
+            self._log_query(
+                query=query,
+                query_type=query_type,
+                endpoint=endpoint,
+                filters=filters,
+                execution_time=time.time() - start_time,
+                bytes_processed=query_job.total_bytes_processed or 0,
+                bytes_billed=query_job.total_bytes_billed or 0,
+                row_count=row_count,
+                error=error
+            )
+
+    def cancel_active_jobs(self) -> int:
+        """
+        Cancel BigQuery jobs still running for this service.
+
+        Returns:
+            Number of jobs a cancel request was sent for
+        """
+        with self._jobs_lock:
+            jobs = list(self._active_jobs.values())
+
+        cancelled = 0
+        for job in jobs:
+            try:
+                job.cancel()
+                cancelled += 1
+                logger.info(f"Cancelled BigQuery job {job.job_id}")
+            except Exception as e:
+                logger.warning(f"Failed to cancel BigQuery job {job.job_id}: {e}")
+        return cancelled
+
+    @staticmethod
+    def _to_cached_result(result: Union[pd.DataFrame, pa.Table]) -> Dict[str, Any]:
+        """
+        Convert a query result to its cached form.
+
+        Column order is stored alongside the records so empty results
+        round-trip with their columns intact.
+        """
+        if isinstance(result, pa.Table):
+            return {
+                'columns': result.column_names,
+                'records': result.to_pylist()
+            }
+        return {
+            'columns': list(result.columns),
+            'records': result.to_dict('records')
+        }
+
+    @classmethod
+    def _from_cached_result(cls, result: Any, result_format: str) -> Union[pd.DataFrame, pa.Table]:
+        """Rebuild a query result in the requested format from its cached form."""
+        if result_format == 'arrow':
+            return cls._cached_result_to_arrow(result)
+        return cls._cached_result_to_dataframe(result)
+
+    @staticmethod
+    def _cached_result_to_dataframe(result: Any) -> pd.DataFrame:
+        """Rebuild a DataFrame from a cached result."""
+        if isinstance(result, dict):
+            return pd.DataFrame.from_records(
+                result.get('records', []),
+                columns=result.get('columns')
+            )
+        # Plain list of dicts (DataFrame.to_dict('records'))
+        return pd.DataFrame(result)
+
+    @staticmethod
+    def _cached_result_to_arrow(result: Any) -> pa.Table:
+        """Rebuild an Arrow table from a cached result."""
+        if not isinstance(result, dict):
+            return pa.Table.from_pylist(result)
+        records = result.get('records', [])
+        columns = result.get('columns') or (list(records[0].keys()) if records else [])
+        return pa.table({col: [record.get(col) for record in records] for col in columns})
 
     def _log_query(
         self,
@@ -425,15 +805,19 @@ class BigQueryService:
         bytes_processed: int = 0,
         bytes_billed: int = 0,
         row_count: int = 0,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        cache_hit: bool = False
     ) -> None:
-        """Log query execution to audit system with user attribution."""
-        try:
-            from apps.audit.models import QueryLog
+        """
+        Log query execution to audit system with user attribution.
 
-            QueryLog.objects.create(
-                bigquery_table=self.bigquery_table,
-                user=self.user,  # Track which user executed the query
+        Records are written in batches off the request path (query_log_writer.py).
+        """
+        try:
+            user_id = self.user.pk if getattr(self.user, 'is_authenticated', False) else None
+            get_query_log_writer().log(
+                bigquery_table_id=self.bigquery_table.pk,
+                user_id=user_id,  # Track which user executed the query
                 query_type=query_type,
                 endpoint=endpoint,
                 sql_query=query,
@@ -443,7 +827,8 @@ class BigQueryService:
                 bytes_billed=bytes_billed,
                 row_count=row_count,
                 error=error,
-                is_success=error is None
+                is_success=error is None,
+                cache_hit=cache_hit
             )
         except Exception as e:
             logger.warning(f"Failed to log query: {e}")
@@ -458,8 +843,9 @@ class BigQueryService:
         table_path: Optional[str] = None,
         dimension_values: Optional[List[str]] = None,
         custom_dimension: Optional[Dict] = None,
-        custom_metrics: Optional[List[Dict]] = None
-    ) -> pd.DataFrame:
+        custom_metrics: Optional[List[Dict]] = None,
+        include_totals: bool = False
+    ) -> Union[pd.DataFrame, PivotResult]:
         """
         Query pivot table data grouped by dimensions.
 
@@ -476,10 +862,15 @@ class BigQueryService:
                              Format: {'id': uuid, 'metric': 'queries', 'conditions': [...]}
             custom_metrics: Optional list of custom metric dicts to compute in BigQuery.
                            Format: [{'metric_id': 'test', 'source_metric': 'queries', 'aggregation_type': 'avg_per_day'}]
+            include_totals: Also return the grand totals over all groups and the total
+                           group count, computed in the same scan as the page
+                           (GROUPING SETS + window count). Only supported for the plain
+                           LIMIT/OFFSET shape; other shapes return totals=None.
 
         Returns:
-            DataFrame with aggregated data
+            DataFrame with aggregated data, or a PivotResult if include_totals
         """
+        build_start = time.perf_counter()
         # Use provided table_path or default to base table
         query_table = table_path if table_path else self.table_path
         is_rollup_query = table_path is not None
@@ -545,13 +936,12 @@ class BigQueryService:
         # For rollup queries, only use volume metrics since conversion metrics
         # don't exist as columns in the rollup table
         order_by = ""
-        if self.schema_config:
-            if is_rollup_query:
-                first_metric = self.schema_config.calculated_metrics.filter(category='volume').first()
-            else:
-                first_metric = self.schema_config.calculated_metrics.first()
+        order_metric = None
+        if self.schema:
+            first_metric = next(iter(self.schema.volume_metrics if is_rollup_query else self.schema.metrics), None)
             if first_metric:
-                order_by = f"ORDER BY {first_metric.metric_id} DESC"
+                order_metric = first_metric.metric_id
+                order_by = f"ORDER BY {order_metric} DESC"
 
         # Build dimension values filter (for multi-table matching)
         dimension_values_filter = ""
@@ -625,7 +1015,7 @@ class BigQueryService:
 
             # Outer query re-aggregates by the bucket label only
             outer_metric_select = ", ".join([f"SUM({m.metric_id}) as {m.metric_id}"
-                for m in self.schema_config.calculated_metrics.filter(category='volume')]) if self.schema_config else metric_select
+                for m in self.schema.volume_metrics]) if self.schema else metric_select
 
             # Build outer SELECT for custom metrics (re-aggregate computed values)
             outer_custom_metric_select = ""
@@ -674,6 +1064,32 @@ class BigQueryService:
                 {group_by}
                 {order_by_dims}
             """
+        elif include_totals and dimensions:
+            # Page rows, grand totals and group count in one scan:
+            # GROUPING SETS adds the grand total row (all dimensions rolled up),
+            # window functions count the groups and number them for paging.
+            page_order = f"ORDER BY {order_metric} DESC" if order_metric else ""
+            query = f"""
+                SELECT * FROM (
+                    SELECT
+                        *,
+                        COUNTIF(_pivot_is_total = 0) OVER () AS _pivot_total_groups,
+                        ROW_NUMBER() OVER (PARTITION BY _pivot_is_total {page_order}) AS _pivot_row_number
+                    FROM (
+                        SELECT
+                            {select_dims}
+                            {metric_select}
+                            {custom_metric_select},
+                            GROUPING({dimensions[0]}) AS _pivot_is_total
+                        FROM `{query_table}`
+                        {where_clause}
+                        GROUP BY GROUPING SETS (({dim_columns}), ())
+                    )
+                )
+                WHERE _pivot_is_total = 1
+                    OR _pivot_row_number BETWEEN {offset + 1} AND {offset + limit}
+                ORDER BY _pivot_is_total, _pivot_row_number
+            """
         else:
             # Normal query with LIMIT/OFFSET
             query = f"""
@@ -689,13 +1105,226 @@ class BigQueryService:
                 OFFSET {offset}
             """
 
-        return self.execute_query(
+        record_timing('sql_build', (time.perf_counter() - build_start) * 1000)
+        df = self.execute_query(
             query=query,
             query_type='pivot',
             endpoint='/api/pivot',
             filters=filters
         )
 
+        if not include_totals:
+            return df
+
+        if '_pivot_is_total' in df.columns:
+            return self._split_pivot_totals(df)
+        if not dimensions and not custom_dim_select:
+            # Without dimensions the single aggregate row is the grand total
+            return PivotResult(rows=df, totals=df, total_count=len(df))
+        return PivotResult(rows=df)
+
+    @staticmethod
+    def _split_pivot_totals(df: pd.DataFrame) -> PivotResult:
+        """Split a single-scan pivot result into page rows, totals row and group count."""
+        is_total = (df['_pivot_is_total'] == 1).to_numpy()
+        total_count = int(df['_pivot_total_groups'].iloc[0]) if len(df) > 0 else 0
+
+        df = df.drop(columns=['_pivot_is_total', '_pivot_total_groups', '_pivot_row_number'])
+        return PivotResult(
+            rows=df[~is_total].reset_index(drop=True),
+            totals=df[is_total].reset_index(drop=True),
+            total_count=total_count
+        )
+
+    def build_pivot_export_query(
+        self,
+        dimensions: List[str],
+        filters: Dict,
+        table_path: Optional[str] = None,
+        custom_metrics: Optional[List[Dict]] = None
+    ) -> str:
+        """
+        Build the SQL for every pivot group (no LIMIT/OFFSET), for streaming export.
+
+        Same grouping, metrics and order as query_pivot_data's plain shape.
+
+        Args:
+            dimensions: Dimensions to group by
+            filters: Filter parameters
+            table_path: Override table path (for rollup queries). Defaults to base table.
+            custom_metrics: Optional list of custom metric dicts to compute in BigQuery
+
+        Returns:
+            SQL query string
+        """
+        query_table = table_path if table_path else self.table_path
+        is_rollup_query = table_path is not None
+
+        where_clause = self.build_filter_clause(
+            start_date=filters.get('start_date'),
+            end_date=filters.get('end_date'),
+            dimension_filters=filters.get('dimension_filters'),
+            date_range_type=filters.get('date_range_type', 'absolute'),
+            relative_date_preset=filters.get('relative_date_preset')
+        )
+
+        if is_rollup_query:
+            metric_select = self._build_rollup_metric_select_clause()
+        else:
+            metric_select = self._build_metric_select_clause()
+
+        custom_metric_select = ""
+        if custom_metrics:
+            custom_metric_select = self._build_custom_metrics_select(
+                custom_metrics,
+                filters.get('start_date'),
+                filters.get('end_date'),
+                is_rollup_query
+            ) or ""
+
+        select_dims = ", ".join(dimensions) + "," if dimensions else ""
+        group_by = f"GROUP BY {', '.join(dimensions)}" if dimensions else ""
+
+        order_by = ""
+        if self.schema:
+            first_metric = next(iter(self.schema.volume_metrics if is_rollup_query else self.schema.metrics), None)
+            if first_metric:
+                order_by = f"ORDER BY {first_metric.metric_id} DESC"
+
+        return f"""
+            SELECT
+                {select_dims}
+                {metric_select}
+                {custom_metric_select}
+            FROM `{query_table}`
+            {where_clause}
+            {group_by}
+            {order_by}
+        """
+
+    def query_pivot_batch(
+        self,
+        dimensions: List[str],
+        table_dimensions: List[str],
+        combinations: List[Dict[str, str]],
+        filters: Dict,
+        primary_index: int = 0,
+        limit: int = 100,
+        table_path: Optional[str] = None,
+        custom_metrics: Optional[List[Dict]] = None
+    ) -> pd.DataFrame:
+        """
+        Query every column of a multi-column pivot in one scan.
+
+        Groups by the row dimensions and the table dimensions together, so each
+        table-dimension combination is a column. The page is the primary
+        column's top rows; the other columns return the same rows (like
+        query_pivot_data with dimension_values). GROUPING SETS adds a totals row
+        per column.
+
+        Args:
+            dimensions: Row dimensions
+            table_dimensions: Dimensions that split the table into columns
+            combinations: Table-dimension values of each column, e.g. [{'country': 'US'}]
+            filters: Filter parameters (must not filter on table_dimensions)
+            primary_index: Index of the combination whose top rows define the page
+            limit: Max rows per column
+            table_path: Override table path (for rollup queries). Defaults to base table.
+            custom_metrics: Optional list of custom metric dicts to compute in BigQuery
+
+        Returns:
+            DataFrame with row and table dimension columns, metrics, and
+            _pivot_is_total (1 for a column's totals row),
+            _pivot_total_groups (row groups in the column) and
+            _pivot_rank (position in the primary column)
+        """
+        build_start = time.perf_counter()
+        query_table = table_path if table_path else self.table_path
+        is_rollup_query = table_path is not None
+
+        # Restrict the scan to the requested values of each table dimension
+        dimension_filters = dict(filters.get('dimension_filters') or {})
+        for dim in table_dimensions:
+            dimension_filters[dim] = sorted({str(c.get(dim)) for c in combinations})
+
+        where_clause = self.build_filter_clause(
+            start_date=filters.get('start_date'),
+            end_date=filters.get('end_date'),
+            dimension_filters=dimension_filters,
+            date_range_type=filters.get('date_range_type', 'absolute'),
+            relative_date_preset=filters.get('relative_date_preset')
+        )
+
+        if is_rollup_query:
+            metric_select = self._build_rollup_metric_select_clause()
+        else:
+            metric_select = self._build_metric_select_clause()
+
+        custom_metric_select = ""
+        if custom_metrics:
+            custom_metric_select = self._build_custom_metrics_select(
+                custom_metrics,
+                filters.get('start_date'),
+                filters.get('end_date'),
+                is_rollup_query
+            )
+
+        # Same ordering as query_pivot_data
+        order_by = ""
+        if self.schema:
+            first_metric = next(iter(self.schema.volume_metrics if is_rollup_query else self.schema.metrics), None)
+            if first_metric:
+                order_by = f"ORDER BY {first_metric.metric_id} DESC"
+
+        # Condition selecting the primary column's rows
+        primary = combinations[primary_index]
+        primary_condition = " AND ".join(
+            self._build_dimension_condition(dim, [str(primary.get(dim))])
+            for dim in table_dimensions
+        )
+
+        row_columns = ", ".join(dimensions)
+        table_columns = ", ".join(table_dimensions)
+
+        query = f"""
+            SELECT * FROM (
+                SELECT
+                    *,
+                    COUNTIF(_pivot_is_total = 0) OVER (PARTITION BY {table_columns}) AS _pivot_total_groups,
+                    MAX(_pivot_primary_rank) OVER (PARTITION BY _pivot_is_total, {row_columns}) AS _pivot_rank
+                FROM (
+                    SELECT
+                        *,
+                        IF(
+                            _pivot_is_total = 0 AND {primary_condition},
+                            ROW_NUMBER() OVER (PARTITION BY _pivot_is_total, {primary_condition} {order_by}),
+                            NULL
+                        ) AS _pivot_primary_rank
+                    FROM (
+                        SELECT
+                            {row_columns},
+                            {table_columns},
+                            {metric_select}
+                            {custom_metric_select},
+                            GROUPING({dimensions[0]}) AS _pivot_is_total
+                        FROM `{query_table}`
+                        {where_clause}
+                        GROUP BY GROUPING SETS (({row_columns}, {table_columns}), ({table_columns}))
+                    )
+                )
+            )
+            WHERE _pivot_is_total = 1 OR _pivot_rank <= {limit}
+            ORDER BY _pivot_is_total, _pivot_rank
+        """
+
+        record_timing('sql_build', (time.perf_counter() - build_start) * 1000)
+        return self.execute_query(
+            query=query,
+            query_type='pivot',
+            endpoint='/api/pivot/batch',
+            filters=filters
+        )
+
     def _build_custom_metrics_select(
         self,
         custom_metrics: List[Dict],
@@ -749,13 +1378,10 @@ class BigQueryService:
             else:
                 # Look up the SQL expression for the source metric from schema
                 source_expr = None
-                if self.schema_config:
-                    try:
-                        calc_metric = self.schema_config.calculated_metrics.get(metric_id=source_metric)
-                        # Wrap the SQL expression in parentheses for safety
-                        source_expr = f"({calc_metric.sql_expression})"
-                    except Exception:
-                        pass
+                calc_metric = self.schema.metrics_by_id.get(source_metric) if self.schema else None
+                if calc_metric:
+                    # Wrap the SQL expression in parentheses for safety
+                    source_expr = f"({calc_metric.sql_expression})"
                 # Fallback to SUM if not found (might be a base column)
                 if not source_expr:
                     source_expr = f"SUM({source_metric})"
@@ -878,13 +1504,13 @@ class BigQueryService:
         Returns:
             Comma-separated SELECT clause with SUM(metric_id) as metric_id
         """
-        if not self.schema_config:
+        if not self.schema:
             raise ValueError("Schema not loaded")
 
         select_parts = []
 
         # Only SUM volume metrics - conversion metrics are calculated in Python
-        for metric in self.schema_config.calculated_metrics.filter(category='volume'):
+        for metric in self.schema.volume_metrics:
             select_parts.append(f"SUM({metric.metric_id}) as {metric.metric_id}")
 
         return ",\n                ".join(select_parts)
@@ -986,10 +1612,10 @@ class BigQueryService:
         Returns:
             List of dimension column names
         """
-        if not self.schema_config:
+        if not self.schema:
             raise ValueError("Schema not loaded. Cannot get dimension columns without schema configuration.")
 
-        return [dim.column_name for dim in self.schema_config.dimensions.all()]
+        return [dim.column_name for dim in self.schema.dimensions]
 
     def _get_calculated_dimension(self, dimension_id: str):
         """
@@ -1001,13 +1627,10 @@ class BigQueryService:
         Returns:
             CalculatedDimension if found, None otherwise
         """
-        if not self.schema_config:
+        if not self.schema:
             return None
 
-        try:
-            return self.schema_config.calculated_dimensions.get(dimension_id=dimension_id)
-        except Exception:
-            return None
+        return self.schema.calculated_dimensions_by_id.get(dimension_id)
 
     def _is_calculated_dimension(self, dimension_id: str) -> bool:
         """
@@ -1019,7 +1642,8 @@ class BigQueryService:
         Returns:
             True if it's a calculated dimension
         """
-        return self._get_calculated_dimension(dimension_id) is not None
+        info = self.schema.dimension(dimension_id) if self.schema else None
+        return info is not None and info.is_calculated
 
     def _get_regular_dimension(self, dimension_id: str):
         """
@@ -1031,13 +1655,10 @@ class BigQueryService:
         Returns:
             Dimension if found, None otherwise
         """
-        if not self.schema_config:
+        if not self.schema:
             return None
 
-        try:
-            return self.schema_config.dimensions.get(dimension_id=dimension_id)
-        except Exception:
-            return None
+        return self.schema.dimensions_by_id.get(dimension_id)
 
     def build_subquery_with_calculated_dimensions(
         self,
@@ -1062,9 +1683,9 @@ class BigQueryService:
 
         calc_dim_expressions = []
         for dim_id in calculated_dim_ids:
-            calc_dim = self._get_calculated_dimension(dim_id)
-            if calc_dim:
-                calc_dim_expressions.append(f"({calc_dim.sql_expression}) AS {dim_id}")
+            info = self.schema.dimension(dim_id) if self.schema else None
+            if info and info.is_calculated:
+                calc_dim_expressions.append(f"({info.sql_expression}) AS {dim_id}")
 
         if not calc_dim_expressions:
             return f"`{self.table_path}`"
@@ -1320,8 +1941,9 @@ class BigQueryService:
         self,
         filters: Dict,
         granularity: str = 'daily',
-        table_path: Optional[str] = None
-    ) -> pd.DataFrame:
+        table_path: Optional[str] = None,
+        result_format: str = 'pandas'
+    ) -> Union[pd.DataFrame, pa.Table]:
         """
         Query time-series data dynamically from schema.
 
@@ -1329,6 +1951,7 @@ class BigQueryService:
             filters: Filter parameters dict
             granularity: 'daily', 'weekly', or 'monthly'
             table_path: Override table path (for rollup queries). Defaults to base table.
+            result_format: 'pandas' or 'arrow' (see execute_query)
 
         Returns:
             DataFrame with time-series data
@@ -1372,7 +1995,8 @@ class BigQueryService:
             query=query,
             query_type='trends',
             endpoint='/api/trends',
-            filters={**filters, 'granularity': granularity}
+            filters={**filters, 'granularity': granularity},
+            result_format=result_format
         )
 
     def query_dimension_breakdown(
@@ -1380,8 +2004,9 @@ class BigQueryService:
         dimension: str,
         filters: Dict,
         limit: int = 20,
-        table_path: Optional[str] = None
-    ) -> pd.DataFrame:
+        table_path: Optional[str] = None,
+        result_format: str = 'pandas'
+    ) -> Union[pd.DataFrame, pa.Table]:
         """
         Query breakdown by dimension dynamically from schema.
 
@@ -1390,6 +2015,7 @@ class BigQueryService:
             filters: Filter parameters dict
             limit: Maximum number of rows to return
             table_path: Override table path (for rollup queries). Defaults to base table.
+            result_format: 'pandas' or 'arrow' (see execute_query)
 
         Returns:
             DataFrame with dimension breakdown
@@ -1406,15 +2032,11 @@ class BigQueryService:
             relative_date_preset=filters.get('relative_date_preset')
         )
 
+        # Rollups store dimensions under their ids; on the base table use the column
         group_col = dimension
-        data_type = "STRING"
-        if self.schema_config:
-            try:
-                dim = self.schema_config.dimensions.get(dimension_id=dimension)
-                group_col = dim.column_name
-                data_type = dim.data_type
-            except Exception:
-                group_col = dimension
+        info = self.schema.dimension(dimension) if self.schema else None
+        if info and not is_rollup_query and not (info.is_joined or info.is_calculated):
+            group_col = info.column_name
 
         # For rollup queries, use SUM(metric) since metrics are pre-computed
         if is_rollup_query:
@@ -1438,7 +2060,8 @@ class BigQueryService:
             query=query,
             query_type='breakdown',
             endpoint=f'/api/breakdown/{dimension}',
-            filters={**filters, 'dimension': dimension, 'limit': limit}
+            filters={**filters, 'dimension': dimension, 'limit': limit},
+            result_format=result_format
         )
 
     def query_search_terms(
@@ -1446,8 +2069,9 @@ class BigQueryService:
         filters: Dict,
         limit: int = 100,
         sort_by: str = 'queries',
-        table_path: Optional[str] = None
-    ) -> pd.DataFrame:
+        table_path: Optional[str] = None,
+        result_format: str = 'pandas'
+    ) -> Union[pd.DataFrame, pa.Table]:
         """
         Query search terms data dynamically from schema.
 
@@ -1456,6 +2080,7 @@ class BigQueryService:
             limit: Maximum number of rows to return
             sort_by: Metric ID to sort by
             table_path: Override table path (for rollup queries). Defaults to base table.
+            result_format: 'pandas' or 'arrow' (see execute_query)
 
         Returns:
             DataFrame with search terms and all base metrics
@@ -1492,7 +2117,8 @@ class BigQueryService:
             query=query,
             query_type='search_terms',
             endpoint='/api/search-terms',
-            filters={**filters, 'limit': limit, 'sort_by': sort_by}
+            filters={**filters, 'limit': limit, 'sort_by': sort_by},
+            result_format=result_format
         )
 
     def list_tables_in_dataset(self) -> List[Dict]:
@@ -1695,6 +2321,101 @@ class BigQueryService:
 
         return {metric_id: row[metric_id] or 0 for metric_id in metric_ids}
 
+    def query_rollup_aggregates_batch(
+        self,
+        rollup_table_path: str,
+        metric_ids: List[str],
+        cells: Dict[str, Dict[str, List[str]]],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        dimension_filters: Optional[Dict[str, List[str]]] = None,
+        date_range_type: Optional[str] = "absolute",
+        relative_date_preset: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Query aggregated totals for many filter cells from a rollup table at once.
+
+        Equivalent to calling query_rollup_aggregates once per cell (with the
+        cell's filters merged over dimension_filters), but every cell is a
+        conditional aggregate - SUM(IF(cell condition, metric, NULL)) - of a
+        single scan.
+
+        Args:
+            rollup_table_path: Full BigQuery path to rollup table
+            metric_ids: List of metric column names to sum
+            cells: Cell key -> dimension filters of that cell (e.g. row x column filters)
+            start_date: Start date for date range filter
+            end_date: End date for date range filter
+            dimension_filters: Base dimension filters; cell filters override the same dimension
+            date_range_type: 'absolute' or 'relative'
+            relative_date_preset: Relative date preset
+
+        Returns:
+            Dict mapping cell key to {metric_id: summed value}
+        """
+        if not metric_ids or not cells:
+            return {key: {metric_id: 0 for metric_id in metric_ids} for key in cells}
+
+        # Dates apply to every cell; dimension filters are per cell
+        where_clause = self.build_filter_clause(
+            start_date=start_date,
+            end_date=end_date,
+            date_range_type=date_range_type,
+            relative_date_preset=relative_date_preset
+        )
+
+        cell_keys = list(cells.keys())
+        cell_conditions = []
+        for key in cell_keys:
+            combined_filters = dict(dimension_filters or {})
+            combined_filters.update(cells[key] or {})
+            conditions = [
+                condition for condition in (
+                    self._build_dimension_condition(dim_id, values)
+                    for dim_id, values in combined_filters.items()
+                )
+                if condition
+            ]
+            cell_conditions.append(" AND ".join(conditions) if conditions else "TRUE")
+
+        results: Dict[str, Dict[str, Any]] = {}
+        cells_per_query = max(1, self.MAX_AGGREGATE_COLUMNS // len(metric_ids))
+
+        for start in range(0, len(cell_keys), cells_per_query):
+            chunk = range(start, min(start + cells_per_query, len(cell_keys)))
+            select_parts = [
+                f"SUM(IF({cell_conditions[i]}, {metric_id}, NULL)) AS c{i}_{metric_id}"
+                for i in chunk
+                for metric_id in metric_ids
+            ]
+
+            query = f"""
+            SELECT {', '.join(select_parts)}
+            FROM `{rollup_table_path}`
+            {where_clause}
+            """
+
+            logger.info(
+                f"Querying rollup aggregates for {len(chunk)} cells from {rollup_table_path}"
+            )
+
+            df = self.execute_query(
+                query=query,
+                query_type='aggregated_totals',
+                endpoint='/api/significance',
+                filters={'start_date': start_date, 'end_date': end_date}
+            )
+
+            row = df.iloc[0] if not df.empty else None
+            for i in chunk:
+                values = {}
+                for metric_id in metric_ids:
+                    value = row[f"c{i}_{metric_id}"] if row is not None else None
+                    values[metric_id] = value if pd.notna(value) else 0
+                results[cell_keys[i]] = values
+
+        return results
+
     def query_aggregated_totals(
         self,
         metric_ids: List[str],
@@ -1732,13 +2453,12 @@ class BigQueryService:
         # Build SELECT clause for requested metrics
         select_parts = []
         for metric_id in metric_ids:
-            try:
-                metric = self.schema_config.calculated_metrics.get(metric_id=metric_id)
-                select_parts.append(f"{metric.sql_expression} as {metric.metric_id}")
-            except Exception:
+            metric = self.schema.metrics_by_id.get(metric_id) if self.schema else None
+            if not metric:
                 # Metric not found, skip
                 logger.warning(f"Metric {metric_id} not found in schema")
                 continue
+            select_parts.append(f"{metric.sql_expression} as {metric.metric_id}")
 
         if not select_parts:
             return {}
@@ -0,0 +1,123 @@
+"""
+Columnar helpers for query results.
+
+Query results are processed column by column instead of row by row
+(DataFrame.iterrows builds a Series per row, which dominates CPU for large
+pivot pages and search-term lists). Columns can be pandas Series, NumPy
+arrays or Arrow arrays, so results fetched in Arrow mode are computed and
+serialized without a pandas round-trip.
+"""
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+Columns = Dict[str, Any]
+
+
+def table_columns(table: pa.Table) -> Columns:
+    """Map column name -> Arrow column for an Arrow table."""
+    return dict(zip(table.column_names, table.columns))
+
+
+def frame_columns(df: pd.DataFrame) -> Columns:
+    """Map column name -> Series for a DataFrame."""
+    return {col: df[col] for col in df.columns}
+
+
+def num_rows(columns: Columns) -> int:
+    """Row count of a column mapping."""
+    for values in columns.values():
+        return len(values)
+    return 0
+
+
+def numeric_array(values: Any) -> np.ndarray:
+    """
+    Convert a column to a NumPy array for arithmetic.
+
+    Integer columns stay int64 (nulls become 0); everything else becomes
+    float64 with NaN for nulls and non-numeric values.
+    """
+    if isinstance(values, pa.Array):
+        values = pa.chunked_array([values])
+    if isinstance(values, pa.ChunkedArray):
+        if pa.types.is_integer(values.type):
+            return np.asarray(pc.fill_null(values, 0).to_numpy(), dtype=np.int64)
+        try:
+            # Nulls become NaN; DECIMAL (NUMERIC) and BOOL cast to float
+            return np.asarray(pc.cast(values, pa.float64()).to_numpy(), dtype=np.float64)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return np.full(len(values), np.nan)
+
+    if isinstance(values, pd.Series):
+        if pd.api.types.is_integer_dtype(values.dtype):
+            return values.fillna(0).to_numpy(dtype=np.int64)
+        if pd.api.types.is_bool_dtype(values.dtype):
+            return values.to_numpy(dtype=np.float64, na_value=np.nan)
+        if pd.api.types.is_float_dtype(values.dtype):
+            return values.to_numpy(dtype=np.float64, na_value=np.nan)
+        # NUMERIC columns arrive as Decimal objects
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    array = np.asarray(values)
+    if array.dtype.kind in 'iu':
+        return array.astype(np.int64, copy=False)
+    try:
+        return array.astype(np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(array), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def metric_values(values: Any) -> List:
+    """
+    Serialize a metric column: integers stay int, other values become float,
+    NaN/inf become 0.0.
+    """
+    array = numeric_array(values)
+    if array.dtype.kind in 'iu':
+        return array.tolist()
+    return np.nan_to_num(array, nan=0.0, posinf=0.0, neginf=0.0).tolist()
+
+
+def python_values(values: Any) -> List:
+    """Column values as a list of Python objects (for dimension/label columns)."""
+    if isinstance(values, (pa.ChunkedArray, pa.Array)):
+        return values.to_pylist()
+    if isinstance(values, pd.Series):
+        return values.tolist()
+    return list(values)
+
+
+def columns_to_rows(
+    columns: Columns,
+    key_column: str,
+    format_key: Callable[[Any], Any],
+    default_key: Any = None
+) -> List[Dict[str, Any]]:
+    """
+    Build response rows: the formatted key column first, then every other
+    column serialized as a metric.
+
+    Args:
+        columns: Column name -> values
+        key_column: Label column (date, dimension_value, search_term)
+        format_key: Formats each label value
+        default_key: Label used when the key column is absent
+    """
+    n = num_rows(columns)
+    if key_column in columns:
+        keys = [format_key(v) for v in python_values(columns[key_column])]
+    else:
+        keys = [default_key] * n
+
+    names = [key_column]
+    value_lists = [keys]
+    for col, values in columns.items():
+        if col != key_column:
+            names.append(col)
+            value_lists.append(metric_values(values))
+
+    return [dict(zip(names, row)) for row in zip(*value_lists)]
@@ -7,14 +7,22 @@ Django port of the FastAPI data_service.py with rollup routing support.
 import math
 import re
 import logging
-from typing import List, Dict, Optional, Any, Tuple, Union
+from typing import Iterator, List, Dict, Optional, Any, Tuple, Union
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from django.conf import settings
 
 from apps.tables.models import BigQueryTable
 from .bigquery_service import BigQueryService
+from .columnar import Columns, columns_to_rows, metric_values, num_rows, numeric_array, table_columns
 from .query_router_service import QueryRouterService, RouteDecision
 from .post_processing_service import PostProcessingService
+from .query_executor import get_query_runner
+from .rollup_cube import get_rollup_cubes
+from .rollup_index import get_rollup_index
+from .timing import timed, timed_stage
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +41,19 @@ class DataService:
         self.bigquery_table = bigquery_table
         self.bq_service = BigQueryService(bigquery_table, user)
 
+    def _run_concurrently(self, tasks: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run independent queries for this request concurrently.
+
+        Bounded by ANALYTICS_REQUEST_TIMEOUT_SECONDS; on failure or timeout
+        the other queries are cancelled.
+        """
+        return get_query_runner().run(
+            tasks,
+            timeout=settings.ANALYTICS_REQUEST_TIMEOUT_SECONDS,
+            on_cancel=self.bq_service.cancel_active_jobs
+        )
+
     def get_pivot_data(
         self,
         dimensions: List[str],
@@ -102,30 +123,9 @@ class DataService:
 
         # If require_rollup and no rollup found, return error response
         if require_rollup and not route_decision.use_rollup:
-            # Use routable dimensions (excluding custom_*) for error message
-            routable_filter_dims_list = [k for k in filter_dims if not k.startswith('custom_')]
-            all_required_dims = list(set(routable_dimensions + routable_filter_dims_list))
-
-            # Get available rollups sorted by closeness to the requested configuration
-            available_rollups = []
-            router = self._get_query_router()
-            if router:
-                available_rollups = router.find_suitable_rollups(
-                    query_dimensions=routable_dimensions,
-                    query_metrics=metric_ids,
-                    query_filters=routable_filter_dims if routable_filter_dims else None
-                )
-
-            return {
-                'rows': [],
-                'total': None,
-                'available_dimensions': self._get_available_dimensions(),
-                'total_count': 0,
-                'error': f"No suitable rollup found. Query dimensions: {routable_dimensions}, Filter dimensions: {routable_filter_dims_list}. Reason: {route_decision.reason}. Create a rollup with dimensions {all_required_dims} to enable this query.",
-                'error_type': 'rollup_required',
-                'required_dimensions': all_required_dims,
-                'available_rollups': available_rollups
-            }
+            return self._rollup_required_response(
+                routable_dimensions, routable_filter_dims, metric_ids, route_decision
+            )
 
         # Determine table path (use rollup if available, otherwise base table)
         table_path = route_decision.rollup_table_path if route_decision.use_rollup else None
@@ -166,8 +166,6 @@ class DataService:
         schema_config = metrics_data.get('schema_config')
         if schema_config:
             try:
-                from apps.schemas.models import CustomMetric
-
                 # Build list of custom metric IDs to compute
                 cm_ids_to_load = set(custom_metric_ids or [])
 
@@ -182,37 +180,40 @@ class DataService:
                         logger.info(f"Auto-including custom metric '{custom_dim_metric}' for custom dimension")
 
                 # Load custom metrics
-                if cm_ids_to_load:
-                    custom_metrics = list(schema_config.custom_metrics.filter(
-                        metric_id__in=cm_ids_to_load
-                    ))
-                    if custom_metrics:
-                        custom_metrics_info = [
-                            {
-                                'metric_id': cm.metric_id,
-                                'source_metric': cm.source_metric,
-                                'aggregation_type': cm.aggregation_type
-                            }
-                            for cm in custom_metrics
-                        ]
-                        logger.info(f"Using BigQuery computation for custom metrics: {[cm.metric_id for cm in custom_metrics]}")
+                custom_metrics_info = self._load_custom_metrics_info(schema_config, cm_ids_to_load)
             except Exception as e:
                 logger.error(f"Error loading custom metrics: {e}")
 
         # Query pivot data - use routable_dimensions (excluding custom_*) for BigQuery
         # metric_condition custom dimensions are handled in BigQuery SQL
         # Custom metrics are computed in BigQuery as well
-        df = self.bq_service.query_pivot_data(
-            dimensions=routable_dimensions,
-            filters=filters,
-            limit=limit,
-            offset=offset,
-            metrics=metrics,
-            table_path=table_path,
-            dimension_values=dimension_values,
-            custom_dimension=custom_dimension_info,
-            custom_metrics=custom_metrics_info
-        )
+        # Plain pivots get grand totals and group count from the same scan; other
+        # shapes run the (independent) count query alongside the pivot query
+        single_scan = not dimension_values and not custom_dimension_id
+        tasks = {
+            'pivot': lambda: self.bq_service.query_pivot_data(
+                dimensions=routable_dimensions,
+                filters=filters,
+                limit=limit,
+                offset=offset,
+                metrics=metrics,
+                table_path=table_path,
+                dimension_values=dimension_values,
+                custom_dimension=custom_dimension_info,
+                custom_metrics=custom_metrics_info,
+                include_totals=single_scan
+            ),
+        }
+        if not skip_count and not single_scan:
+            tasks['count'] = lambda: self._get_total_count(dimensions, filters, table_path)
+
+        results = self._run_concurrently(tasks)
+        if single_scan:
+            pivot_result = results['pivot']
+            df, totals_df = pivot_result.rows, pivot_result.totals
+        else:
+            pivot_result = None
+            df, totals_df = results['pivot'], None
 
         # =================================================================
         # POST-PROCESSING: Apply custom dimensions (date_range only)
@@ -230,34 +231,307 @@ class DataService:
                 custom_metric_ids=None  # Custom metrics handled by BigQuery
             )
 
-        # Compute calculated metrics (conversion rates, etc.) from volume metrics
-        df = self._compute_calculated_metrics(df, metrics_data)
+        # Total count: from the single scan, else fetched alongside the pivot query
+        if pivot_result is not None and pivot_result.total_count is not None:
+            total_count = pivot_result.total_count
+        elif skip_count:
+            total_count = len(df)
+        else:
+            total_count = results['count']
+
+        return self._build_pivot_response(
+            df, totals_df, total_count, dimensions, metrics_data, custom_metric_ids,
+            available_dimensions=self._get_available_dimensions()
+        )
 
-        # Calculate grand totals for percentage calculations (includes ALL rows, even NULL dimensions)
-        grand_totals = self._calculate_totals(df, metrics_data)
+    def get_pivot_batch_data(
+        self,
+        dimensions: List[str],
+        table_dimensions: List[str],
+        combinations: List[Dict[str, str]],
+        filters: Dict,
+        primary_index: int = 0,
+        limit: int = 100,
+        require_rollup: bool = True,
+        custom_metric_ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get every column of a multi-column pivot in one BigQuery scan.
 
-        # Build response rows (include all rows, NULL/empty dimensions displayed as "(null)"/"(empty)")
-        rows = []
-        for idx, row in df.iterrows():
-            row_data = self._build_pivot_row(row, dimensions, metrics_data, grand_totals, custom_metric_ids)
-            rows.append(row_data)
+        Each column is a combination of table-dimension values. The primary
+        column returns its top rows; the other columns return the same
+        dimension values (as get_pivot_data with dimension_values would).
 
-        # Build the total row (aggregated totals for footer - includes all data)
-        total_row = self._build_total_row(df, dimensions, metrics_data, custom_metric_ids)
+        Args:
+            dimensions: Row dimensions
+            table_dimensions: Dimensions that split the table into columns
+            combinations: Table-dimension values per column, e.g. [{'country': 'US'}, ...]
+            filters: Filter parameters (filters on table dimensions are replaced by the combinations)
+            primary_index: Index of the column whose top rows define the row set
+            limit: Max rows per column
+            require_rollup: If True, require rollup (error if not available)
+            custom_metric_ids: Optional list of custom metric IDs to compute
+
+        Returns:
+            Dict with 'columns' (one pivot response per combination, in order)
+            and 'available_dimensions', or a rollup_required error response
+
+        Raises:
+            ValueError: If the request is not a valid batch pivot
+        """
+        if not dimensions:
+            raise ValueError("At least one row dimension is required")
+        if not table_dimensions:
+            raise ValueError("At least one table dimension is required")
+        if not combinations:
+            raise ValueError("At least one combination is required")
+        if any(d.startswith('custom_') for d in list(dimensions) + list(table_dimensions)):
+            raise ValueError("Custom dimensions are not supported in batch pivots")
+        if set(dimensions) & set(table_dimensions):
+            raise ValueError("Row and table dimensions must not overlap")
+        if not 0 <= primary_index < len(combinations):
+            raise ValueError(f"primary_index {primary_index} is out of range")
+        for combination in combinations:
+            missing = [d for d in table_dimensions if d not in combination]
+            if missing:
+                raise ValueError(f"Combination {combination} is missing table dimensions {missing}")
+
+        metrics_data = self._get_metrics_config()
+        metric_ids = metrics_data.get('all_metric_ids', [])
+
+        # The combinations select each column's table-dimension values, replacing
+        # any base filter on those dimensions
+        dimension_filters = {
+            k: v for k, v in (filters.get('dimension_filters') or {}).items()
+            if k not in table_dimensions
+        }
+        filters = {**filters, 'dimension_filters': dimension_filters}
+
+        # Route on row + table dimensions: they are grouped together
+        all_dimensions = list(dimensions) + list(table_dimensions)
+        routable_filter_dims = {k: v for k, v in dimension_filters.items() if not k.startswith('custom_')}
+        route_decision = self.route_query(
+            dimensions=all_dimensions,
+            metrics=metric_ids,
+            filters=routable_filter_dims if routable_filter_dims else None,
+            require_rollup=require_rollup
+        )
+
+        logger.info(
+            f"Batch pivot routing: dims={dimensions}, table_dims={table_dimensions}, "
+            f"columns={len(combinations)}, use_rollup={route_decision.use_rollup}, "
+            f"reason={route_decision.reason}"
+        )
 
-        # Get total count (unless skipped) - use same table as main query
-        total_count = len(df) if skip_count else self._get_total_count(dimensions, filters, table_path)
+        if require_rollup and not route_decision.use_rollup:
+            return self._rollup_required_response(
+                all_dimensions, routable_filter_dims, metric_ids, route_decision
+            )
+
+        table_path = route_decision.rollup_table_path if route_decision.use_rollup else None
+
+        custom_metrics_info = None
+        schema_config = metrics_data.get('schema_config')
+        if schema_config:
+            try:
+                custom_metrics_info = self._load_custom_metrics_info(schema_config, custom_metric_ids)
+            except Exception as e:
+                logger.error(f"Error loading custom metrics: {e}")
+
+        df = self.bq_service.query_pivot_batch(
+            dimensions=dimensions,
+            table_dimensions=table_dimensions,
+            combinations=combinations,
+            filters=filters,
+            primary_index=primary_index,
+            limit=limit,
+            table_path=table_path,
+            custom_metrics=custom_metrics_info
+        )
 
-        # Get available dimensions from schema
+        # Split the scan into columns by table-dimension values (same string
+        # form the combinations use, NULL as "__NULL__")
+        key_parts = [
+            df[dim].astype(str).where(df[dim].notna(), "__NULL__")
+            for dim in table_dimensions
+        ]
+        column_keys = key_parts[0]
+        for part in key_parts[1:]:
+            column_keys = column_keys + "\x1f" + part
+        column_keys = column_keys.to_numpy()
+        is_total = (df['_pivot_is_total'] == 1).to_numpy()
+
+        helper_columns = list(table_dimensions) + [
+            '_pivot_is_total', '_pivot_total_groups', '_pivot_primary_rank', '_pivot_rank'
+        ]
         available_dimensions = self._get_available_dimensions()
 
+        columns = []
+        for combination in combinations:
+            key = "\x1f".join(str(combination[dim]) for dim in table_dimensions)
+            in_column = column_keys == key
+
+            totals_df = df[in_column & is_total]
+            total_count = int(totals_df['_pivot_total_groups'].iloc[0]) if len(totals_df) > 0 else 0
+            page_df = df[in_column & ~is_total].drop(columns=helper_columns).reset_index(drop=True)
+            totals_df = totals_df.drop(columns=helper_columns).reset_index(drop=True)
+
+            columns.append(self._build_pivot_response(
+                page_df,
+                totals_df if len(totals_df) > 0 else None,
+                total_count,
+                dimensions,
+                metrics_data,
+                custom_metric_ids,
+                available_dimensions=available_dimensions
+            ))
+
         return {
-            'rows': rows,
-            'total': total_row,
+            'columns': columns,
             'available_dimensions': available_dimensions,
-            'total_count': total_count,
         }
 
+    def stream_pivot_export(
+        self,
+        dimensions: List[str],
+        filters: Dict,
+        require_rollup: bool = False,
+        custom_metric_ids: Optional[List[str]] = None
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Stream every pivot group (not just a page) as Arrow record batches.
+
+        The pivot query runs once; result pages are read one at a time and
+        calculated metrics are computed per batch, so memory stays bounded
+        by a page whatever the number of groups.
+
+        Args:
+            dimensions: Dimensions to group by
+            filters: Filter parameters (start_date, end_date, dimension_filters, etc.)
+            require_rollup: If True, fail instead of scanning the base table
+            custom_metric_ids: Optional list of custom metric IDs to compute
+
+        Returns:
+            Iterator of record batches (dimension columns, then metrics)
+
+        Raises:
+            ValueError: If the export is not valid (custom dimensions, no rollup when required)
+        """
+        if any(d.startswith('custom_') for d in dimensions):
+            raise ValueError("Custom dimensions are not supported in exports")
+
+        metrics_data = self._get_metrics_config()
+        metric_ids = metrics_data.get('all_metric_ids', [])
+
+        routable_filter_dims = {
+            k: v for k, v in (filters.get('dimension_filters') or {}).items()
+            if not k.startswith('custom_')
+        }
+        route_decision = self.route_query(
+            dimensions=list(dimensions),
+            metrics=metric_ids,
+            filters=routable_filter_dims or None,
+            require_rollup=require_rollup
+        )
+        if require_rollup and not route_decision.use_rollup:
+            raise ValueError(f"No suitable rollup found for this export: {route_decision.reason}")
+        table_path = route_decision.rollup_table_path if route_decision.use_rollup else None
+
+        custom_metrics_info = None
+        schema_config = metrics_data.get('schema_config')
+        if schema_config and custom_metric_ids:
+            custom_metrics_info = self._load_custom_metrics_info(schema_config, set(custom_metric_ids))
+
+        query = self.bq_service.build_pivot_export_query(
+            dimensions=list(dimensions),
+            filters=filters,
+            table_path=table_path,
+            custom_metrics=custom_metrics_info
+        )
+        # Started here (before streaming) so query errors reach the caller
+        batches = self.bq_service.stream_query(
+            query,
+            query_type='export',
+            endpoint='/api/pivot/export',
+            filters=filters
+        )
+        return self._with_calculated_metrics(batches, metrics_data)
+
+    def _with_calculated_metrics(
+        self,
+        batches: Iterator[pa.RecordBatch],
+        metrics_data: Dict[str, Any]
+    ) -> Iterator[pa.RecordBatch]:
+        """Add calculated metrics to each record batch (columnar, no pandas)."""
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            columns = self._compute_calculated_metrics(
+                dict(zip(batch.schema.names, batch.columns)), metrics_data
+            )
+            yield pa.RecordBatch.from_arrays(
+                [values if isinstance(values, pa.Array) else pa.array(values) for values in columns.values()],
+                names=list(columns.keys())
+            )
+
+    def _rollup_required_response(
+        self,
+        routable_dimensions: List[str],
+        routable_filter_dims: Dict[str, Any],
+        metric_ids: List[str],
+        route_decision: RouteDecision
+    ) -> Dict[str, Any]:
+        """Error response for a pivot that requires a rollup when none is suitable."""
+        # Use routable dimensions (excluding custom_*) for error message
+        routable_filter_dims_list = list(routable_filter_dims.keys())
+        all_required_dims = list(set(routable_dimensions + routable_filter_dims_list))
+
+        # Get available rollups sorted by closeness to the requested configuration
+        available_rollups = []
+        router = self._get_query_router()
+        if router:
+            available_rollups = router.find_suitable_rollups(
+                query_dimensions=routable_dimensions,
+                query_metrics=metric_ids,
+                query_filters=routable_filter_dims if routable_filter_dims else None
+            )
+
+        return {
+            'rows': [],
+            'total': None,
+            'available_dimensions': self._get_available_dimensions(),
+            'total_count': 0,
+            'error': f"No suitable rollup found. Query dimensions: {routable_dimensions}, Filter dimensions: {routable_filter_dims_list}. Reason: {route_decision.reason}. Create a rollup with dimensions {all_required_dims} to enable this query.",
+            'error_type': 'rollup_required',
+            'required_dimensions': all_required_dims,
+            'available_rollups': available_rollups
+        }
+
+    def _load_custom_metrics_info(
+        self,
+        schema_config,
+        custom_metric_ids
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Load custom metric definitions for BigQuery-based computation."""
+        if not custom_metric_ids:
+            return None
+
+        custom_metrics = list(schema_config.custom_metrics.filter(
+            metric_id__in=custom_metric_ids
+        ))
+        if not custom_metrics:
+            return None
+
+        logger.info(f"Using BigQuery computation for custom metrics: {[cm.metric_id for cm in custom_metrics]}")
+        return [
+            {
+                'metric_id': cm.metric_id,
+                'source_metric': cm.source_metric,
+                'aggregation_type': cm.aggregation_type
+            }
+            for cm in custom_metrics
+        ]
+
     def get_dimension_values(
         self,
         dimension: str,
@@ -347,29 +621,17 @@ class DataService:
     def _get_joined_dimension_info(self, dimension_id: str) -> Optional[Dict]:
         """Check if a dimension is a joined dimension and return its info."""
         try:
-            from apps.schemas.models import SchemaConfig, JoinedDimensionStatus
-
-            schema_config = SchemaConfig.objects.filter(
-                bigquery_table=self.bigquery_table
-            ).first()
-
-            if not schema_config:
+            schema = self.bq_service.schema
+            if not schema or dimension_id not in schema.joined_columns_by_id:
                 return None
 
-            # Search for this dimension in joined dimension sources
-            for source in schema_config.joined_dimension_sources.filter(
-                status=JoinedDimensionStatus.READY
-            ).prefetch_related('columns'):
-                for col in source.columns.all():
-                    if col.dimension_id == dimension_id:
-                        return {
-                            'column': col,
-                            'source': source,
-                            'lookup_table_path': source.bq_table_path,
-                            'source_column_name': col.source_column_name
-                        }
-
-            return None
+            col, source = schema.joined_columns_by_id[dimension_id]
+            return {
+                'column': col,
+                'source': source,
+                'lookup_table_path': source.bq_table_path,
+                'source_column_name': col.source_column_name
+            }
         except Exception as e:
             logger.warning(f"Error checking for joined dimension: {e}")
             return None
@@ -426,24 +688,18 @@ class DataService:
                 'error': f"Failed to fetch joined dimension values: {str(e)}"
             }
 
+    @timed_stage('schema')
     def _get_metrics_config(self) -> Dict[str, Any]:
-        """Load metrics configuration from schema."""
+        """Load metrics configuration from the schema snapshot."""
         try:
-            from apps.schemas.models import SchemaConfig
-
-            schema_config = SchemaConfig.objects.filter(
-                bigquery_table=self.bigquery_table
-            ).first()
-
-            if not schema_config:
+            schema = self.bq_service.schema
+            if not schema:
                 return {'calculated_metrics': [], 'all_metric_ids': []}
 
-            calculated_metrics = list(schema_config.calculated_metrics.all())
-
             return {
-                'calculated_metrics': calculated_metrics,
-                'all_metric_ids': [m.metric_id for m in calculated_metrics],
-                'schema_config': schema_config
+                'calculated_metrics': list(schema.metrics),
+                'all_metric_ids': list(schema.metric_ids),
+                'schema_config': schema.schema_config
             }
         except Exception as e:
             logger.warning(f"Could not load metrics config: {e}")
@@ -547,6 +803,55 @@ class DataService:
 
         return df, custom_dim_col
 
+    def _build_pivot_response(
+        self,
+        df: pd.DataFrame,
+        totals_df: Optional[pd.DataFrame],
+        total_count: int,
+        dimensions: List[str],
+        metrics_data: Dict[str, Any],
+        custom_metric_ids: Optional[List[str]],
+        available_dimensions: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Build a pivot response (rows, footer, count) from the queried rows.
+
+        Args:
+            df: Page rows
+            totals_df: One-row grand totals over all groups, or None to total the page
+            total_count: Number of groups across all pages
+            dimensions: Pivot dimensions
+            metrics_data: Metrics configuration
+            custom_metric_ids: Custom metrics to include
+            available_dimensions: Groupable dimensions of the schema
+        """
+        # Compute calculated metrics (conversion rates, etc.) from volume metrics
+        df = self._compute_calculated_metrics(df, metrics_data)
+        if totals_df is not None:
+            totals_df = self._compute_calculated_metrics(totals_df, metrics_data)
+
+        # Calculate grand totals for percentage calculations (includes ALL rows, even NULL dimensions)
+        # Use the true totals over all groups when available, not just this page
+        grand_totals = self._calculate_totals(
+            totals_df if totals_df is not None else df, metrics_data
+        )
+
+        # Build response rows (include all rows, NULL/empty dimensions displayed as "(null)"/"(empty)")
+        rows = self._build_pivot_rows(df, dimensions, metrics_data, grand_totals, custom_metric_ids)
+
+        # Build the total row (aggregated totals for footer - includes all data)
+        total_row = self._build_total_row(
+            df, dimensions, metrics_data, custom_metric_ids,
+            totals_df=totals_df, group_count=total_count if totals_df is not None else None
+        )
+
+        return {
+            'rows': rows,
+            'total': total_row,
+            'available_dimensions': available_dimensions,
+            'total_count': total_count,
+        }
+
     def _calculate_totals(
         self,
         df: pd.DataFrame,
@@ -561,55 +866,90 @@ class DataService:
 
         return totals
 
-    def _build_pivot_row(
+    @timed_stage('rows')
+    def _build_pivot_rows(
         self,
-        row: pd.Series,
+        df: pd.DataFrame,
         dimensions: List[str],
         metrics_data: Dict[str, Any],
         totals: Dict[str, float],
         custom_metric_ids: Optional[List[str]] = None
-    ) -> Dict[str, Any]:
-        """Build a pivot row response dict matching frontend PivotRow interface."""
+    ) -> List[Dict[str, Any]]:
+        """
+        Build pivot row response dicts matching frontend PivotRow interface.
+
+        Works column by column (one conversion per column, no per-row Series).
+        """
+        n = len(df)
+        if n == 0:
+            return []
+
         # Create combined dimension value string (e.g., "Channel A - Country B")
         # Keep raw values: NULL becomes "__NULL__" (converted to IS NULL in queries),
         # empty strings stay as '' (matches directly in queries)
-        dim_parts = []
-        for dim in dimensions:
-            if dim in row.index:
-                val = row[dim]
-                if pd.isna(val):
-                    dim_parts.append("__NULL__")
-                else:
-                    dim_parts.append(str(val))  # Empty strings stay as ''
-        dimension_value = " - ".join(dim_parts) if dim_parts else "All"
+        dim_parts = [
+            df[dim].astype(str).where(df[dim].notna(), "__NULL__").tolist()
+            for dim in dimensions if dim in df.columns
+        ]
+        if dim_parts:
+            dimension_values = [" - ".join(parts) for parts in zip(*dim_parts)]
+        else:
+            dimension_values = ["All"] * n
 
         # Extract metrics (including custom metrics if provided)
-        metrics = self._extract_metrics(row, metrics_data, totals, custom_metric_ids)
+        metric_columns = self._extract_metric_columns(df, metrics_data, totals, custom_metric_ids)
 
         # Calculate percentage of total based on first volume metric
-        percentage_of_total = 0.0
+        percentage_of_total = [0.0] * n
         for metric_id in metrics_data.get('all_metric_ids', []):
-            if metric_id in metrics and metric_id in totals and totals[metric_id] > 0:
-                percentage_of_total = (metrics[metric_id] / totals[metric_id]) * 100
+            if metric_id in metric_columns and metric_id in totals and totals[metric_id] > 0:
+                total_value = totals[metric_id]
+                percentage_of_total = [(value / total_value) * 100 for value in metric_columns[metric_id]]
                 break
 
-        return {
-            'dimension_value': dimension_value,
-            'metrics': metrics,
-            'percentage_of_total': percentage_of_total,
-            'search_term_count': 1,  # Each row represents one dimension combination
-            'has_children': len(dimensions) > 0,  # Can drill down if dimensions selected
-        }
+        metric_names = list(metric_columns.keys())
+        has_children = len(dimensions) > 0  # Can drill down if dimensions selected
+
+        return [
+            {
+                'dimension_value': dimension_value,
+                'metrics': dict(zip(metric_names, values)),
+                'percentage_of_total': pct,
+                'search_term_count': 1,  # Each row represents one dimension combination
+                'has_children': has_children,
+            }
+            for dimension_value, pct, *values in zip(
+                dimension_values, percentage_of_total, *metric_columns.values()
+            )
+        ]
 
     def _build_total_row(
         self,
         df: pd.DataFrame,
         dimensions: List[str],
         metrics_data: Dict[str, Any],
-        custom_metric_ids: Optional[List[str]] = None
+        custom_metric_ids: Optional[List[str]] = None,
+        totals_df: Optional[pd.DataFrame] = None,
+        group_count: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Build the total row with aggregated metrics for footer."""
-        if df.empty:
+        """
+        Build the total row with aggregated metrics for footer.
+
+        Args:
+            df: Page rows
+            dimensions: Pivot dimensions
+            metrics_data: Metrics configuration
+            custom_metric_ids: Custom metrics to include
+            totals_df: One-row grand totals over all groups (from the pivot scan).
+                      When absent, totals are summed over the page rows.
+            group_count: Number of groups across all pages (with totals_df)
+        """
+        if totals_df is not None and group_count:
+            source_df, search_term_count = totals_df, group_count
+        else:
+            source_df, search_term_count = df, len(df)
+
+        if df.empty and source_df is df:
             return {
                 'dimension_value': 'Total',
                 'metrics': {},
@@ -623,11 +963,11 @@ class DataService:
         if custom_metric_ids:
             all_metric_ids.extend(custom_metric_ids)
 
-        # Calculate totals by summing all rows
+        # Calculate totals by summing all rows (a totals row sums to itself)
         total_metrics = {}
         for metric_id in all_metric_ids:
-            if metric_id in df.columns:
-                total_metrics[metric_id] = safe_float(df[metric_id].sum())
+            if metric_id in source_df.columns:
+                total_metrics[metric_id] = safe_float(source_df[metric_id].sum())
 
         # Add percentage metrics (all should be 100% for the total row) - only for schema metrics
         for metric_id in metrics_data.get('all_metric_ids', []):
@@ -639,43 +979,31 @@ class DataService:
             'dimension_value': 'Total',
             'metrics': total_metrics,
             'percentage_of_total': 100.0,
-            'search_term_count': len(df),
+            'search_term_count': search_term_count,
             'has_children': False,
         }
 
     def _get_available_dimensions(self) -> List[str]:
         """Get list of available dimension IDs from schema."""
         try:
-            from apps.schemas.models import SchemaConfig, JoinedDimensionStatus
-
-            schema_config = SchemaConfig.objects.filter(
-                bigquery_table=self.bigquery_table
-            ).first()
-
-            if not schema_config:
+            schema = self.bq_service.schema
+            if not schema:
                 return []
 
-            # Get regular dimensions
-            dims = [d.dimension_id for d in schema_config.dimensions.filter(is_groupable=True)]
-
-            # Get joined dimensions from ready sources
-            for source in schema_config.joined_dimension_sources.filter(status=JoinedDimensionStatus.READY):
-                for col in source.columns.filter(is_groupable=True):
-                    dims.append(col.dimension_id)
-
-            return dims
+            # Regular dimensions, then joined dimensions from ready sources
+            return list(schema.groupable_dimension_ids)
         except Exception as e:
             logger.warning(f"Could not get available dimensions: {e}")
             return []
 
-    def _extract_metrics(
+    def _extract_metric_columns(
         self,
-        row: pd.Series,
+        df: pd.DataFrame,
         metrics_data: Dict[str, Any],
         totals: Dict[str, float],
         custom_metric_ids: Optional[List[str]] = None
-    ) -> Dict[str, Any]:
-        """Extract metric values from a row."""
+    ) -> Dict[str, List]:
+        """Extract serialized metric value lists (and their _pct columns) from a DataFrame."""
         metrics = {}
 
         # Build list of all metric IDs to extract (schema metrics + custom metrics)
@@ -685,25 +1013,21 @@ class DataService:
 
         # Extract all metric values
         for metric_id in all_metric_ids:
-            if metric_id in row.index:
-                value = row[metric_id]
-                if pd.isna(value):
-                    metrics[metric_id] = 0.0
-                elif 'int' in str(type(value).__name__).lower():
-                    metrics[metric_id] = int(value)
-                else:
-                    metrics[metric_id] = safe_float(value)
+            if metric_id in df.columns:
+                metrics[metric_id] = metric_values(df[metric_id])
 
         # Add percentage metrics (only for schema metrics, not custom)
         for metric_id in metrics_data.get('all_metric_ids', []):
             if metric_id in metrics:
                 pct_key = f"{metric_id}_pct"
-                row_value = metrics.get(metric_id, 0)
                 total_value = totals.get(metric_id, 0)
                 if total_value > 0:
-                    metrics[pct_key] = round(safe_float((row_value / total_value * 100)), 2)
+                    metrics[pct_key] = [
+                        round(safe_float((row_value / total_value * 100)), 2)
+                        for row_value in metrics[metric_id]
+                    ]
                 else:
-                    metrics[pct_key] = 0.0
+                    metrics[pct_key] = [0.0] * len(df)
 
         return metrics
 
@@ -761,34 +1085,24 @@ class DataService:
     def _get_query_router(self) -> Optional[QueryRouterService]:
         """Get a query router service instance."""
         try:
-            from apps.schemas.models import SchemaConfig
-            from apps.rollups.models import RollupConfig
-
-            schema_config = SchemaConfig.objects.filter(
-                bigquery_table=self.bigquery_table
-            ).first()
-
-            if not schema_config:
+            schema = self.bq_service.schema
+            if not schema:
                 return None
 
-            rollup_config = None
-            try:
-                rollup_config = RollupConfig.objects.get(
-                    bigquery_table=self.bigquery_table
-                )
-            except RollupConfig.DoesNotExist:
-                pass
-
+            index = get_rollup_index(self.bigquery_table.id, schema)
             return QueryRouterService(
-                rollup_config=rollup_config,
-                schema_config=schema_config,
+                rollup_config=index.rollup_config,
+                schema_config=schema.schema_config,
                 source_project_id=self.bigquery_table.project_id,
-                source_dataset=self.bigquery_table.dataset
+                source_dataset=self.bigquery_table.dataset,
+                schema=schema,
+                index=index
             )
         except Exception as e:
             logger.warning(f"Could not create query router: {e}")
             return None
 
+    @timed_stage('route')
     def route_query(
         self,
         dimensions: List[str],
@@ -822,25 +1136,28 @@ class DataService:
             require_rollup=require_rollup
         )
 
+    @timed_stage('calc_metrics')
     def _compute_calculated_metrics(
         self,
-        df: pd.DataFrame,
+        df: Union[pd.DataFrame, Columns],
         metrics_data: Dict[str, Any]
-    ) -> pd.DataFrame:
+    ) -> Union[pd.DataFrame, Columns]:
         """
         Compute calculated metrics in Python from volume metrics.
 
         Conversion metrics (non-volume) are computed after querying volumes.
 
         Args:
-            df: DataFrame with volume metrics
+            df: DataFrame, or column mapping (Arrow results), with volume metrics
             metrics_data: Metrics configuration
 
         Returns:
-            DataFrame with calculated metrics added
+            The same DataFrame/column mapping with calculated metrics added
         """
-        if df.empty:
+        n = len(df) if isinstance(df, pd.DataFrame) else num_rows(df)
+        if n == 0:
             return df
+        available_columns = set(df.columns if isinstance(df, pd.DataFrame) else df.keys())
 
         calculated_metrics = metrics_data.get('calculated_metrics', [])
 
@@ -858,7 +1175,7 @@ class DataService:
                 depends_on = re.findall(r'\{(\w+)\}', formula)
 
             # Check all dependencies are available
-            missing_deps = [dep for dep in depends_on if dep not in df.columns]
+            missing_deps = [dep for dep in depends_on if dep not in available_columns]
             if missing_deps:
                 logger.warning(f"Skipping metric '{metric_id}': missing dependencies {missing_deps}")
                 continue
@@ -872,27 +1189,31 @@ class DataService:
                 df[metric_id] = result_values
             except Exception as e:
                 logger.warning(f"Failed to compute metric {metric_id}: {e}")
-                df[metric_id] = 0.0
+                df[metric_id] = np.zeros(n)
+            available_columns.add(metric_id)
 
         return df
 
     def _evaluate_formula(
         self,
-        df: pd.DataFrame,
+        df: Union[pd.DataFrame, Columns],
         formula: str,
         depends_on: List[str]
-    ) -> pd.Series:
+    ) -> np.ndarray:
         """
-        Evaluate a metric formula.
+        Evaluate a metric formula on NumPy arrays of the source columns.
 
         Args:
-            df: DataFrame with source metrics
+            df: DataFrame or column mapping with source metrics
             formula: Formula like "{numerator} / {denominator}"
             depends_on: List of metric IDs the formula depends on
 
         Returns:
-            Series with computed values
+            Array with computed values
         """
+        n = len(df) if isinstance(df, pd.DataFrame) else num_rows(df)
+        source = {dep: numeric_array(df[dep]) for dep in depends_on}
+
         expr = formula
 
         for dep in depends_on:
@@ -907,16 +1228,47 @@ class DataService:
         )
 
         def safe_divide(num, denom):
-            result = num / denom
-            result = result.replace([float('inf'), float('-inf')], 0.0)
-            result = result.fillna(0.0)
-            return result
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = np.divide(np.asarray(num, dtype=np.float64), np.asarray(denom, dtype=np.float64))
+            return np.nan_to_num(result, nan=0.0, posinf=0.0, neginf=0.0)
 
         try:
-            return eval(expr, {'df': df, 'safe_divide': safe_divide})
+            result = np.asarray(eval(expr, {'df': source, 'safe_divide': safe_divide}))
+            if result.ndim == 0:
+                result = np.full(n, result)
+            return result
         except Exception as e:
             logger.warning(f"Formula evaluation failed for '{formula}': {e}")
-            return pd.Series([0.0] * len(df))
+            return np.zeros(n)
+
+    def _get_cube_totals(
+        self,
+        rollup,
+        metrics: List[str],
+        filters: Dict
+    ) -> Optional[Dict[str, float]]:
+        """
+        Sum metrics from the in-process cube of a rollup (see rollup_cube.py).
+
+        Returns:
+            Dict of metric_id -> total, or None if the rollup has no cube or
+            the cube cannot answer these metrics and filters
+        """
+        try:
+            cube = get_rollup_cubes().get(rollup, self.bq_service)
+            if cube is None:
+                return None
+            start_date, end_date = self.bq_service.resolve_date_range(
+                filters.get('start_date'),
+                filters.get('end_date'),
+                filters.get('date_range_type', 'absolute'),
+                filters.get('relative_date_preset')
+            )
+            with timed('cube'):
+                return cube.totals(metrics, start_date, end_date, filters.get('dimension_filters'))
+        except Exception as e:
+            logger.warning(f"Cube lookup failed for rollup {rollup.name}: {e}")
+            return None
 
     def _get_baseline_totals(
         self,
@@ -926,7 +1278,8 @@ class DataService:
         """
         Get baseline totals from the date-only rollup.
 
-        Used to detect metric inflation when grouping by dimensions.
+        Used to detect metric inflation when grouping by dimensions. Served
+        from the rollup's cube when it has one, otherwise queried.
 
         Args:
             metrics: Metric IDs to fetch
@@ -939,13 +1292,17 @@ class DataService:
         if not router:
             return None
 
-        baseline_path = router.get_baseline_rollup_path()
-        if not baseline_path:
+        baseline = router.find_simplest_rollup()
+        if not baseline:
             return None
 
+        totals = self._get_cube_totals(baseline, metrics, filters)
+        if totals is not None:
+            return totals
+
         try:
             return self.bq_service.query_rollup_aggregates(
-                rollup_table_path=baseline_path,
+                rollup_table_path=baseline.full_rollup_path,
                 metric_ids=metrics,
                 start_date=filters.get('start_date'),
                 end_date=filters.get('end_date'),
@@ -1060,6 +1417,16 @@ class DataService:
         # Determine table path
         table_path = route_decision.rollup_table_path if route_decision.use_rollup else None
 
+        if route_decision.use_rollup:
+            # Rollup KPIs are the volume metric sums: serve them from the cube when possible
+            volume_metric_ids = [
+                m.metric_id for m in metrics_data.get('calculated_metrics', []) if m.category == 'volume'
+            ]
+            if route_decision.rollup is not None and volume_metric_ids:
+                totals = self._get_cube_totals(route_decision.rollup, volume_metric_ids, filters)
+                if totals is not None:
+                    return totals
+
         return self.bq_service.query_kpi_metrics(filters, table_path)
 
     def get_trends_data(
@@ -1119,29 +1486,15 @@ class DataService:
         # Determine table path
         table_path = route_decision.rollup_table_path if route_decision.use_rollup else None
 
-        df = self.bq_service.query_timeseries(filters, granularity, table_path)
-
-        df = self._compute_calculated_metrics(df, metrics_data)
-
-        rows = []
-        for idx, row in df.iterrows():
-            row_data = {
-                'date': str(row['date']) if pd.notna(row.get('date')) else None
-            }
-
-            for col in df.columns:
-                if col != 'date':
-                    value = row[col]
-                    if pd.isna(value):
-                        row_data[col] = 0.0
-                    elif 'int' in str(type(value).__name__).lower():
-                        row_data[col] = int(value)
-                    else:
-                        row_data[col] = safe_float(value)
+        table = self.bq_service.query_timeseries(filters, granularity, table_path, result_format='arrow')
 
-            rows.append(row_data)
+        columns = self._compute_calculated_metrics(table_columns(table), metrics_data)
 
-        return rows
+        return columns_to_rows(
+            columns,
+            key_column='date',
+            format_key=lambda value: str(value) if value is not None else None
+        )
 
     def get_dimension_breakdown(
         self,
@@ -1202,29 +1555,13 @@ class DataService:
         # Determine table path
         table_path = route_decision.rollup_table_path if route_decision.use_rollup else None
 
-        df = self.bq_service.query_dimension_breakdown(dimension, filters, limit, table_path)
-
-        df = self._compute_calculated_metrics(df, metrics_data)
-
-        rows = []
-        for idx, row in df.iterrows():
-            row_data = {
-                'dimension_value': str(row.get('dimension_value', ''))
-            }
-
-            for col in df.columns:
-                if col != 'dimension_value':
-                    value = row[col]
-                    if pd.isna(value):
-                        row_data[col] = 0.0
-                    elif 'int' in str(type(value).__name__).lower():
-                        row_data[col] = int(value)
-                    else:
-                        row_data[col] = safe_float(value)
+        table = self.bq_service.query_dimension_breakdown(
+            dimension, filters, limit, table_path, result_format='arrow'
+        )
 
-            rows.append(row_data)
+        columns = self._compute_calculated_metrics(table_columns(table), metrics_data)
 
-        return rows
+        return columns_to_rows(columns, key_column='dimension_value', format_key=str, default_key='')
 
     def get_search_terms(
         self,
@@ -1285,29 +1622,13 @@ class DataService:
         # Determine table path
         table_path = route_decision.rollup_table_path if route_decision.use_rollup else None
 
-        df = self.bq_service.query_search_terms(filters, limit, sort_by, table_path)
-
-        df = self._compute_calculated_metrics(df, metrics_data)
-
-        rows = []
-        for idx, row in df.iterrows():
-            row_data = {
-                'search_term': str(row.get('search_term', ''))
-            }
-
-            for col in df.columns:
-                if col != 'search_term':
-                    value = row[col]
-                    if pd.isna(value):
-                        row_data[col] = 0.0
-                    elif 'int' in str(type(value).__name__).lower():
-                        row_data[col] = int(value)
-                    else:
-                        row_data[col] = safe_float(value)
+        table = self.bq_service.query_search_terms(
+            filters, limit, sort_by, table_path, result_format='arrow'
+        )
 
-            rows.append(row_data)
+        columns = self._compute_calculated_metrics(table_columns(table), metrics_data)
 
-        return rows
+        return columns_to_rows(columns, key_column='search_term', format_key=str, default_key='')
 
     def get_filter_options(self, filters: Optional[Dict] = None) -> Dict[str, List[str]]:
         """
@@ -1328,15 +1649,21 @@ class DataService:
             return options
 
         try:
-            filterable_dims = schema_config.dimensions.filter(is_filterable=True)
-
-            for dim in filterable_dims:
-                values = self.bq_service.query_dimension_values(
-                    dimension=dim.column_name,
-                    filters=filters or {},
-                    limit=100
+            filterable_dims = self.bq_service.schema.filterable_dimensions
+
+            # One independent query per dimension: submit them all at once
+            tasks = {
+                dim.dimension_id: (
+                    lambda column_name=dim.column_name: self.bq_service.query_dimension_values(
+                        dimension=column_name,
+                        filters=filters or {},
+                        limit=100
+                    )
                 )
-                options[dim.dimension_id] = values
+                for dim in filterable_dims
+            }
+            if tasks:
+                options.update(self._run_concurrently(tasks))
 
         except Exception as e:
             logger.warning(f"Failed to get filter options: {e}")
@@ -0,0 +1,128 @@
+"""
+Streaming encoders for query result exports.
+
+Each writer turns an iterator of Arrow record batches into an iterator of
+byte chunks for a StreamingHttpResponse, encoding one batch at a time so
+memory stays bounded by a batch however many rows are exported.
+
+Formats:
+- csv: header once, then the rows of each batch
+- ndjson: one JSON object per line
+- parquet: one row group per batch, footer written at the end
+"""
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Format -> (content type, file extension)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands written bytes back as chunks.
+
+    tell() keeps counting across drains: the Parquet footer records absolute
+    offsets of each row group.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def write_csv(batches: Iterable[pa.RecordBatch]) -> Iterator[bytes]:
+    """Encode record batches as CSV (header from the first batch)."""
+    include_header = True
+    for batch in batches:
+        sink = _ChunkSink()
+        pa_csv.write_csv(batch, sink, pa_csv.WriteOptions(include_header=include_header))
+        include_header = False
+        yield sink.drain()
+
+
+def write_ndjson(batches: Iterable[pa.RecordBatch]) -> Iterator[bytes]:
+    """Encode record batches as newline-delimited JSON."""
+    for batch in batches:
+        lines = [json.dumps(row, default=_json_default) for row in batch.to_pylist()]
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def write_parquet(batches: Iterable[pa.RecordBatch]) -> Iterator[bytes]:
+    """Encode record batches as a Parquet file, one row group per batch."""
+    sink = _ChunkSink()
+    writer = None
+    for batch in batches:
+        table = pa.Table.from_batches([batch])
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        elif table.schema != writer.schema:
+            # e.g. a column that is all NULL in one page
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+        yield sink.drain()
+
+    if writer is None:
+        # No rows: still produce a valid (empty) Parquet file
+        writer = pq.ParquetWriter(sink, pa.schema([]))
+    writer.close()
+    yield sink.drain()
+
+
+WRITERS: Dict[str, Callable[[Iterable[pa.RecordBatch]], Iterator[bytes]]] = {
+    'csv': write_csv,
+    'ndjson': write_ndjson,
+    'parquet': write_parquet,
+}
+
+
+def encode_batches(batches: Iterable[pa.RecordBatch], export_format: str) -> Iterator[bytes]:
+    """
+    Encode record batches in an export format.
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if export_format not in WRITERS:
+        raise ValueError(
+            f"Unsupported export format '{export_format}'. "
+            f"Supported: {', '.join(EXPORT_FORMATS)}"
+        )
+    return WRITERS[export_format](batches)
@@ -351,7 +351,7 @@ class PostProcessingService:
             return df
 
         # Group by the custom dimension and sum metrics
-        # Keep original column name so _build_pivot_row can find it
+        # Keep original column name so _build_pivot_rows can find it
         grouped = df.groupby(group_col, as_index=False)[metric_cols].sum()
 
         return grouped
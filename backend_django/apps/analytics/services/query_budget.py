@@ -0,0 +1,234 @@
+"""
+Pre-flight cost control for BigQuery queries.
+
+Before a query job starts, its scan size is estimated with a BigQuery dry run
+(cached by SQL hash) and checked against:
+- QUERY_MAX_BYTES_PER_QUERY: cap on any single query
+- QUERY_BUDGET_USER_BYTES / QUERY_BUDGET_TABLE_BYTES / QUERY_BUDGET_ENDPOINT_BYTES:
+  bytes billed per user, table and endpoint over the rolling
+  QUERY_BUDGET_WINDOW_SECONDS window
+
+Usage is read from the hourly audit.QueryUsageSummary rows, so the window
+is widened to the start of its first hour, plus this worker's billed
+records that are not in the summary yet (queued or dropped by the query log
+writer). Other workers' queued records count once they are flushed.
+
+A query that would exceed a limit raises QueryBudgetError before it runs.
+A limit of 0 disables that check; with every limit at 0 no dry run is made.
+
+The estimator is pluggable (settings.QUERY_COST_ESTIMATOR: 'dry_run' or a
+dotted path), e.g. to substitute a local estimator where BigQuery is not
+reachable.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Optional, TYPE_CHECKING
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from google.cloud import bigquery
+
+from apps.core.exceptions import QueryBudgetError
+from .query_cache_service import QueryCacheService
+from .query_log_writer import get_query_log_writer
+
+if TYPE_CHECKING:
+    from apps.tables.models import BigQueryTable
+    from apps.users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+def format_bytes(num_bytes: int) -> str:
+    """Human-readable byte count (e.g. '1.5 GB')."""
+    value = float(num_bytes)
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if value < 1024 or unit == 'TB':
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class BaseCostEstimator:
+    """Estimates the bytes a query will process."""
+
+    def estimate_bytes(self, client: bigquery.Client, query: str) -> int:
+        raise NotImplementedError
+
+
+class DryRunCostEstimator(BaseCostEstimator):
+    """BigQuery dry run: validates the query and reports bytes processed, free of charge."""
+
+    def estimate_bytes(self, client: bigquery.Client, query: str) -> int:
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        job = client.query(query, job_config=job_config)
+        return int(job.total_bytes_processed or 0)
+
+
+ESTIMATORS = {
+    'dry_run': DryRunCostEstimator,
+}
+
+
+def load_estimator(name: Optional[str] = None) -> BaseCostEstimator:
+    """
+    Instantiate the configured cost estimator.
+
+    Args:
+        name: 'dry_run' or a dotted path to a BaseCostEstimator subclass.
+              Defaults to settings.QUERY_COST_ESTIMATOR.
+    """
+    name = name or getattr(settings, 'QUERY_COST_ESTIMATOR', 'dry_run')
+    estimator_class = ESTIMATORS.get(name) or import_string(name)
+    return estimator_class()
+
+
+class QueryBudgetService:
+    """Checks query estimates against per-query limits and rolling byte budgets."""
+
+    CACHE_PREFIX = 'bq_dry_run:'
+
+    def __init__(self, estimator: Optional[BaseCostEstimator] = None):
+        self.estimator = estimator or load_estimator()
+        self.max_bytes_per_query = settings.QUERY_MAX_BYTES_PER_QUERY
+        self.budgets = {
+            'user': settings.QUERY_BUDGET_USER_BYTES,
+            'table': settings.QUERY_BUDGET_TABLE_BYTES,
+            'endpoint': settings.QUERY_BUDGET_ENDPOINT_BYTES,
+        }
+        self.window_seconds = settings.QUERY_BUDGET_WINDOW_SECONDS
+        self.estimate_ttl = settings.QUERY_DRY_RUN_CACHE_SECONDS
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_bytes_per_query or any(self.budgets.values()))
+
+    @property
+    def budgets_enabled(self) -> bool:
+        """Whether any rolling budget is set (and so usage is ever read)."""
+        return any(self.budgets.values())
+
+    def estimate(self, client: bigquery.Client, query: str) -> int:
+        """Estimated bytes processed, cached by normalized SQL hash."""
+        key = f"{self.CACHE_PREFIX}{QueryCacheService.sql_to_cache_key(query)}"
+        estimated = cache.get(key)
+        if estimated is None:
+            estimated = self.estimator.estimate_bytes(client, query)
+            cache.set(key, estimated, self.estimate_ttl)
+        return estimated
+
+    def check(
+        self,
+        client: bigquery.Client,
+        query: str,
+        user: Optional['User'],
+        bigquery_table: Optional['BigQueryTable'],
+        endpoint: str
+    ) -> int:
+        """
+        Verify a query fits every limit before it runs.
+
+        Returns:
+            Estimated bytes processed (0 when checks are disabled or the estimate failed)
+
+        Raises:
+            QueryBudgetError: code 'query_too_large' or 'budget_exceeded'
+        """
+        if not self.enabled:
+            return 0
+
+        try:
+            estimated = self.estimate(client, query)
+        except Exception as e:
+            # Invalid SQL also fails the dry run: let the real job report it
+            logger.warning(f"Dry run failed, skipping budget check: {e}")
+            return 0
+
+        if self.max_bytes_per_query and estimated > self.max_bytes_per_query:
+            raise QueryBudgetError(
+                f"Query would process {format_bytes(estimated)}, above the "
+                f"{format_bytes(self.max_bytes_per_query)} per-query limit. "
+                f"Narrow the date range or filters, or use a rollup.",
+                code='query_too_large',
+                details={
+                    'estimated_bytes': estimated,
+                    'limit_bytes': self.max_bytes_per_query,
+                }
+            )
+
+        for scope, limit in self.budgets.items():
+            if not limit:
+                continue
+
+            used = self.usage(scope, user, bigquery_table, endpoint)
+            if used is None or used + estimated <= limit:
+                continue
+
+            raise QueryBudgetError(
+                f"Query would process {format_bytes(estimated)} but only "
+                f"{format_bytes(max(limit - used, 0))} of the {format_bytes(limit)} {scope} "
+                f"budget remains in the current window.",
+                code='budget_exceeded',
+                details={
+                    'scope': scope,
+                    'estimated_bytes': estimated,
+                    'used_bytes': used,
+                    'limit_bytes': limit,
+                    'window_seconds': self.window_seconds,
+                }
+            )
+
+        return estimated
+
+    def usage(
+        self,
+        scope: str,
+        user: Optional['User'],
+        bigquery_table: Optional['BigQueryTable'],
+        endpoint: str
+    ) -> Optional[int]:
+        """
+        Bytes billed in the rolling window for a budget scope.
+
+        Returns:
+            Bytes billed, or None if the scope does not apply (e.g. anonymous user)
+        """
+        from apps.audit.models import QueryUsageSummary
+
+        since = timezone.now() - timedelta(seconds=self.window_seconds)
+        summaries = QueryUsageSummary.objects.filter(
+            hour__gte=since.replace(minute=0, second=0, microsecond=0)
+        )
+        unrecorded = {}
+
+        if scope == 'user':
+            if not user or not getattr(user, 'is_authenticated', False):
+                return None
+            summaries = summaries.filter(user_id=user.pk)
+            unrecorded['user_id'] = user.pk
+        elif scope == 'table':
+            if bigquery_table is None:
+                return None
+            summaries = summaries.filter(bigquery_table_id=bigquery_table.pk)
+            unrecorded['bigquery_table_id'] = bigquery_table.pk
+        else:
+            summaries = summaries.filter(endpoint=endpoint)
+            unrecorded['endpoint'] = endpoint
+
+        recorded = summaries.aggregate(total=Sum('bytes_billed'))['total'] or 0
+        return recorded + get_query_log_writer().unrecorded_bytes_billed(since, **unrecorded)
+
+
+# Global instance
+_query_budget: Optional[QueryBudgetService] = None
+
+
+def get_query_budget() -> QueryBudgetService:
+    """Get the query budget service instance (singleton)."""
+    global _query_budget
+    if _query_budget is None:
+        _query_budget = QueryBudgetService()
+    return _query_budget
@@ -0,0 +1,1036 @@
+"""
+Storage backends for QueryCacheService.
+
+QueryCacheService decides what to cache (SQL hash -> result); a backend
+decides where entries live and how they are indexed, counted and evicted.
+
+Backends:
+- DatabaseCacheBackend: audit.CacheEntry rows, shared by every gunicorn
+  worker and surviving restarts. Size-bounded with LRU/LFU eviction.
+- DjangoCacheBackend: Django's cache framework (per-process with LocMemCache).
+
+Select with settings.QUERY_CACHE_BACKEND ('database', 'django' or a dotted path).
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional, Dict, List, Any, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class BaseQueryCacheBackend:
+    """Interface every query cache backend implements."""
+
+    def get(self, cache_key: str) -> Optional[Any]:
+        """Return the cached result and record the hit, or None on miss."""
+        raise NotImplementedError
+
+    def set(
+        self,
+        cache_key: str,
+        query_type: str,
+        table_id: str,
+        sql_query: str,
+        result: Any,
+        row_count: Optional[int] = None
+    ) -> bool:
+        """Store a result. Returns True on success."""
+        raise NotImplementedError
+
+    def clear_all(self) -> int:
+        raise NotImplementedError
+
+    def clear_by_table(self, table_id: str) -> int:
+        raise NotImplementedError
+
+    def clear_by_query_type(self, query_type: str) -> int:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict:
+        raise NotImplementedError
+
+    @staticmethod
+    def _result_size(result: Any) -> int:
+        """Serialized size of a result (dates/decimals from BigQuery are not JSON-native)."""
+        return len(json.dumps(result, default=str).encode('utf-8'))
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {
+            'total_entries': 0,
+            'total_size_bytes': 0,
+            'total_size_mb': 0,
+            'total_hits': 0,
+            'avg_hits_per_entry': 0,
+            'oldest_entry': None,
+            'newest_entry': None,
+            'by_table': [],
+            'by_query_type': []
+        }
+
+
+class DjangoCacheBackend(BaseQueryCacheBackend):
+    """
+    Query cache stored in Django's cache framework.
+
+    Metadata is stored per entry (no global index blob), hit counts use the
+    backend's atomic incr, and entries are indexed per table and per query
+    type through append-only logs, so hits, clears and stats never rewrite
+    a structure shared by every entry.
+
+    Each index value's log lives in a generation. Clearing or compacting it
+    moves the value to a new generation (an atomic incr) and then retires
+    the old one, so no counter is ever reset while other workers append.
+    Writers re-check the generation after indexing an entry; if it moved on
+    meanwhile, the entry is deleted rather than left unindexed (dropping a
+    cache entry is always safe). Compaction rewrites a log from its live
+    members when a clear through the other index kind removed some of them,
+    and from get_stats once a log has grown to COMPACT_RATIO times its length
+    after the last compaction (members the cache evicted).
+    """
+
+    # Cache key prefixes
+    CACHE_PREFIX = 'bq_cache:'          # Cached result payload
+    META_PREFIX = 'bq_cache_meta:'      # Per-entry metadata record
+    HITS_PREFIX = 'bq_cache_hits:'      # Per-entry atomic hit counter
+    ATIME_PREFIX = 'bq_cache_atime:'    # Per-entry last access time
+    INDEX_PREFIX = 'bq_cache_idx:'      # Secondary indexes (append-only logs)
+    STATS_PREFIX = 'bq_cache_stats:'    # Aggregate counters per index value
+
+    # Max keys per get_many/set_many/delete_many round-trip
+    BATCH_SIZE = 500
+
+    # Compact a log once it is this many times its length after the last compaction...
+    COMPACT_RATIO = 2
+    # ...and at least this long
+    COMPACT_MIN_LENGTH = 64
+    # A compactor that died releases its lock after this
+    COMPACT_LOCK_SECONDS = 60
+    # Counters of a retired generation that late writers recreated expire after this
+    RETIRED_KEY_SECONDS = 300
+
+    # Aggregates kept per log generation (hits are kept per index value)
+    GENERATION_STATS = ('entries', 'size_bytes', 'oldest', 'newest')
+
+    def _get_cache_key(self, key: str) -> str:
+        """Get prefixed cache key."""
+        return f"{self.CACHE_PREFIX}{key}"
+
+    def _entry_keys(self, cache_key: str) -> List[str]:
+        """All storage keys belonging to a single cache entry."""
+        return [
+            self._get_cache_key(cache_key),
+            f"{self.META_PREFIX}{cache_key}",
+            f"{self.HITS_PREFIX}{cache_key}",
+            f"{self.ATIME_PREFIX}{cache_key}",
+        ]
+
+    def _stat_key(self, kind: str, value: str, field: str, generation: Optional[int] = None) -> str:
+        """Key of an aggregate: hits per index value, the GENERATION_STATS per log generation."""
+        if generation is None:
+            return f"{self.STATS_PREFIX}{kind}:{value}:{field}"
+        return f"{self.STATS_PREFIX}{kind}:{value}:g{generation}:{field}"
+
+    def _generation_key(self, kind: str, value: str) -> str:
+        return f"{self.INDEX_PREFIX}{kind}:{value}:gen"
+
+    def _index_count_key(self, kind: str, value: str, generation: int) -> str:
+        return f"{self.INDEX_PREFIX}{kind}:{value}:g{generation}:n"
+
+    def _index_member_key(self, kind: str, value: str, generation: int, position: int) -> str:
+        return f"{self.INDEX_PREFIX}{kind}:{value}:g{generation}:{position}"
+
+    def _index_marker_key(self, kind: str, value: str, generation: int, cache_key: str) -> str:
+        """Set once an entry is in a generation's log, so it is appended only once."""
+        return f"{self.INDEX_PREFIX}{kind}:{value}:g{generation}:has:{cache_key}"
+
+    def _index_compacted_key(self, kind: str, value: str) -> str:
+        """Log length after its last compaction."""
+        return f"{self.INDEX_PREFIX}{kind}:{value}:compacted"
+
+    def _compact_lock_key(self, kind: str, value: str) -> str:
+        return f"{self.INDEX_PREFIX}{kind}:{value}:compacting"
+
+    def _registry_count_key(self, kind: str) -> str:
+        return f"{self.INDEX_PREFIX}{kind}s:n"
+
+    def _registry_member_key(self, kind: str, position: int) -> str:
+        return f"{self.INDEX_PREFIX}{kind}s:{position}"
+
+    def _incr(self, key: str, delta: int = 1) -> int:
+        """
+        Atomically add delta to a counter, creating it if missing.
+
+        Uses the backend's native incr/decr so concurrent workers never
+        overwrite each other's updates.
+        """
+        if delta == 0:
+            return cache.get(key) or 0
+        cache.add(key, 0, timeout=None)
+        try:
+            if delta > 0:
+                return cache.incr(key, delta)
+            return cache.decr(key, -delta)
+        except ValueError:
+            # Counter was evicted between add() and incr(); recreate it
+            cache.add(key, max(delta, 0), timeout=None)
+            return max(delta, 0)
+
+    def _get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Batched cache.get_many."""
+        found = {}
+        for i in range(0, len(keys), self.BATCH_SIZE):
+            found.update(cache.get_many(keys[i:i + self.BATCH_SIZE]))
+        return found
+
+    def _set_many(self, values: Dict[str, Any]) -> None:
+        """Batched cache.set_many (no expiration)."""
+        items = list(values.items())
+        for i in range(0, len(items), self.BATCH_SIZE):
+            cache.set_many(dict(items[i:i + self.BATCH_SIZE]), timeout=None)
+
+    def _delete_many(self, keys: List[str]) -> None:
+        """Batched cache.delete_many."""
+        for i in range(0, len(keys), self.BATCH_SIZE):
+            cache.delete_many(keys[i:i + self.BATCH_SIZE])
+
+    def _read_log(self, count_key: str, member_key_fn) -> List[str]:
+        """Read all values of an append-only log, de-duplicated, in order."""
+        count = cache.get(count_key) or 0
+        if not count:
+            return []
+        member_keys = [member_key_fn(i) for i in range(1, count + 1)]
+        found = self._get_many(member_keys)
+        values = []
+        seen = set()
+        for key in member_keys:
+            value = found.get(key)
+            if value is not None and value not in seen:
+                seen.add(value)
+                values.append(value)
+        return values
+
+    def _registered_values(self, kind: str) -> List[str]:
+        """All table IDs or query types that have ever held entries."""
+        return self._read_log(
+            self._registry_count_key(kind),
+            lambda i: self._registry_member_key(kind, i)
+        )
+
+    def _register(self, kind: str, value: str) -> None:
+        """Record a table ID / query type in its registry (once)."""
+        if cache.add(f"{self.INDEX_PREFIX}{kind}:{value}:registered", True, timeout=None):
+            position = self._incr(self._registry_count_key(kind))
+            cache.set(self._registry_member_key(kind, position), value, timeout=None)
+
+    def _generation(self, kind: str, value: str) -> int:
+        """Current log generation of an index value."""
+        return cache.get(self._generation_key(kind, value)) or 0
+
+    def _add_to_index(self, kind: str, value: str, entries: List[Tuple[str, Dict]]) -> bool:
+        """
+        Index entries (cache key, metadata) under one table or query type.
+
+        Entries are appended to the current generation's log (once each, at
+        positions reserved with one atomic incr) and counted in its
+        aggregates. If a clear or compaction retired that generation
+        meanwhile, it may not have seen them, so they are retracted and
+        their cache entries deleted.
+
+        Returns:
+            True if the entries are indexed
+        """
+        generation = self._generation(kind, value)
+        added = [
+            (cache_key, meta) for cache_key, meta in entries
+            if cache.add(self._index_marker_key(kind, value, generation, cache_key), True, timeout=None)
+        ]
+
+        member_keys = []
+        if added:
+            end = self._incr(self._index_count_key(kind, value, generation), len(added))
+            members = {
+                self._index_member_key(kind, value, generation, end - len(added) + i): cache_key
+                for i, (cache_key, _) in enumerate(added, start=1)
+            }
+            self._set_many(members)
+            member_keys = list(members)
+
+            self._incr(self._stat_key(kind, value, 'entries', generation), len(added))
+            self._incr(
+                self._stat_key(kind, value, 'size_bytes', generation),
+                sum(meta.get('result_size_bytes', 0) for _, meta in added)
+            )
+            created = [meta['created_at'] for _, meta in added]
+            self._widen_range(kind, value, generation, min(created), max(created))
+
+        if self._generation(kind, value) == generation:
+            return True
+
+        keys_to_delete = member_keys + [
+            self._index_marker_key(kind, value, generation, cache_key) for cache_key, _ in added
+        ]
+        for cache_key, _ in entries:
+            keys_to_delete.extend(self._entry_keys(cache_key))
+        self._delete_many(keys_to_delete)
+
+        # Our incrs may have recreated counters the retiring process already
+        # deleted; let them expire rather than delete them under its read
+        for key in [self._index_count_key(kind, value, generation)] + [
+            self._stat_key(kind, value, field, generation) for field in self.GENERATION_STATS
+        ]:
+            cache.touch(key, self.RETIRED_KEY_SECONDS)
+        return False
+
+    def _widen_range(self, kind: str, value: str, generation: int, oldest: str, newest: str) -> None:
+        """Extend a generation's oldest/newest entry timestamps."""
+        oldest_key = self._stat_key(kind, value, 'oldest', generation)
+        newest_key = self._stat_key(kind, value, 'newest', generation)
+        found = cache.get_many([oldest_key, newest_key])
+        if found.get(oldest_key) is None or oldest < found[oldest_key]:
+            cache.set(oldest_key, oldest, timeout=None)
+        if found.get(newest_key) is None or newest > found[newest_key]:
+            cache.set(newest_key, newest, timeout=None)
+
+    def _retire(self, kind: str, value: str) -> Tuple[int, List[str], List[str]]:
+        """
+        Move an index value to a new log generation and read the old one.
+
+        Writers still appending to the old generation notice the move and
+        retract their entries (see _add_to_index).
+
+        Returns:
+            (retired generation, its member keys, its cache keys)
+        """
+        generation = self._incr(self._generation_key(kind, value)) - 1
+        count = cache.get(self._index_count_key(kind, value, generation)) or 0
+        member_keys = [self._index_member_key(kind, value, generation, i) for i in range(1, count + 1)]
+        logged = self._get_many(member_keys)
+        members = list(dict.fromkeys(logged[key] for key in member_keys if logged.get(key) is not None))
+        return generation, member_keys, members
+
+    def _drop_generation(
+        self,
+        kind: str,
+        value: str,
+        generation: int,
+        member_keys: List[str],
+        members: List[str]
+    ) -> None:
+        """Delete a retired generation's log, markers and aggregates."""
+        keys_to_delete = list(member_keys)
+        keys_to_delete.extend(self._index_marker_key(kind, value, generation, k) for k in members)
+        keys_to_delete.append(self._index_count_key(kind, value, generation))
+        keys_to_delete.extend(
+            self._stat_key(kind, value, field, generation) for field in self.GENERATION_STATS
+        )
+        self._delete_many(keys_to_delete)
+
+    def get(self, cache_key: str) -> Optional[Any]:
+        """
+        Retrieve cached result by key.
+        Updates access time and count on hit.
+        Returns None on miss.
+
+        Cost is constant: one get_many for the result and its metadata,
+        then atomic counter increments. No shared index is rewritten.
+        """
+        full_key = self._get_cache_key(cache_key)
+        meta_key = f"{self.META_PREFIX}{cache_key}"
+        found = cache.get_many([full_key, meta_key])
+        result = found.get(full_key)
+
+        if result is not None:
+            # Update access stats
+            try:
+                self._incr(f"{self.HITS_PREFIX}{cache_key}")
+                cache.set(f"{self.ATIME_PREFIX}{cache_key}", datetime.utcnow().isoformat(), timeout=None)
+
+                meta = found.get(meta_key)
+                if meta:
+                    self._incr(self._stat_key('table', meta['table_id'], 'hits'))
+                    self._incr(self._stat_key('type', meta['query_type'], 'hits'))
+            except Exception as e:
+                logger.warning(f"Failed to update cache stats: {e}")
+
+            return result
+
+        return None
+
+    def set(
+        self,
+        cache_key: str,
+        query_type: str,
+        table_id: str,
+        sql_query: str,
+        result: Any,
+        row_count: Optional[int] = None
+    ) -> bool:
+        """
+        Store query result in cache.
+
+        Args:
+            cache_key: MD5 hash of the SQL query
+            query_type: Type of query (pivot, kpi, trends, etc.)
+            table_id: BigQuery table ID for per-table clearing
+            sql_query: The raw SQL query (stored for debugging/inspection)
+            result: Query result ({'columns': [...], 'records': DataFrame.to_dict('records')})
+            row_count: Number of rows in result
+        """
+        try:
+            result_size = self._result_size(result)
+            now = datetime.utcnow().isoformat()
+            table_id = table_id or 'default'
+
+            # Store in Django cache (no expiration)
+            cache.set(self._get_cache_key(cache_key), result, timeout=None)
+
+            meta_key = f"{self.META_PREFIX}{cache_key}"
+            meta = {
+                'query_type': query_type,
+                'table_id': table_id,
+                'result_size_bytes': result_size,
+                'row_count': row_count,
+                'created_at': now,
+            }
+
+            # add() is atomic: only the first writer of a key indexes it
+            if not cache.add(meta_key, meta, timeout=None):
+                previous = cache.get(meta_key) or {}
+                cache.set(meta_key, meta, timeout=None)
+                size_delta = result_size - previous.get('result_size_bytes', 0)
+                for kind, value in (('table', table_id), ('type', query_type)):
+                    generation = self._generation(kind, value)
+                    self._incr(self._stat_key(kind, value, 'size_bytes', generation), size_delta)
+                return True
+
+            cache.set(f"{self.HITS_PREFIX}{cache_key}", 1, timeout=None)
+            cache.set(f"{self.ATIME_PREFIX}{cache_key}", now, timeout=None)
+
+            for kind, value in (('table', table_id), ('type', query_type)):
+                self._register(kind, value)
+                if not self._add_to_index(kind, value, [(cache_key, meta)]):
+                    # Cleared while being stored: the entry is already gone
+                    return True
+                self._incr(self._stat_key(kind, value, 'hits'))
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+            return False
+
+    def _clear_index(self, kind: str, value: str, compact_other: bool = True) -> int:
+        """
+        Delete every entry recorded under one index value.
+
+        Only that index's members are visited. Hits of the other index kind
+        are decremented per deleted entry, and its logs that held deleted
+        entries are then compacted (skipped by clear_all, which clears
+        those too).
+        """
+        generation, member_keys, members = self._retire(kind, value)
+        other_kind = 'type' if kind == 'table' else 'table'
+        other_field = 'query_type' if kind == 'table' else 'table_id'
+
+        found = self._get_many(
+            [f"{self.META_PREFIX}{k}" for k in members] + [f"{self.HITS_PREFIX}{k}" for k in members]
+        )
+
+        count = 0
+        other_values = set()
+        keys_to_delete = []
+        for cache_key in members:
+            keys_to_delete.extend(self._entry_keys(cache_key))
+            meta = found.get(f"{self.META_PREFIX}{cache_key}")
+            if not meta:
+                continue
+            other_value = meta.get(other_field)
+            other_values.add(other_value)
+            hits = found.get(f"{self.HITS_PREFIX}{cache_key}") or 0
+            self._incr(self._stat_key(other_kind, other_value, 'hits'), -hits)
+            count += 1
+
+        keys_to_delete.extend([
+            self._stat_key(kind, value, 'hits'),
+            self._index_compacted_key(kind, value),
+        ])
+        self._delete_many(keys_to_delete)
+        self._drop_generation(kind, value, generation, member_keys, members)
+
+        if compact_other:
+            for other_value in other_values:
+                self._compact_index(other_kind, other_value)
+
+        return count
+
+    def _compact_index(self, kind: str, value: str) -> None:
+        """
+        Rewrite one index log from its live members into a new generation.
+
+        Members whose entry was cleared through the other index kind, or
+        (partly) evicted by the cache, are dropped along with any leftover
+        keys of their entry, and the new generation's aggregates count only
+        live entries. Skipped if another worker is compacting the same log.
+        """
+        lock_key = self._compact_lock_key(kind, value)
+        if not cache.add(lock_key, True, timeout=self.COMPACT_LOCK_SECONDS):
+            return
+
+        try:
+            generation, member_keys, members = self._retire(kind, value)
+            found = self._get_many([
+                key for cache_key in members
+                for key in (
+                    self._get_cache_key(cache_key),
+                    f"{self.META_PREFIX}{cache_key}",
+                    f"{self.HITS_PREFIX}{cache_key}",
+                )
+            ])
+
+            live = []
+            dropped_hits = 0
+            keys_to_delete = []
+            for cache_key in members:
+                meta = found.get(f"{self.META_PREFIX}{cache_key}")
+                if meta and self._get_cache_key(cache_key) in found:
+                    live.append((cache_key, meta))
+                else:
+                    dropped_hits += found.get(f"{self.HITS_PREFIX}{cache_key}") or 0
+                    keys_to_delete.extend(self._entry_keys(cache_key))
+
+            if live:
+                self._add_to_index(kind, value, live)
+            cache.set(self._index_compacted_key(kind, value), len(live), timeout=None)
+            if dropped_hits:
+                self._incr(self._stat_key(kind, value, 'hits'), -dropped_hits)
+            self._delete_many(keys_to_delete)
+            self._drop_generation(kind, value, generation, member_keys, members)
+        finally:
+            cache.delete(lock_key)
+
+    def _compact_grown(self, kind: str) -> None:
+        """Compact the logs of an index kind that grew past COMPACT_RATIO since their last compaction."""
+        values = self._registered_values(kind)
+        generations = self._get_many([self._generation_key(kind, v) for v in values])
+        count_keys = {
+            v: self._index_count_key(kind, v, generations.get(self._generation_key(kind, v)) or 0)
+            for v in values
+        }
+        found = self._get_many(
+            list(count_keys.values()) + [self._index_compacted_key(kind, v) for v in values]
+        )
+        for value in values:
+            log_length = found.get(count_keys[value]) or 0
+            compacted = found.get(self._index_compacted_key(kind, value)) or 0
+            if log_length >= max(self.COMPACT_MIN_LENGTH, self.COMPACT_RATIO * compacted):
+                self._compact_index(kind, value)
+
+    def clear_all(self) -> int:
+        """Clear entire cache. Returns number of entries deleted."""
+        try:
+            count = 0
+            for table_id in self._registered_values('table'):
+                count += self._clear_index('table', table_id, compact_other=False)
+
+            # Table clears already removed every entry; drop the type logs
+            for query_type in self._registered_values('type'):
+                self._clear_index('type', query_type)
+
+            return count
+
+        except Exception as e:
+            logger.error(f"Cache clear error: {e}")
+            return 0
+
+    def clear_by_table(self, table_id: str) -> int:
+        """Clear cache for specific table. Returns number of entries deleted."""
+        try:
+            return self._clear_index('table', table_id)
+        except Exception as e:
+            logger.error(f"Cache clear by table error: {e}")
+            return 0
+
+    def clear_by_query_type(self, query_type: str) -> int:
+        """Clear cache for specific query type. Returns number of entries deleted."""
+        try:
+            return self._clear_index('type', query_type)
+        except Exception as e:
+            logger.error(f"Cache clear by query type error: {e}")
+            return 0
+
+    def _aggregates(self, kind: str) -> List[Dict]:
+        """Read aggregate counters for every registered value of an index kind."""
+        values = self._registered_values(kind)
+        found = self._get_many([self._generation_key(kind, v) for v in values])
+        generations = {v: found.get(self._generation_key(kind, v)) or 0 for v in values}
+        found = self._get_many(
+            [self._stat_key(kind, v, f, generations[v]) for v in values for f in self.GENERATION_STATS]
+            + [self._stat_key(kind, v, 'hits') for v in values]
+        )
+
+        rows = []
+        for value in values:
+            generation = generations[value]
+            entries = found.get(self._stat_key(kind, value, 'entries', generation)) or 0
+            if entries <= 0:
+                continue
+            rows.append({
+                'value': value,
+                'entries': entries,
+                'size_bytes': found.get(self._stat_key(kind, value, 'size_bytes', generation)) or 0,
+                'hits': max(found.get(self._stat_key(kind, value, 'hits')) or 0, 0),
+                'oldest': found.get(self._stat_key(kind, value, 'oldest', generation)),
+                'newest': found.get(self._stat_key(kind, value, 'newest', generation)),
+            })
+        return rows
+
+    def get_stats(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Reads the per-table and per-query-type aggregate counters only;
+        individual entries are never scanned, except by the compaction of
+        logs that have grown (see _compact_grown).
+        """
+        empty_stats = self._empty_stats()
+
+        try:
+            for kind in ('table', 'type'):
+                self._compact_grown(kind)
+
+            table_rows = self._aggregates('table')
+
+            if not table_rows:
+                return empty_stats
+
+            # Every entry belongs to exactly one table, so table rows sum to the totals
+            total_entries = sum(r['entries'] for r in table_rows)
+            total_size_bytes = sum(r['size_bytes'] for r in table_rows)
+            total_hits = sum(r['hits'] for r in table_rows)
+            avg_hits = total_hits / total_entries if total_entries > 0 else 0
+
+            oldest_dates = [r['oldest'] for r in table_rows if r['oldest']]
+            newest_dates = [r['newest'] for r in table_rows if r['newest']]
+
+            by_table = [
+                {'table_id': r['value'], 'entries': r['entries'], 'size_bytes': r['size_bytes'], 'hits': r['hits']}
+                for r in table_rows
+            ]
+            by_query_type = [
+                {'query_type': r['value'], 'entries': r['entries'], 'size_bytes': r['size_bytes'], 'hits': r['hits']}
+                for r in self._aggregates('type')
+            ]
+
+            return {
+                'total_entries': total_entries,
+                'total_size_bytes': total_size_bytes,
+                'total_size_mb': round(total_size_bytes / (1024 * 1024), 2),
+                'total_hits': total_hits,
+                'avg_hits_per_entry': round(avg_hits, 1),
+                'oldest_entry': min(oldest_dates) if oldest_dates else None,
+                'newest_entry': max(newest_dates) if newest_dates else None,
+                'by_table': sorted(by_table, key=lambda x: x['entries'], reverse=True),
+                'by_query_type': sorted(by_query_type, key=lambda x: x['entries'], reverse=True)
+            }
+
+        except Exception as e:
+            logger.error(f"Get stats error: {e}")
+            return empty_stats
+
+
+def to_json_value(value: Any) -> Any:
+    """
+    Convert a result value to something a JSONField (Postgres jsonb) accepts.
+
+    Dates, datetimes and Decimals (BigQuery NUMERIC/BIGNUMERIC) are tagged
+    so from_json_value can restore them, and a cache hit returns the same
+    types as a fresh query; NaN/NaT/inf become None (jsonb rejects NaN).
+    """
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)} if value.is_finite() else None
+    if isinstance(value, (datetime, date)):
+        try:
+            if value != value:  # NaT
+                return None
+        except TypeError:
+            return None
+        tag = '__datetime__' if isinstance(value, datetime) else '__date__'
+        return {tag: value.isoformat()}
+    if isinstance(value, dict):
+        return {str(k): to_json_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(v) for v in value]
+    if hasattr(value, 'item'):
+        # NumPy scalar
+        return to_json_value(value.item())
+    try:
+        if value != value:  # pd.NA and other missing markers
+            return None
+    except TypeError:
+        return None
+    return str(value)
+
+
+def from_json_value(value: Any) -> Any:
+    """Inverse of to_json_value for tagged dates, datetimes and Decimals."""
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if '__date__' in value:
+                return date.fromisoformat(value['__date__'])
+            if '__datetime__' in value:
+                return datetime.fromisoformat(value['__datetime__'])
+            if '__decimal__' in value:
+                return Decimal(value['__decimal__'])
+        return {k: from_json_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [from_json_value(v) for v in value]
+    return value
+
+
+class DatabaseCacheBackend(BaseQueryCacheBackend):
+    """
+    Query cache stored in audit.CacheEntry rows.
+
+    Shared by all workers and persistent across restarts. The total
+    result size is bounded by a byte budget: when the cache is over budget,
+    least recently used (LRU) or least frequently used (LFU) entries are
+    evicted down to a low watermark. A daemon thread per process
+    periodically purges expired rows and re-applies the budget. Writes only
+    trigger eviction when this process's running estimate of the total
+    (the last measured total plus its own writes since) exceeds the budget,
+    so a cache miss does not pay for a full-table SUM. The estimate is first
+    measured on the process's first write, so a restart does not forget
+    what is already cached.
+    """
+
+    # Evict down to this fraction of the budget so every write past the
+    # limit does not trigger another eviction pass
+    LOW_WATERMARK = 0.9
+
+    EVICTION_ORDER = {
+        'lru': ('last_accessed_at',),
+        'lfu': ('hit_count', 'last_accessed_at'),
+    }
+
+    _purger_lock = threading.Lock()
+    _purger_started = False
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        eviction_policy: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        purge_interval_seconds: Optional[int] = None
+    ):
+
+        self.max_bytes = max_bytes if max_bytes is not None else settings.QUERY_CACHE_MAX_BYTES
+        self.eviction_policy = (eviction_policy or settings.QUERY_CACHE_EVICTION_POLICY).lower()
+        if self.eviction_policy not in self.EVICTION_ORDER:
+            logger.warning(f"Unknown cache eviction policy '{self.eviction_policy}', using lru")
+            self.eviction_policy = 'lru'
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.QUERY_CACHE_TTL_SECONDS
+        self.purge_interval_seconds = (
+            purge_interval_seconds if purge_interval_seconds is not None
+            else settings.QUERY_CACHE_PURGE_INTERVAL_SECONDS
+        )
+        # Estimated total size; measured on the first write, re-measured by enforce_budget
+        self._approx_bytes: Optional[int] = None
+        self._approx_lock = threading.Lock()
+
+        self._start_purger()
+
+    @staticmethod
+    def _table_fk(table_id: Optional[str]) -> Optional[str]:
+        """Map the service's table_id ('default' when unknown) to the FK value."""
+        if not table_id or table_id == 'default':
+            return None
+        return table_id
+
+    @staticmethod
+    def _live_filter():
+        """Q matching entries that have not expired."""
+        return Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+
+    def get(self, cache_key: str) -> Optional[Any]:
+        from apps.audit.models import CacheEntry
+
+        try:
+            result = (
+                CacheEntry.objects
+                .filter(self._live_filter(), cache_key=cache_key)
+                .values_list('result_data', flat=True)
+                .first()
+            )
+            if result is None:
+                return None
+            result = from_json_value(result)
+
+            # Atomic in-database increment: concurrent hits from other workers are not lost
+            CacheEntry.objects.filter(cache_key=cache_key).update(
+                hit_count=F('hit_count') + 1,
+                last_accessed_at=timezone.now()
+            )
+            return result
+
+        except Exception as e:
+            logger.warning(f"Cache get error: {e}")
+            return None
+
+    def set(
+        self,
+        cache_key: str,
+        query_type: str,
+        table_id: str,
+        sql_query: str,
+        result: Any,
+        row_count: Optional[int] = None
+    ) -> bool:
+        from apps.audit.models import CacheEntry
+
+        try:
+            result_size = self._result_size(result)
+            if self.max_bytes and result_size > self.max_bytes:
+                logger.info(
+                    f"Skipping cache for {query_type} result of {result_size} bytes "
+                    f"(budget {self.max_bytes} bytes)"
+                )
+                return False
+
+            if self.max_bytes and self._approx_bytes is None:
+                self._measure_total()
+
+            now = timezone.now()
+            expires_at = now + timedelta(seconds=self.ttl_seconds) if self.ttl_seconds else None
+
+            CacheEntry.objects.update_or_create(
+                cache_key=cache_key,
+                defaults={
+                    'bigquery_table_id': self._table_fk(table_id),
+                    'query_type': query_type,
+                    'sql_query': sql_query,
+                    'result_data': to_json_value(result),
+                    'row_count': row_count or 0,
+                    'size_bytes': result_size,
+                    'created_at': now,
+                    'expires_at': expires_at,
+                    'last_accessed_at': now,
+                    'hit_count': 1,
+                }
+            )
+
+            with self._approx_lock:
+                self._approx_bytes = (self._approx_bytes or 0) + result_size
+                over_budget = bool(self.max_bytes) and self._approx_bytes > self.max_bytes
+            if over_budget:
+                self.enforce_budget()
+            return True
+
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+            return False
+
+    def _measure_total(self) -> int:
+        """Seed the size estimate from the stored total (once per process)."""
+        from apps.audit.models import CacheEntry
+
+        total = CacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+        with self._approx_lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = total
+            return self._approx_bytes
+
+    def enforce_budget(self) -> int:
+        """
+        Evict entries until the total size is under the low watermark.
+
+        Returns number of entries evicted.
+        """
+        from apps.audit.models import CacheEntry
+
+        if not self.max_bytes:
+            return 0
+
+        total = CacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+        if total <= self.max_bytes:
+            with self._approx_lock:
+                self._approx_bytes = total
+            return 0
+
+        target = int(self.max_bytes * self.LOW_WATERMARK)
+        victims = []
+        for entry_id, size_bytes in (
+            CacheEntry.objects
+            .order_by(*self.EVICTION_ORDER[self.eviction_policy])
+            .values_list('id', 'size_bytes')
+            .iterator(chunk_size=500)
+        ):
+            if total <= target:
+                break
+            victims.append(entry_id)
+            total -= size_bytes
+
+        evicted = 0
+        for i in range(0, len(victims), 500):
+            evicted += CacheEntry.objects.filter(id__in=victims[i:i + 500]).delete()[0]
+        with self._approx_lock:
+            self._approx_bytes = total
+
+        logger.info(f"Query cache over budget: evicted {evicted} entries ({self.eviction_policy})")
+        return evicted
+
+    def purge_expired(self) -> int:
+        """Delete expired entries. Returns number of entries deleted."""
+        from apps.audit.models import CacheEntry
+
+        return CacheEntry.objects.filter(expires_at__lt=timezone.now()).delete()[0]
+
+    def _start_purger(self) -> None:
+        """Start the background purge thread once per process."""
+        if not self.purge_interval_seconds:
+            return
+
+        with DatabaseCacheBackend._purger_lock:
+            if DatabaseCacheBackend._purger_started:
+                return
+            DatabaseCacheBackend._purger_started = True
+
+        thread = threading.Thread(
+            target=self._purge_loop,
+            name='query-cache-purger',
+            daemon=True
+        )
+        thread.start()
+
+    def _purge_loop(self) -> None:
+        while True:
+            time.sleep(self.purge_interval_seconds)
+            try:
+                close_old_connections()
+                purged = self.purge_expired()
+                evicted = self.enforce_budget()
+                if purged or evicted:
+                    logger.info(f"Query cache purge: {purged} expired, {evicted} evicted")
+            except Exception as e:
+                logger.warning(f"Query cache purge failed: {e}")
+            finally:
+                close_old_connections()
+
+    def clear_all(self) -> int:
+        from apps.audit.models import CacheEntry
+
+        try:
+            return CacheEntry.objects.all().delete()[0]
+        except Exception as e:
+            logger.error(f"Cache clear error: {e}")
+            return 0
+
+    def clear_by_table(self, table_id: str) -> int:
+        from apps.audit.models import CacheEntry
+
+        try:
+            table_fk = self._table_fk(table_id)
+            if table_fk is None:
+                return CacheEntry.objects.filter(bigquery_table__isnull=True).delete()[0]
+            return CacheEntry.objects.filter(bigquery_table_id=table_fk).delete()[0]
+        except Exception as e:
+            logger.error(f"Cache clear by table error: {e}")
+            return 0
+
+    def clear_by_query_type(self, query_type: str) -> int:
+        from apps.audit.models import CacheEntry
+
+        try:
+            return CacheEntry.objects.filter(query_type=query_type).delete()[0]
+        except Exception as e:
+            logger.error(f"Cache clear by query type error: {e}")
+            return 0
+
+    def get_stats(self) -> Dict:
+        from apps.audit.models import CacheEntry
+
+        try:
+            totals = CacheEntry.objects.aggregate(
+                entries=Count('id'),
+                size_bytes=Sum('size_bytes'),
+                hits=Sum('hit_count'),
+                oldest=Min('created_at'),
+                newest=Max('created_at'),
+            )
+            total_entries = totals['entries'] or 0
+            if not total_entries:
+                return self._empty_stats()
+
+            total_size_bytes = totals['size_bytes'] or 0
+            total_hits = totals['hits'] or 0
+
+            def grouped(field: str, label: str) -> List[Dict]:
+                rows = (
+                    CacheEntry.objects.values(field)
+                    .annotate(entries=Count('id'), size_bytes=Sum('size_bytes'), hits=Sum('hit_count'))
+                    .order_by('-entries')
+                )
+                return [
+                    {
+                        label: str(row[field]) if row[field] is not None else 'default',
+                        'entries': row['entries'],
+                        'size_bytes': row['size_bytes'] or 0,
+                        'hits': row['hits'] or 0,
+                    }
+                    for row in rows
+                ]
+
+            return {
+                'total_entries': total_entries,
+                'total_size_bytes': total_size_bytes,
+                'total_size_mb': round(total_size_bytes / (1024 * 1024), 2),
+                'total_hits': total_hits,
+                'avg_hits_per_entry': round(total_hits / total_entries, 1),
+                'oldest_entry': totals['oldest'].isoformat() if totals['oldest'] else None,
+                'newest_entry': totals['newest'].isoformat() if totals['newest'] else None,
+                'by_table': grouped('bigquery_table_id', 'table_id'),
+                'by_query_type': grouped('query_type', 'query_type'),
+                'max_size_bytes': self.max_bytes,
+                'eviction_policy': self.eviction_policy,
+            }
+
+        except Exception as e:
+            logger.error(f"Get stats error: {e}")
+            return self._empty_stats()
+
+
+BACKENDS = {
+    'database': DatabaseCacheBackend,
+    'django': DjangoCacheBackend,
+}
+
+
+def load_backend(name: Optional[str] = None) -> BaseQueryCacheBackend:
+    """
+    Instantiate the configured backend.
+
+    Args:
+        name: 'database', 'django' or a dotted path to a BaseQueryCacheBackend
+              subclass. Defaults to settings.QUERY_CACHE_BACKEND.
+    """
+
+    name = name or getattr(settings, 'QUERY_CACHE_BACKEND', 'database')
+    backend_class = BACKENDS.get(name) or import_string(name)
+    return backend_class()
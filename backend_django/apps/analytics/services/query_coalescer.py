@@ -0,0 +1,215 @@
+"""
+Single-flight coalescing of identical in-flight BigQuery queries.
+
+When several requests fire the same SQL at the same moment (dashboards with
+many widgets, many users opening a shared dashboard), only one BigQuery job
+is started and every caller shares its result.
+
+Two levels of coordination:
+- Within a worker: threads with the same key wait on the leader's Event.
+- Across workers: the leader holds a Postgres advisory lock (a lease that is
+  released automatically if the worker dies). Other workers poll the shared
+  query cache for the leader's result while the lease is held, and take the
+  lease themselves if it is released without a result appearing.
+
+A leader's job can be cancelled on behalf of its own request (superseded
+filters, closed tab; see query_job_registry.py). That must not fail other
+requests sharing it, so in-process followers of a cancelled leader run the
+query themselves, as followers in other workers already do when the lease
+is released without a result.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+from apps.core.exceptions import BigQueryError
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """An in-flight execution that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class QueryCoalescer:
+    """Coalesces concurrent executions of the same query key."""
+
+    # How often followers in other workers re-check the shared cache
+    POLL_INTERVAL_SECONDS = 0.25
+
+    def __init__(self, wait_timeout_seconds: Optional[float] = None):
+        """
+        Args:
+            wait_timeout_seconds: Max time a follower waits for the leader before
+                running the query itself. Defaults to settings.QUERY_COALESCE_WAIT_SECONDS.
+        """
+        self.wait_timeout_seconds = (
+            wait_timeout_seconds if wait_timeout_seconds is not None
+            else settings.QUERY_COALESCE_WAIT_SECONDS
+        )
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def run(
+        self,
+        key: str,
+        execute: Callable[[], Any],
+        fetch_shared: Optional[Callable[[], Any]] = None,
+        copy_result: Optional[Callable[[Any], Any]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run execute() once per key across concurrent callers.
+
+        Args:
+            key: Query key (normalized SQL hash)
+            execute: Runs the query and returns its result
+            fetch_shared: Returns the result published by another worker
+                (e.g. a shared cache lookup), or None. Enables cross-worker
+                coalescing; without it only threads in this worker coalesce.
+            copy_result: Applied to a result handed to more than one caller so
+                callers can mutate what they receive independently
+
+        Returns:
+            Tuple of (result, shared). shared is True when the result came from
+            another caller's execution instead of this caller's own job.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                flight.waiters += 1
+
+        if not is_leader:
+            return self._follow(flight, execute, copy_result)
+
+        try:
+            result, shared = self._run_with_lease(key, execute, fetch_shared)
+            flight.result = result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                waiters = flight.waiters
+            flight.done.set()
+
+        if waiters and copy_result is not None:
+            result = copy_result(result)
+        return result, shared
+
+    def _follow(
+        self,
+        flight: _Flight,
+        execute: Callable[[], Any],
+        copy_result: Optional[Callable[[Any], Any]]
+    ) -> Tuple[Any, bool]:
+        """Wait for the in-process leader and share its outcome."""
+        if not flight.done.wait(self.wait_timeout_seconds):
+            logger.warning(
+                f"Coalesced query still running after {self.wait_timeout_seconds}s, executing independently"
+            )
+            return execute(), False
+
+        if flight.error is not None:
+            if isinstance(flight.error, BigQueryError) and flight.error.code == 'query_cancelled':
+                # Cancelled for the leader's request, not ours
+                logger.info("Coalesced query was cancelled by its leader, executing independently")
+                return execute(), False
+            raise flight.error
+
+        result = flight.result
+        if copy_result is not None:
+            result = copy_result(result)
+        return result, True
+
+    def _run_with_lease(
+        self,
+        key: str,
+        execute: Callable[[], Any],
+        fetch_shared: Optional[Callable[[], Any]]
+    ) -> Tuple[Any, bool]:
+        """Coordinate with other workers through the shared lease, then execute."""
+        if fetch_shared is None or connection.vendor != 'postgresql':
+            return execute(), False
+
+        lease_id = self._lease_id(key)
+        deadline = time.monotonic() + self.wait_timeout_seconds
+
+        while True:
+            acquired = self._try_acquire_lease(lease_id)
+            if acquired is None:
+                # Lease store unavailable: don't block queries on coordination
+                return execute(), False
+
+            if acquired:
+                try:
+                    # Another worker may have published between our miss and the lease
+                    shared = fetch_shared()
+                    if shared is not None:
+                        return shared, True
+                    return execute(), False
+                finally:
+                    self._release_lease(lease_id)
+
+            shared = fetch_shared()
+            if shared is not None:
+                return shared, True
+
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    f"Query lease for {key[:16]} held for over {self.wait_timeout_seconds}s, executing independently"
+                )
+                return execute(), False
+
+            time.sleep(self.POLL_INTERVAL_SECONDS)
+
+    @staticmethod
+    def _lease_id(key: str) -> int:
+        """Map a hex query key to a positive bigint advisory lock id."""
+        return int(key[:15], 16)
+
+    @staticmethod
+    def _try_acquire_lease(lease_id: int) -> Optional[bool]:
+        """Try to take the cross-worker lease. Returns None if the store is unavailable."""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [lease_id])
+                return bool(cursor.fetchone()[0])
+        except Exception as e:
+            logger.warning(f"Failed to acquire query lease: {e}")
+            return None
+
+    @staticmethod
+    def _release_lease(lease_id: int) -> None:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [lease_id])
+        except Exception as e:
+            logger.warning(f"Failed to release query lease: {e}")
+
+
+# Global instance
+_query_coalescer: Optional[QueryCoalescer] = None
+
+
+def get_query_coalescer() -> QueryCoalescer:
+    """Get the query coalescer instance (singleton)."""
+    global _query_coalescer
+    if _query_coalescer is None:
+        _query_coalescer = QueryCoalescer()
+    return _query_coalescer
@@ -0,0 +1,246 @@
+"""
+Query execution engines behind BigQueryService.execute_query.
+
+A cache miss runs the SQL on the first engine of settings.QUERY_ENGINES that
+can answer it:
+
+- local_rollups: DuckDB over the local Parquet mirrors of small rollups
+  (rollup_mirror.py). Answers queries whose tables are all mirrored as of
+  the rollup's last refresh (per this process's rollup index), in
+  milliseconds and without a BigQuery job. Skipped when duckdb is not
+  installed; on any error the query falls through to the next engine.
+- bigquery: a BigQuery job (budget check, cancellation, audit). Answers
+  everything and should come last.
+
+Engines are pluggable: an entry is one of the names above or a dotted path
+to a BaseQueryEngine subclass. Exports (stream_query) always use BigQuery.
+"""
+
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, TYPE_CHECKING, Union
+
+import pandas as pd
+import pyarrow as pa
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .rollup_index import get_rollup_indexes
+from .rollup_mirror import get_rollup_mirror
+from .timing import timed
+
+if TYPE_CHECKING:
+    from .bigquery_service import BigQueryService
+
+logger = logging.getLogger(__name__)
+
+_BACKTICK_RE = re.compile(r'`([^`]+)`')
+_CAST_TYPES = {
+    'STRING': 'VARCHAR',
+    'INT64': 'BIGINT',
+    'FLOAT64': 'DOUBLE',
+    'BOOL': 'BOOLEAN',
+    'BIGNUMERIC': 'DECIMAL(38, 9)',
+}
+_CAST_RE = re.compile(r'\bAS\s+(' + '|'.join(_CAST_TYPES) + r')\b', re.IGNORECASE)
+_DATE_TRUNC_RE = re.compile(
+    r'\bDATE_TRUNC\(\s*([^,()]+?)\s*,\s*(DAY|WEEK|ISOWEEK|MONTH|QUARTER|YEAR)\s*\)',
+    re.IGNORECASE
+)
+_DATE_DIFF_RE = re.compile(
+    r'\bDATE_DIFF\(\s*(.+?)\s*,\s*(.+?)\s*,\s*(DAY|WEEK|ISOWEEK|MONTH|YEAR)\s*\)',
+    re.IGNORECASE
+)
+_TABLE_OPTIONS_RE = re.compile(r'^\s*(PARTITION BY|CLUSTER BY)\b.*$', re.IGNORECASE | re.MULTILINE)
+
+# BigQuery functions DuckDB lacks
+DUCKDB_MACROS = [
+    "CREATE MACRO safe_divide(a, b) AS CASE WHEN b = 0 THEN NULL ELSE a / b END",
+]
+
+
+def _date_trunc(match: re.Match) -> str:
+    expression, part = match.group(1), match.group(2).upper()
+    if part == 'WEEK':
+        # BigQuery weeks start on Sunday, DuckDB's on Monday: shift by a day
+        return f"CAST(date_trunc('week', {expression} + INTERVAL 1 DAY) - INTERVAL 1 DAY AS DATE)"
+    part = 'week' if part == 'ISOWEEK' else part.lower()
+    return f"CAST(date_trunc('{part}', {expression}) AS DATE)"
+
+
+def _date_diff(match: re.Match) -> str:
+    end, start, part = match.group(1), match.group(2), match.group(3).upper()
+    if part == 'WEEK':
+        # Count Sunday boundaries, as BigQuery does, by counting Monday ones a day later
+        return f"date_diff('week', {start} + INTERVAL 1 DAY, {end} + INTERVAL 1 DAY)"
+    part = 'week' if part == 'ISOWEEK' else part.lower()
+    return f"date_diff('{part}', {start}, {end})"
+
+
+def to_duckdb_sql(query: str) -> str:
+    """Rewrite the BigQuery-specific syntax generated by the services for DuckDB."""
+    sql = _BACKTICK_RE.sub(lambda m: f'"{m.group(1)}"', query)
+    sql = _CAST_RE.sub(lambda m: f"AS {_CAST_TYPES[m.group(1).upper()]}", sql)
+    sql = _DATE_TRUNC_RE.sub(_date_trunc, sql)
+    sql = _DATE_DIFF_RE.sub(_date_diff, sql)
+    return _TABLE_OPTIONS_RE.sub('', sql)
+
+
+def referenced_tables(query: str) -> Set[str]:
+    """Backtick-quoted identifiers of a query (table paths, possibly columns)."""
+    return set(_BACKTICK_RE.findall(query))
+
+
+def normalize_duckdb_result(table: pa.Table) -> pa.Table:
+    """
+    Match BigQuery result types: DuckDB returns SUM over integers as
+    HUGEINT (decimal128(38, 0) in Arrow) where BigQuery returns INT64.
+    """
+    for index, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type):
+            target = pa.int64() if field.type.scale == 0 else pa.float64()
+            table = table.set_column(index, field.name, table.column(index).cast(target))
+    return table
+
+
+class BaseQueryEngine:
+    """Runs SQL for BigQueryService.execute_query."""
+
+    name = ''
+
+    # Whether a failure should fall through to the next engine instead of raising
+    fallback_on_error = True
+
+    def can_execute(self, query: str) -> bool:
+        raise NotImplementedError
+
+    def execute(
+        self,
+        service: 'BigQueryService',
+        query: str,
+        query_type: str,
+        endpoint: str,
+        filters: Optional[Dict],
+        start_time: float,
+        result_format: str
+    ) -> Union[pd.DataFrame, pa.Table]:
+        raise NotImplementedError
+
+
+class BigQueryEngine(BaseQueryEngine):
+    """BigQuery jobs."""
+
+    name = 'bigquery'
+    fallback_on_error = False
+
+    def can_execute(self, query: str) -> bool:
+        return True
+
+    def execute(self, service, query, query_type, endpoint, filters, start_time, result_format):
+        return service._run_query_job(query, query_type, endpoint, filters, start_time, result_format)
+
+
+class LocalRollupEngine(BaseQueryEngine):
+    """DuckDB over local Parquet mirrors of rollup tables."""
+
+    name = 'local_rollups'
+
+    def __init__(self):
+        self.mirror = get_rollup_mirror()
+        # One DuckDB connection per thread (query pool threads run concurrently)
+        self._local = threading.local()
+        try:
+            import duckdb  # noqa: F401
+            self.available = True
+        except ImportError:
+            logger.info("duckdb is not installed; local rollup engine disabled")
+            self.available = False
+
+    @staticmethod
+    def _refreshed_at(table_path: str) -> Optional[datetime]:
+        """last_refresh_at of the rollup stored at a table path, None if not a known rollup."""
+        rollup = get_rollup_indexes().find_rollup(table_path)
+        return rollup.last_refresh_at if rollup is not None else None
+
+    def can_execute(self, query: str) -> bool:
+        if not self.available:
+            return False
+        tables = referenced_tables(query)
+        return bool(tables) and all(
+            self.mirror.is_mirrored(table, self._refreshed_at(table)) for table in tables
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            import duckdb
+
+            connection = duckdb.connect(database=':memory:')
+            for macro in DUCKDB_MACROS:
+                connection.execute(macro)
+            self._local.connection = connection
+            self._local.views = {}
+        return connection, self._local.views
+
+    def execute(self, service, query, query_type, endpoint, filters, start_time, result_format):
+        connection, views = self._connection()
+        for table_path in referenced_tables(query):
+            path = self.mirror.path_for(table_path, self._refreshed_at(table_path))
+            if path is None:
+                raise FileNotFoundError(f"No current local mirror of {table_path}")
+            if views.get(table_path) == path:
+                continue
+            # Each refresh is a new file: point the view at it
+            file_path = str(path).replace("'", "''")
+            connection.execute(
+                f'CREATE OR REPLACE VIEW "{table_path}" AS SELECT * FROM read_parquet(\'{file_path}\')'
+            )
+            views[table_path] = path
+
+        with timed('local_exec'):
+            result = normalize_duckdb_result(connection.execute(to_duckdb_sql(query)).arrow())
+        if result_format == 'pandas':
+            result = result.to_pandas()
+
+        service._log_query(
+            query=query,
+            query_type=query_type,
+            endpoint=endpoint,
+            filters=filters,
+            execution_time=time.time() - start_time,
+            row_count=len(result)
+        )
+        return result
+
+
+ENGINES = {
+    'bigquery': BigQueryEngine,
+    'local_rollups': LocalRollupEngine,
+}
+
+
+def load_engines(names: Optional[List[str]] = None) -> List[BaseQueryEngine]:
+    """
+    Instantiate the configured engines, in order.
+
+    Args:
+        names: Engine names or dotted paths to BaseQueryEngine subclasses.
+               Defaults to settings.QUERY_ENGINES.
+    """
+    names = names or settings.QUERY_ENGINES
+    return [(ENGINES.get(name) or import_string(name))() for name in names]
+
+
+# Global instance
+_query_engines: Optional[List[BaseQueryEngine]] = None
+
+
+def get_query_engines() -> List[BaseQueryEngine]:
+    """Get the configured query engines (singleton list)."""
+    global _query_engines
+    if _query_engines is None:
+        _query_engines = load_engines()
+    return _query_engines
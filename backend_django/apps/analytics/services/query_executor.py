@@ -0,0 +1,121 @@
+"""
+Concurrent execution of independent BigQuery queries.
+
+A single API request often needs several independent queries (pivot rows and
+total count, dimension values for every filter...). Running them back to back
+makes the response cost the sum of all queries; submitting them together to a
+shared thread pool makes it cost the longest one.
+
+If any query fails or the request timeout expires, the remaining queries are
+cancelled: pending ones never start and running BigQuery jobs are cancelled
+through the on_cancel callback.
+"""
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connections
+
+from apps.core.exceptions import BigQueryError
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentQueryRunner:
+    """Runs a request's independent queries concurrently on a process-wide pool."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.BIGQUERY_QUERY_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Created lazily so forked gunicorn workers each get their own threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='bq-query'
+                    )
+        return self._executor
+
+    @staticmethod
+    def _call(fn: Callable[[], Any]) -> Any:
+        try:
+            return fn()
+        finally:
+            # Pool threads outlive the request: don't leak their DB connections
+            connections.close_all()
+
+    def run(
+        self,
+        tasks: Dict[str, Callable[[], Any]],
+        timeout: Optional[float] = None,
+        on_cancel: Optional[Callable[[], Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run tasks concurrently and gather their results.
+
+        Args:
+            tasks: Task name -> zero-argument callable
+            timeout: Seconds to wait for all tasks. None waits indefinitely.
+            on_cancel: Called when the batch is abandoned (failure or timeout),
+                e.g. to cancel BigQuery jobs that are still running
+
+        Returns:
+            Dict of task name -> result
+
+        Raises:
+            The first task exception, or BigQueryError(code='query_timeout')
+        """
+        if len(tasks) == 1:
+            name, fn = next(iter(tasks.items()))
+            return {name: fn()}
+
+        # Each task runs in a copy of the request's context (request id for job cancellation)
+        futures = {
+            self.executor.submit(contextvars.copy_context().run, self._call, fn): name
+            for name, fn in tasks.items()
+        }
+        done, pending = wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+
+        failed = next((f for f in done if f.exception() is not None), None)
+        if failed is None and not pending:
+            return {futures[f]: f.result() for f in done}
+
+        # Abandon the batch: stop what hasn't started, cancel what is running
+        for future in pending:
+            future.cancel()
+        if on_cancel is not None:
+            try:
+                on_cancel()
+            except Exception as e:
+                logger.warning(f"Failed to cancel running queries: {e}")
+
+        if failed is not None:
+            raise failed.exception()
+
+        pending_names = sorted(futures[f] for f in pending)
+        raise BigQueryError(
+            f"Queries did not finish within {timeout}s: {', '.join(pending_names)}",
+            code='query_timeout',
+            details={'pending': pending_names, 'timeout_seconds': timeout}
+        )
+
+
+# Global instance
+_query_runner: Optional[ConcurrentQueryRunner] = None
+
+
+def get_query_runner() -> ConcurrentQueryRunner:
+    """Get the concurrent query runner instance (singleton)."""
+    global _query_runner
+    if _query_runner is None:
+        _query_runner = ConcurrentQueryRunner()
+    return _query_runner
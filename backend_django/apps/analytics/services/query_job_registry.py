@@ -0,0 +1,330 @@
+"""
+Registry of running BigQuery jobs for cancellation.
+
+Every job started by execute_query is recorded with the API request that
+started it (the client-supplied X-Request-ID, see middleware.py) and the
+user. When filters change mid-load the frontend cancels the superseded
+request, and requests whose HTTP client disconnects are cancelled
+automatically, so their pivot/count jobs stop consuming slots.
+
+Jobs are tracked in this process (cancelled through their QueryJob) and,
+written off the request path, in audit.ActiveQueryJob, so a cancel handled
+by another gunicorn worker can still reach them through the BigQuery API.
+Cancels only reach the caller's own jobs. Rows left behind by a killed
+worker are purged after STALE_AFTER.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar, Token
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Set, TYPE_CHECKING
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from google.cloud import bigquery
+
+from .bigquery_client_registry import get_client_registry
+
+if TYPE_CHECKING:
+    from apps.tables.models import BigQueryTable
+    from apps.users.models import User
+
+logger = logging.getLogger(__name__)
+
+# Request id of the API request being handled (copied into query pool threads)
+_current_request_id: ContextVar[Optional[str]] = ContextVar('query_request_id', default=None)
+
+
+def get_current_request_id() -> Optional[str]:
+    """Request id jobs started in this context are registered under."""
+    return _current_request_id.get()
+
+
+def set_current_request_id(request_id: Optional[str]) -> Token:
+    """Set the current request id; pass the returned token to reset_current_request_id."""
+    return _current_request_id.set(request_id)
+
+
+def reset_current_request_id(token: Token) -> None:
+    _current_request_id.reset(token)
+
+
+class _RegisteredJob:
+    """A running job and what it was registered with."""
+
+    __slots__ = (
+        'job', 'request_id', 'user_id', 'bigquery_table_id',
+        'billing_project', 'query_type', 'created_at'
+    )
+
+    def __init__(self, job, request_id, user_id, bigquery_table_id, billing_project, query_type):
+        self.job = job
+        self.request_id = request_id
+        self.user_id = user_id
+        self.bigquery_table_id = bigquery_table_id
+        self.billing_project = billing_project
+        self.query_type = query_type
+        self.created_at = timezone.now()
+
+
+class QueryJobRegistry:
+    """
+    Tracks running jobs by request id and user, and cancels them.
+
+    Registering and unregistering only touch the in-process dict. A
+    background thread copies jobs still running after
+    QUERY_JOB_PERSIST_SECONDS into audit.ActiveQueryJob (and removes finished
+    ones) in batches, so short jobs never reach Postgres and the request path
+    never waits on it.
+    """
+
+    # Rows older than this belong to jobs whose worker died before unregistering
+    STALE_AFTER = timedelta(hours=6)
+
+    # How often stale rows are purged (by the persist thread)
+    PURGE_INTERVAL_SECONDS = 300
+
+    def __init__(self):
+        self.persist_seconds = settings.QUERY_JOB_PERSIST_SECONDS
+
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _RegisteredJob] = {}
+        # Job ids to add to / remove from ActiveQueryJob on the next persist
+        self._to_insert: Set[str] = set()
+        self._to_delete: Set[str] = set()
+        self._pid: Optional[int] = None
+        self._last_purge = 0.0
+
+    @staticmethod
+    def _owner(user: Optional['User']) -> Optional['User']:
+        return user if user is not None and getattr(user, 'is_authenticated', False) else None
+
+    def register(
+        self,
+        job: bigquery.QueryJob,
+        user: Optional['User'],
+        bigquery_table: Optional['BigQueryTable'],
+        billing_project: str,
+        query_type: str
+    ) -> None:
+        """Record a job that has just been started."""
+        owner = self._owner(user)
+        entry = _RegisteredJob(
+            job=job,
+            request_id=get_current_request_id() or '',
+            user_id=owner.pk if owner is not None else None,
+            bigquery_table_id=bigquery_table.pk if bigquery_table is not None else None,
+            billing_project=billing_project,
+            query_type=query_type
+        )
+        with self._lock:
+            self._jobs[job.job_id] = entry
+            self._to_insert.add(job.job_id)
+        self._ensure_started()
+
+    def unregister(self, job: bigquery.QueryJob) -> None:
+        """Forget a job that has finished, failed or been cancelled."""
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+            if job.job_id in self._to_insert:
+                # Never persisted: nothing to remove
+                self._to_insert.discard(job.job_id)
+            else:
+                self._to_delete.add(job.job_id)
+
+    def cancel_request(self, request_id: str, user: Optional['User'] = None) -> int:
+        """
+        Cancel every running job started by an API request.
+
+        Only jobs of the caller are cancelled: the given user's if
+        authenticated, otherwise jobs started without a user (request ids are
+        client-supplied).
+
+        Args:
+            request_id: X-Request-ID of the request
+            user: The caller
+
+        Returns:
+            Number of jobs a cancel request was sent for
+        """
+        from apps.audit.models import ActiveQueryJob
+
+        if not request_id:
+            return 0
+
+        owner = self._owner(user)
+        owner_id = owner.pk if owner is not None else None
+        rows = ActiveQueryJob.objects.filter(request_id=request_id)
+        rows = rows.filter(user=owner) if owner is not None else rows.filter(user__isnull=True)
+        return self._cancel(
+            lambda entry: entry.request_id == request_id and entry.user_id == owner_id,
+            rows
+        )
+
+    def cancel_user(self, user: 'User') -> int:
+        """
+        Cancel every running job started by a user.
+
+        Returns:
+            Number of jobs a cancel request was sent for
+        """
+        from apps.audit.models import ActiveQueryJob
+
+        owner = self._owner(user)
+        if owner is None:
+            return 0
+        return self._cancel(
+            lambda entry: entry.user_id == owner.pk,
+            ActiveQueryJob.objects.filter(user=owner)
+        )
+
+    def _cancel(self, matches: Callable[[_RegisteredJob], bool], rows) -> int:
+        """Cancel matching jobs of this process, then matching jobs persisted by other workers."""
+        with self._lock:
+            local = [entry for entry in self._jobs.values() if matches(entry)]
+            # Ours (running or just finished): never cancel these through the API
+            skip = set(self._jobs) | self._to_delete
+
+        cancelled = 0
+        for entry in local:
+            try:
+                entry.job.cancel()
+                cancelled += 1
+                logger.info(f"Cancelled BigQuery job {entry.job.job_id} (request {entry.request_id or '-'})")
+            except Exception as e:
+                logger.warning(f"Failed to cancel BigQuery job {entry.job.job_id}: {e}")
+
+        for row in rows.exclude(job_id__in=skip).select_related('user'):
+            try:
+                # Started by another worker: cancel through the API with the owner's client
+                client = get_client_registry().get_client(row.user, row.billing_project)
+                client.cancel_job(
+                    row.job_id,
+                    project=row.billing_project,
+                    location=row.location or None
+                )
+                cancelled += 1
+                logger.info(f"Cancelled BigQuery job {row.job_id} (request {row.request_id or '-'})")
+            except Exception as e:
+                logger.warning(f"Failed to cancel BigQuery job {row.job_id}: {e}")
+        return cancelled
+
+    @staticmethod
+    def was_cancelled(job: Optional[bigquery.QueryJob]) -> bool:
+        """Whether a failed job was stopped by a cancel request."""
+        if job is None:
+            return False
+        error_result = getattr(job, 'error_result', None) or {}
+        return error_result.get('reason') == 'stopped'
+
+    def _ensure_started(self) -> None:
+        # Per process: gunicorn forks workers after the module may have been imported
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            thread = threading.Thread(
+                target=self._persist_loop,
+                name='query-job-registry',
+                daemon=True
+            )
+            thread.start()
+
+    def _persist_loop(self) -> None:
+        while True:
+            time.sleep(self.persist_seconds)
+            try:
+                self._persist()
+                self._purge_stale()
+            except Exception as e:
+                # Cancellation is best-effort: other workers just can't see these jobs
+                logger.warning(f"Failed to persist active BigQuery jobs: {e}")
+            finally:
+                close_old_connections()
+
+    def _persist(self) -> None:
+        """Write jobs registered since the last run and remove finished ones."""
+        from apps.audit.models import ActiveQueryJob
+
+        now = timezone.now()
+        with self._lock:
+            due = [
+                job_id for job_id in self._to_insert
+                if (now - self._jobs[job_id].created_at).total_seconds() >= self.persist_seconds
+            ]
+            entries = [self._jobs[job_id] for job_id in due]
+            self._to_insert.difference_update(due)
+            finished = list(self._to_delete)
+            self._to_delete.clear()
+
+        if entries:
+            try:
+                ActiveQueryJob.objects.bulk_create(
+                    [
+                        ActiveQueryJob(
+                            job_id=entry.job.job_id,
+                            billing_project=entry.billing_project,
+                            location=entry.job.location or '',
+                            request_id=entry.request_id,
+                            bigquery_table_id=entry.bigquery_table_id,
+                            user_id=entry.user_id,
+                            query_type=entry.query_type,
+                            created_at=entry.created_at
+                        )
+                        for entry in entries
+                    ],
+                    ignore_conflicts=True
+                )
+            except Exception:
+                # Retry on the next run; jobs that finished meanwhile need no insert
+                with self._lock:
+                    for entry in entries:
+                        job_id = entry.job.job_id
+                        if job_id in self._jobs:
+                            self._to_insert.add(job_id)
+                        else:
+                            self._to_delete.discard(job_id)
+                    self._to_delete.update(finished)
+                raise
+
+        if finished:
+            try:
+                ActiveQueryJob.objects.filter(job_id__in=finished).delete()
+            except Exception:
+                with self._lock:
+                    self._to_delete.update(finished)
+                raise
+
+    def _purge_stale(self) -> None:
+        from apps.audit.models import ActiveQueryJob
+
+        now = time.monotonic()
+        if now - self._last_purge < self.PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+
+        deleted, _ = ActiveQueryJob.objects.filter(
+            created_at__lt=timezone.now() - self.STALE_AFTER
+        ).delete()
+        if deleted:
+            logger.info(f"Purged {deleted} stale active query job rows")
+
+
+# Global instance
+_job_registry: Optional[QueryJobRegistry] = None
+
+
+def get_job_registry() -> QueryJobRegistry:
+    """Get the query job registry instance (singleton)."""
+    global _job_registry
+    if _job_registry is None:
+        _job_registry = QueryJobRegistry()
+    return _job_registry
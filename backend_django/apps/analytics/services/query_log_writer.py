@@ -0,0 +1,279 @@
+"""
+Write-behind buffer for audit.QueryLog records.
+
+Every executed (or cache-served) query is audited. Writing each QueryLog row
+synchronously costs a Postgres round-trip on the request path, several per
+pivot request. Instead, records are queued in memory and a background thread
+writes them with bulk_create when QUERY_LOG_BATCH_SIZE records are waiting or
+QUERY_LOG_FLUSH_SECONDS have passed, and once more at worker shutdown. Each
+batch also updates the hourly usage summary (apps/audit/usage_summary.py).
+
+Backpressure: the queue is bounded (QUERY_LOG_BUFFER_SIZE). When Postgres
+cannot keep up and the queue is full, new records are dropped (never
+blocking the request) and counted; stats() reports the drop counter.
+
+Audit rows appear up to QUERY_LOG_FLUSH_SECONDS late. So that rolling byte
+budgets (query_budget.py) still see them, the writer keeps a tally of the
+billed bytes of records that are queued, or were dropped, and so are not in
+the usage summary (unrecorded_bytes_billed). The tally is only kept while a
+budget is configured, and entries leave it once they fall out of the budget
+window, so it stays bounded while the database is unavailable.
+"""
+
+import atexit
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLogWriter:
+    """Buffers QueryLog records and writes them in batches from a background thread."""
+
+    # Minimum seconds between "buffer full" warnings
+    DROP_WARNING_INTERVAL = 60
+
+    def __init__(self):
+        self.enabled = settings.QUERY_LOG_WRITE_BEHIND
+        self.buffer_size = settings.QUERY_LOG_BUFFER_SIZE
+        self.batch_size = settings.QUERY_LOG_BATCH_SIZE
+        self.flush_seconds = settings.QUERY_LOG_FLUSH_SECONDS
+        self.budget_window = timedelta(seconds=settings.QUERY_BUDGET_WINDOW_SECONDS)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=self.buffer_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._last_drop_warning = 0.0
+
+        # Billed records not (yet) in the usage summary:
+        # sequence -> (created_at, bigquery_table_id, user_id, endpoint, bytes_billed)
+        self._unrecorded: Dict[int, Tuple[datetime, Any, Any, str, int]] = {}
+        self._sequence = itertools.count()
+        self._track_unrecorded: Optional[bool] = None
+        self._partitions = None
+
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def log(self, **fields: Any) -> None:
+        """
+        Queue a QueryLog record (keyword arguments of QueryLog).
+
+        Falls back to a synchronous insert when write-behind is disabled.
+        """
+        fields.setdefault('created_at', timezone.now())
+        item = (next(self._sequence), fields)
+        if fields.get('bytes_billed') and self._tracks_unrecorded():
+            with self._lock:
+                self._prune_unrecorded()
+                self._unrecorded[item[0]] = (
+                    fields['created_at'],
+                    fields.get('bigquery_table_id'),
+                    fields.get('user_id'),
+                    fields.get('endpoint', ''),
+                    fields['bytes_billed'],
+                )
+
+        if not self.enabled:
+            self._maintain_partitions()
+            self._write([item])
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Stays in the unrecorded tally, so budgets still count it
+            self._record_drop(1)
+
+    def unrecorded_bytes_billed(
+        self,
+        since: datetime,
+        bigquery_table_id: Any = None,
+        user_id: Any = None,
+        endpoint: Optional[str] = None
+    ) -> int:
+        """
+        Bytes billed since a time by this worker's records missing from the usage summary.
+
+        Records that are still queued or were dropped are counted; arguments
+        left as None do not filter.
+        """
+        total = 0
+        with self._lock:
+            for sequence, (created_at, table_id, record_user_id, record_endpoint, billed) in list(
+                self._unrecorded.items()
+            ):
+                if created_at < since:
+                    del self._unrecorded[sequence]
+                    continue
+                if bigquery_table_id is not None and table_id != bigquery_table_id:
+                    continue
+                if user_id is not None and record_user_id != user_id:
+                    continue
+                if endpoint is not None and record_endpoint != endpoint:
+                    continue
+                total += billed
+        return total
+
+    def flush(self) -> int:
+        """
+        Write every queued record now (e.g. at shutdown).
+
+        Returns:
+            Number of records written
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for this worker process."""
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed_batches': self.failed_batches,
+            'buffer_size': self.buffer_size,
+        }
+
+    def _ensure_started(self) -> None:
+        # Per process: gunicorn forks workers after the module may have been imported
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            thread = threading.Thread(
+                target=self._flush_loop,
+                name='query-log-writer',
+                daemon=True
+            )
+            thread.start()
+            atexit.register(self.flush)
+
+    def _maintain_partitions(self) -> None:
+        """Keep monthly QueryLog partitions ahead of the clock and apply retention (throttled)."""
+        if self._partitions is None:
+            from apps.audit.partitions import PartitionMaintainer
+            self._partitions = PartitionMaintainer()
+        self._partitions.maybe_run()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._maintain_partitions()
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            with self._flush_lock:
+                self._write(batch)
+
+    def _collect_batch(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """Block until batch_size records are queued or flush_seconds have passed."""
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, items: List[Tuple[int, Dict[str, Any]]]) -> int:
+        from apps.audit.models import QueryLog
+        from apps.audit.usage_summary import accumulate
+
+        batch = [fields for _, fields in items]
+        try:
+            close_old_connections()
+            # Logs and their hourly usage summary are written together
+            with transaction.atomic():
+                QueryLog.objects.bulk_create([QueryLog(**fields) for fields in batch])
+                accumulate(batch)
+            with self._lock:
+                for sequence, _ in items:
+                    self._unrecorded.pop(sequence, None)
+            self.written += len(batch)
+            return len(batch)
+        except Exception as e:
+            with self._lock:
+                self._prune_unrecorded()
+            self.failed_batches += 1
+            self._record_drop(len(batch))
+            logger.warning(f"Failed to write {len(batch)} query logs: {e}")
+            return 0
+        finally:
+            close_old_connections()
+
+    def _tracks_unrecorded(self) -> bool:
+        """Whether unwritten billed bytes are tallied (only budgets read them)."""
+        if self._track_unrecorded is None:
+            from .query_budget import get_query_budget
+            self._track_unrecorded = get_query_budget().budgets_enabled
+        return self._track_unrecorded
+
+    def _prune_unrecorded(self) -> None:
+        """Forget tallied records older than the budget window. Call with _lock held."""
+        cutoff = timezone.now() - self.budget_window
+        # Sequences are issued in created_at order, so expired entries come first
+        while self._unrecorded:
+            sequence = next(iter(self._unrecorded))
+            if self._unrecorded[sequence][0] >= cutoff:
+                break
+            del self._unrecorded[sequence]
+
+    def _record_drop(self, count: int) -> None:
+        with self._lock:
+            self.dropped += count
+            now = time.monotonic()
+            warn = now - self._last_drop_warning >= self.DROP_WARNING_INTERVAL
+            if warn:
+                self._last_drop_warning = now
+        if warn:
+            logger.warning(
+                f"Query log buffer full or database unavailable: "
+                f"{self.dropped} audit records dropped so far in this worker"
+            )
+
+
+# Global instance
+_query_log_writer: Optional[QueryLogWriter] = None
+
+
+def get_query_log_writer() -> QueryLogWriter:
+    """Get the query log writer instance (singleton)."""
+    global _query_log_writer
+    if _query_log_writer is None:
+        _query_log_writer = QueryLogWriter()
+    return _query_log_writer
@@ -7,8 +7,13 @@ Django port of the FastAPI query_router_service.py.
 from typing import List, Dict, Optional, Set, Tuple
 from dataclasses import dataclass, field
 
+from django.conf import settings
+
 from apps.rollups.models import Rollup, RollupConfig, RollupStatus
 from apps.schemas.models import SchemaConfig
+from apps.schemas.snapshot import SchemaSnapshot, get_schema_snapshot
+from .rollup_index import RollupIndex, get_rollup_index
+from .rollup_mirror import get_rollup_mirror
 
 
 @dataclass
@@ -21,6 +26,8 @@ class RouteDecision:
     reason: str = ""
     metrics_available: List[str] = field(default_factory=list)
     metrics_unavailable: List[str] = field(default_factory=list)
+    engine: str = 'bigquery'  # Engine expected to run the query (see query_engines.py)
+    rollup: Optional[Rollup] = field(default=None, repr=False, compare=False)  # From the rollup index; read-only
 
 
 class QueryRouterService:
@@ -31,12 +38,18 @@ class QueryRouterService:
         rollup_config: Optional[RollupConfig],
         schema_config: SchemaConfig,
         source_project_id: str,
-        source_dataset: str
+        source_dataset: str,
+        schema: Optional[SchemaSnapshot] = None,
+        index: Optional[RollupIndex] = None
     ):
         self.rollup_config = rollup_config
         self.schema_config = schema_config
         self.source_project_id = source_project_id
         self.source_dataset = source_dataset
+        # Metric lookups go through the cached schema snapshot, not the ORM
+        self.schema = schema or get_schema_snapshot(schema_config.bigquery_table_id)
+        # Rollup lookups and matching go through the cached rollup index
+        self.index = index or get_rollup_index(schema_config.bigquery_table_id, self.schema)
 
     def _get_distinct_metrics(self, metric_ids: List[str]) -> Set[str]:
         """Get the set of metrics that behave like COUNT_DISTINCT when aggregated.
@@ -48,28 +61,12 @@ class QueryRouterService:
         Returns:
             Set of metric IDs that may cause inflation when re-aggregated across dates.
         """
-        distinct_metrics = set()
-        for metric_id in metric_ids:
-            # Check calculated metrics - volume metrics are stored COUNT DISTINCTs
-            try:
-                calc_metric = self.schema_config.calculated_metrics.get(metric_id=metric_id)
-                if calc_metric.category == "volume":
-                    distinct_metrics.add(metric_id)
-            except Exception:
-                pass
-        return distinct_metrics
+        # Volume calculated metrics are stored COUNT DISTINCTs
+        return self._get_volume_metrics(metric_ids)
 
     def _get_sum_metrics(self, metric_ids: List[str]) -> Set[str]:
         """Get the set of metrics that can be re-aggregated by summing."""
-        sum_metrics = set()
-        for metric_id in metric_ids:
-            try:
-                calc_metric = self.schema_config.calculated_metrics.get(metric_id=metric_id)
-                if calc_metric.category == "volume":
-                    sum_metrics.add(metric_id)
-            except Exception:
-                pass
-        return sum_metrics
+        return self._get_volume_metrics(metric_ids)
 
     def _get_rollup_table_path(self, rollup: Rollup) -> str:
         """Get the full BigQuery table path for a rollup."""
@@ -83,26 +80,19 @@ class QueryRouterService:
         1. Volume calculated metrics (stored in rollup)
         2. Conversion metrics (calculated in Python from available volumes)
         """
-        available = set()
-
-        # All volume calculated metrics are auto-included
-        for m in self.schema_config.calculated_metrics.filter(category='volume'):
-            available.add(m.metric_id)
+        return set(self.index.metric_ids)
 
-        # Conversion metrics can be calculated if their dependencies are available
-        for calc_metric in self.schema_config.calculated_metrics.exclude(category='volume'):
-            # Check if all dependencies are available
-            depends_on = calc_metric.depends_on or []
-            if depends_on and all(dep in available for dep in depends_on):
-                available.add(calc_metric.metric_id)
-
-        return available
+    def _is_mirrored(self, rollup: Rollup) -> bool:
+        """Whether the local_rollups engine can serve this rollup (enabled and mirrored)."""
+        if 'local_rollups' not in settings.QUERY_ENGINES:
+            return False
+        return get_rollup_mirror().is_mirrored(self._get_rollup_table_path(rollup), rollup.last_refresh_at)
 
     def _get_rollups(self) -> List[Rollup]:
         """Get all rollups for this config."""
         if not self.rollup_config:
             return []
-        return list(self.rollup_config.bigquery_table.rollups.all())
+        return list(self.index.rollups)
 
     def find_simplest_rollup(self) -> Optional[Rollup]:
         """
@@ -114,16 +104,9 @@ class QueryRouterService:
         Returns:
             Rollup with only 'date' dimension and 'ready' status, or None if not found
         """
-        rollups = self._get_rollups()
-        if not rollups:
+        if not self.rollup_config:
             return None
-
-        # Find rollup with only 'date' dimension and ready status
-        for rollup in rollups:
-            if rollup.dimensions == ['date'] and rollup.status == RollupStatus.READY:
-                return rollup
-
-        return None
+        return self.index.baseline
 
     def get_baseline_rollup_path(self) -> Optional[str]:
         """
@@ -142,16 +125,10 @@ class QueryRouterService:
         Filter metric IDs to only include volume metrics (stored in rollup).
         Conversion/rate metrics are calculated in Python after fetching data.
         """
-        volume_metrics = set()
-        for metric_id in metric_ids:
-            try:
-                calc_metric = self.schema_config.calculated_metrics.get(metric_id=metric_id)
-                if calc_metric.category == 'volume':
-                    volume_metrics.add(metric_id)
-            except Exception:
-                # If metric not found in calculated_metrics, skip it
-                pass
-        return volume_metrics
+        if not self.schema:
+            return set()
+        # Metrics not found in calculated_metrics are skipped
+        return {metric_id for metric_id in metric_ids if self.schema.is_volume_metric(metric_id)}
 
     def _score_rollup(
         self,
@@ -239,10 +216,8 @@ class QueryRouterService:
         Returns:
             RouteDecision with routing information
         """
-        rollups = self._get_rollups()
-
         # No rollups - use raw table
-        if not rollups:
+        if not self.rollup_config or not self.index.rollups:
             if require_rollup:
                 return RouteDecision(
                     use_rollup=False,
@@ -253,40 +228,20 @@ class QueryRouterService:
                 reason="No rollups configured"
             )
 
-        query_dims_set = set(query_dimensions)
-        query_metrics_set = set(query_metrics)
-        filter_dims_set = set(query_filters.keys()) if query_filters else set()
-
-        # Identify COUNT DISTINCT metrics
-        distinct_metrics = self._get_distinct_metrics(query_metrics)
-
-        has_distinct = bool(distinct_metrics)
-
-        # Score all rollups
-        scored_rollups: List[Tuple[int, Rollup, bool, str]] = []
-
-        for rollup in rollups:
-            score, needs_reagg, reason = self._score_rollup(
-                rollup,
-                query_dims_set,
-                query_metrics_set,
-                distinct_metrics,
-                filter_dims_set
-            )
-            # Debug logging for scoring
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Scoring rollup '{rollup.name}' dims={rollup.dimensions}: score={score}, reason={reason}")
-            if score >= 0:
-                scored_rollups.append((score, rollup, needs_reagg, reason))
+        query_dims_set = frozenset(query_dimensions)
+        query_metrics_set = frozenset(query_metrics)
+        filter_dims_set = frozenset(query_filters.keys()) if query_filters else frozenset()
 
-        # Sort by score (highest first)
-        scored_rollups.sort(key=lambda x: x[0], reverse=True)
+        # Matching and scoring (see _score_rollup) are memoized per query shape
+        candidates = self.index.candidates(query_dims_set, filter_dims_set, query_metrics_set)
 
         # No suitable rollup found
-        if not scored_rollups:
+        if not candidates:
+            # Identify COUNT DISTINCT metrics
+            distinct_metrics = self.index.volume_metrics(query_metrics)
+            has_distinct = bool(distinct_metrics)
             all_required_dims = sorted(query_dims_set | filter_dims_set)
-            available_rollups = [r.dimensions for r in rollups if r.status == RollupStatus.READY]
+            available_rollups = list(self.index.ready_dimensions)
 
             if require_rollup:
                 filter_info = f" Filter dimensions: {sorted(filter_dims_set)}." if filter_dims_set else ""
@@ -317,16 +272,26 @@ class QueryRouterService:
                        f"Available rollups: {available_rollups}."
             )
 
-        # Use best scoring rollup
-        best_score, best_rollup, needs_reagg, _ = scored_rollups[0]
+        # Use best scoring rollup; among equal scores prefer a locally mirrored rollup.
+        # Mirrors come and go independently of the index, so this is not memoized.
+        best, engine = candidates[0], 'bigquery'
+        for candidate in candidates:
+            if candidate.score < best.score:
+                break
+            if self._is_mirrored(candidate.rollup):
+                best, engine = candidate, 'local_rollups'
+                break
+        best_rollup = best.rollup
 
         return RouteDecision(
             use_rollup=True,
             rollup_id=str(best_rollup.id),
             rollup_table_path=self._get_rollup_table_path(best_rollup),
-            needs_reaggregation=needs_reagg,
-            reason=f"Using rollup '{best_rollup.name}' (score: {best_score})",
-            metrics_available=list(self._get_rollup_metrics(best_rollup))
+            needs_reaggregation=best.needs_reaggregation,
+            reason=f"Using rollup '{best_rollup.name}' (score: {best.score}, engine: {engine})",
+            metrics_available=list(self.index.metric_ids),
+            engine=engine,
+            rollup=best_rollup
         )
 
     def find_suitable_rollups(
@@ -0,0 +1,302 @@
+"""
+In-process prefix-sum cubes over small rollups.
+
+A cube holds a rollup's volume metrics as NumPy arrays indexed by
+(dimension combination, date) with cumulative sums along the date axis, so
+the total of any date range is prefix[end] - prefix[start]. Overview KPIs
+and baseline totals (DataService) are answered from a cube without a query.
+Dimension filters are served by summing the matching combinations; a cube is
+only built when combinations x dates fits ROLLUP_CUBE_MAX_CELLS, which the
+date-only baseline rollup (a single combination) always does.
+
+Cubes are built lazily by the first request that needs one, reading the
+rollup through BigQueryService.execute_query (budget check, job registry,
+audit log; the local_rollups engine serves it when the host holds a mirror
+of the current refresh). Each is tagged with the rollup's last_refresh_at
+and rebuilt when that changes; a rollup that cannot be cubed (too large,
+unsupported dimension types) is remembered as such until its next refresh,
+while a failed fetch is retried after RETRY_AFTER_SECONDS.
+"""
+
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+import pyarrow as pa
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from apps.rollups.models import Rollup
+    from .bigquery_service import BigQueryService
+
+logger = logging.getLogger(__name__)
+
+# Filter markers understood by BigQueryService._build_dimension_condition
+NULL_MARKER = '__NULL__'
+EMPTY_MARKER = '__EMPTY__'
+
+
+class RollupCube:
+    """Prefix sums of a rollup's metrics over (dimension combination, date)."""
+
+    def __init__(
+        self,
+        days: np.ndarray,
+        dimensions: List[str],
+        levels: Dict[str, List],
+        combos: np.ndarray,
+        prefix: Dict[str, np.ndarray]
+    ):
+        self.days = days  # Sorted distinct dates (days since epoch)
+        self.dimensions = dimensions  # Dimensions other than date
+        self.levels = levels  # Dimension -> distinct values, indexed by code
+        self.combos = combos  # (combinations, dimensions) value codes
+        self.prefix = prefix  # Metric -> (combinations, dates + 1) cumulative sums
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table, dimensions: List[str], max_cells: int) -> Optional['RollupCube']:
+        """
+        Build a cube from a rollup table.
+
+        Args:
+            table: Rollup rows (date, dimension columns, metric columns)
+            dimensions: The rollup's dimensions (must include date)
+            max_cells: Largest combinations x dates allowed
+
+        Returns:
+            The cube, or None if the rollup has too many cells
+        """
+        day_values, day_index = np.unique(
+            table.column('date').cast(pa.int32()).to_numpy(zero_copy_only=False),
+            return_inverse=True
+        )
+
+        other_dimensions = [d for d in dimensions if d != 'date']
+        levels: Dict[str, List] = {}
+        codes = []
+        for dimension in other_dimensions:
+            column = table.column(dimension)
+            if not (pa.types.is_string(column.type) or pa.types.is_integer(column.type)):
+                # Filter values would need type-specific matching; leave these to SQL
+                raise ValueError(f"Unsupported dimension type {column.type} for {dimension}")
+            levels[dimension], dimension_codes = cls._encode(column.to_pylist())
+            codes.append(dimension_codes)
+
+        if codes:
+            combos, combo_index = np.unique(np.column_stack(codes), axis=0, return_inverse=True)
+            combo_index = combo_index.reshape(-1)
+        else:
+            combos = np.zeros((1, 0), dtype=np.int64)
+            combo_index = np.zeros(table.num_rows, dtype=np.int64)
+
+        if len(combos) * len(day_values) > max_cells:
+            return None
+
+        prefix = {}
+        for name in table.column_names:
+            if name == 'date' or name in dimensions:
+                continue
+            column = table.column(name)
+            if pa.types.is_integer(column.type):
+                dtype = np.int64
+            elif pa.types.is_floating(column.type) or pa.types.is_decimal(column.type):
+                dtype = np.float64
+            else:
+                continue
+            values = column.fill_null(0).cast(pa.int64() if dtype is np.int64 else pa.float64())
+            sums = np.zeros((len(combos), len(day_values) + 1), dtype=dtype)
+            np.add.at(sums, (combo_index, day_index + 1), values.to_numpy(zero_copy_only=False))
+            prefix[name] = np.cumsum(sums, axis=1, out=sums)
+
+        return cls(day_values, other_dimensions, levels, combos, prefix)
+
+    @staticmethod
+    def _encode(values: List) -> Tuple[List, np.ndarray]:
+        """Distinct values (None last) and the code of each value."""
+        distinct = sorted({v for v in values if v is not None})
+        if len(distinct) < len(set(values)):
+            distinct.append(None)
+        lookup = {value: code for code, value in enumerate(distinct)}
+        return distinct, np.array([lookup[v] for v in values], dtype=np.int64)
+
+    @property
+    def cells(self) -> int:
+        return len(self.combos) * len(self.days)
+
+    def _combo_mask(self, dimension_filters: Optional[Dict[str, List[str]]]) -> Optional[np.ndarray]:
+        """Combinations matching the filters (like build_filter_clause), or None if unsupported."""
+        mask = np.ones(len(self.combos), dtype=bool)
+        for dimension, values in (dimension_filters or {}).items():
+            if not values:
+                continue
+            if dimension not in self.levels:
+                return None
+            levels = self.levels[dimension]
+            is_integer = any(isinstance(level, int) for level in levels)
+            wanted = set()
+            for value in values:
+                if value == NULL_MARKER:
+                    wanted.add(None)
+                elif value == EMPTY_MARKER:
+                    if is_integer:
+                        return None
+                    wanted.add('')
+                elif is_integer:
+                    try:
+                        wanted.add(int(value))
+                    except (TypeError, ValueError):
+                        return None
+                else:
+                    wanted.add(value)
+            matching = [code for code, level in enumerate(levels) if level in wanted]
+            mask &= np.isin(self.combos[:, self.dimensions.index(dimension)], matching)
+        return mask
+
+    def totals(
+        self,
+        metric_ids: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        dimension_filters: Optional[Dict[str, List[str]]] = None
+    ) -> Optional[Dict[str, float]]:
+        """
+        Sum metrics over a date range (inclusive, YYYY-MM-DD) and dimension filters.
+
+        Returns:
+            Dict of metric_id -> total, or None if the cube cannot answer
+            (missing metric, filter on a dimension it does not hold)
+        """
+        if any(metric_id not in self.prefix for metric_id in metric_ids):
+            return None
+        mask = self._combo_mask(dimension_filters)
+        if mask is None:
+            return None
+
+        epoch = date(1970, 1, 1)
+        start = 0
+        end = len(self.days)
+        if start_date:
+            start = int(np.searchsorted(self.days, (date.fromisoformat(start_date) - epoch).days, 'left'))
+        if end_date:
+            end = int(np.searchsorted(self.days, (date.fromisoformat(end_date) - epoch).days, 'right'))
+        end = max(start, end)
+
+        totals = {}
+        for metric_id in metric_ids:
+            prefix = self.prefix[metric_id]
+            total = (prefix[mask, end] - prefix[mask, start]).sum()
+            totals[metric_id] = int(total) if prefix.dtype.kind == 'i' else float(total)
+        return totals
+
+
+class RollupCubeStore:
+    """Cubes of the rollups served by this process, keyed by rollup id."""
+
+    # After a failed fetch (BigQuery error, budget, cancellation), wait this
+    # long before trying to build the rollup's cube again
+    RETRY_AFTER_SECONDS = 30
+
+    def __init__(self, max_cells: Optional[int] = None):
+        self.max_cells = settings.ROLLUP_CUBE_MAX_CELLS if max_cells is None else max_cells
+        # Rollup id -> (last_refresh_at the cube was built from, cube or None)
+        self._cubes: Dict[str, Tuple[object, Optional[RollupCube]]] = {}
+        self._lock = threading.Lock()
+        # One build per rollup at a time, without blocking other rollups' readers
+        self._build_locks: Dict[str, threading.Lock] = {}
+        # Rollup id -> monotonic time of the last failed fetch
+        self._failed_at: Dict[str, float] = {}
+
+    def _build_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._build_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._build_locks[key] = lock
+            return lock
+
+    def _eligible(self, rollup: 'Rollup') -> bool:
+        from apps.rollups.models import RollupStatus
+
+        return (
+            self.max_cells > 0
+            and rollup.status == RollupStatus.READY
+            and 'date' in (rollup.dimensions or [])
+            # Each rollup row is a distinct cell, so larger rollups cannot fit
+            and rollup.row_count <= self.max_cells
+        )
+
+    def get(self, rollup: 'Rollup', bq_service: 'BigQueryService') -> Optional[RollupCube]:
+        """Cube of a rollup, built if missing or older than the rollup's last refresh."""
+        if not self._eligible(rollup):
+            return None
+        key = str(rollup.id)
+        entry = self._cubes.get(key)
+        if entry is not None and entry[0] == rollup.last_refresh_at:
+            return entry[1]
+        if self._backing_off(key):
+            return None
+        with self._build_lock(key):
+            # Another thread may have built it while we waited
+            entry = self._cubes.get(key)
+            if entry is not None and entry[0] == rollup.last_refresh_at:
+                return entry[1]
+            if self._backing_off(key):
+                return None
+            return self._build(rollup, bq_service)
+
+    def _backing_off(self, key: str) -> bool:
+        failed_at = self._failed_at.get(key)
+        return failed_at is not None and time.monotonic() - failed_at < self.RETRY_AFTER_SECONDS
+
+    def _build(self, rollup: 'Rollup', bq_service: 'BigQueryService') -> Optional[RollupCube]:
+        key = str(rollup.id)
+        try:
+            table = self._fetch(rollup, bq_service)
+        except Exception as e:
+            # Transient (BigQuery error, budget, cancelled request): retry after a pause
+            logger.warning(f"Failed to fetch rollup {rollup.name} for its cube: {e}")
+            self._failed_at[key] = time.monotonic()
+            return None
+        self._failed_at.pop(key, None)
+
+        try:
+            cube = RollupCube.from_arrow(table, rollup.dimensions, self.max_cells)
+        except ValueError as e:
+            logger.warning(f"Cannot build cube for rollup {rollup.name}: {e}")
+            cube = None
+        if cube is not None:
+            logger.info(f"Built cube for rollup {rollup.name} ({cube.cells} cells)")
+        # Remembered even when None (too large, unsupported dimension types),
+        # so requests do not retry until the next refresh
+        self._cubes[key] = (rollup.last_refresh_at, cube)
+        return cube
+
+    @staticmethod
+    def _fetch(rollup: 'Rollup', bq_service: 'BigQueryService') -> pa.Table:
+        """Rollup rows (not cached: the cube is the cache)."""
+        return bq_service.execute_query(
+            f"SELECT * FROM `{rollup.full_rollup_path}`",
+            query_type='rollup_cube',
+            endpoint='rollup_cube',
+            use_cache=False,
+            result_format='arrow'
+        )
+
+    def discard(self, rollup: 'Rollup') -> None:
+        self._cubes.pop(str(rollup.id), None)
+        self._failed_at.pop(str(rollup.id), None)
+
+
+# Global instance
+_rollup_cubes: Optional[RollupCubeStore] = None
+
+
+def get_rollup_cubes() -> RollupCubeStore:
+    """Get the rollup cube store instance (singleton)."""
+    global _rollup_cubes
+    if _rollup_cubes is None:
+        _rollup_cubes = RollupCubeStore()
+    return _rollup_cubes
@@ -0,0 +1,286 @@
+"""
+Per-table rollup index for query routing.
+
+Routing a query means finding the READY rollups that hold every grouped and
+filtered dimension and every required volume metric, and scoring them
+(QueryRouterService). A RollupIndex holds a table's rollup config and
+rollups with their dimensions and metrics encoded as integer bitmasks, so
+matching a rollup is a couple of AND operations. Candidate lists are
+memoized per (query dimensions, filter dimensions, metrics); a repeated
+query shape is a dict lookup.
+
+Indexes are cached per process by BigQueryTable. Rollup and RollupConfig
+writes drop this process's index at once (apps/rollups/signals.py); other
+processes compare the index's signature (config and rollup updated_at, rollup
+count, schema version) with the database at most every
+ROLLUP_INDEX_RECHECK_SECONDS, so between checks routing costs no queries.
+
+Indexes are shared between requests and threads: treat them, and the
+rollups they hold, as read-only.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from apps.rollups.models import Rollup, RollupConfig, RollupStatus
+from apps.schemas.snapshot import SchemaSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Memoized query shapes per index
+MAX_ROUTES = 1024
+
+
+@dataclass(frozen=True)
+class RollupCandidate:
+    """A rollup able to answer a query shape."""
+    rollup: Rollup
+    score: int
+    needs_reaggregation: bool
+
+
+@dataclass(frozen=True)
+class _IndexedRollup:
+    rollup: Rollup
+    dimension_mask: int
+    metric_mask: int
+    row_count: int
+
+
+class RollupIndex:
+    """Bitmask index over one table's READY rollups."""
+
+    def __init__(
+        self,
+        rollup_config: Optional[RollupConfig],
+        rollups: Tuple[Rollup, ...],
+        schema: Optional[SchemaSnapshot],
+        signature: Tuple
+    ):
+        self.rollup_config = rollup_config
+        # Without a config the table has no usable rollups, as before
+        self.rollups = rollups if rollup_config is not None else ()
+        self.rollups_by_path = {r.full_rollup_path: r for r in self.rollups}
+        self.schema = schema
+        self.signature = signature
+
+        self._dimension_bits: Dict[str, int] = {}
+        for rollup in self.rollups:
+            for dimension in rollup.dimensions or []:
+                self._dimension_bits.setdefault(dimension, 1 << len(self._dimension_bits))
+        self._date_bit = self._dimension_bits.get('date', 0)
+
+        volume_metric_ids = schema.volume_metric_ids if schema else ()
+        self._metric_bits = {metric_id: 1 << i for i, metric_id in enumerate(volume_metric_ids)}
+        self.metric_ids = self._available_metric_ids(schema)
+
+        ready = [r for r in self.rollups if r.status == RollupStatus.READY]
+        self._entries = tuple(
+            _IndexedRollup(
+                rollup=rollup,
+                dimension_mask=self.dimension_mask(rollup.dimensions or []),
+                # Every rollup stores all of the schema's volume metrics
+                metric_mask=self.metric_mask(volume_metric_ids),
+                row_count=rollup.row_count,
+            )
+            for rollup in ready
+        )
+        self.ready_dimensions = tuple(r.dimensions for r in ready)
+        self.baseline = next((r for r in ready if r.dimensions == ['date']), None)
+
+        self._routes: 'OrderedDict[Tuple, Tuple[RollupCandidate, ...]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _available_metric_ids(schema: Optional[SchemaSnapshot]) -> Tuple[str, ...]:
+        """Volume metrics plus conversion metrics computable from them."""
+        if not schema:
+            return ()
+        available = set(schema.volume_metric_ids)
+        for metric in schema.metrics:
+            if metric.category == 'volume':
+                continue
+            depends_on = metric.depends_on or []
+            if depends_on and all(dep in available for dep in depends_on):
+                available.add(metric.metric_id)
+        return tuple(available)
+
+    def dimension_mask(self, dimensions: Iterable[str]) -> Optional[int]:
+        """Bitmask of dimensions, or None if no rollup holds one of them."""
+        mask = 0
+        for dimension in dimensions:
+            bit = self._dimension_bits.get(dimension)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    def metric_mask(self, metric_ids: Iterable[str]) -> int:
+        """Bitmask of the volume metrics among metric_ids (others are computed in Python)."""
+        mask = 0
+        for metric_id in metric_ids:
+            mask |= self._metric_bits.get(metric_id, 0)
+        return mask
+
+    def volume_metrics(self, metric_ids: Iterable[str]) -> FrozenSet[str]:
+        return frozenset(m for m in metric_ids if m in self._metric_bits)
+
+    def candidates(
+        self,
+        query_dimensions: FrozenSet[str],
+        filter_dimensions: FrozenSet[str],
+        metric_ids: FrozenSet[str]
+    ) -> Tuple[RollupCandidate, ...]:
+        """
+        Rollups able to answer a query shape, best first.
+
+        Scored like QueryRouterService._score_rollup: an exact dimension match
+        scores 150; a rollup whose only extra dimension is date needs
+        re-aggregation and scores 100, or 80 with COUNT DISTINCT metrics.
+        Equal scores prefer the smaller rollup.
+        """
+        key = (query_dimensions, filter_dimensions, metric_ids)
+        routes = self._routes.get(key)
+        if routes is not None:
+            return routes
+
+        routes = ()
+        required_dimensions = self.dimension_mask(query_dimensions | filter_dimensions)
+        if required_dimensions is not None:
+            required_metrics = self.metric_mask(metric_ids)
+            found = []
+            for entry in self._entries:
+                if required_dimensions & ~entry.dimension_mask:
+                    continue
+                if required_metrics & ~entry.metric_mask:
+                    continue
+                extra = entry.dimension_mask & ~required_dimensions
+                if not extra:
+                    score, needs_reaggregation = 150, False
+                elif extra == self._date_bit:
+                    # Volume metrics are stored COUNT DISTINCTs
+                    score, needs_reaggregation = (80 if required_metrics else 100), True
+                else:
+                    continue
+                found.append((entry.row_count, RollupCandidate(entry.rollup, score, needs_reaggregation)))
+            # Stable sort keeps name order among equal scores and sizes
+            found.sort(key=lambda item: (-item[1].score, item[0]))
+            routes = tuple(candidate for _, candidate in found)
+
+        with self._lock:
+            self._routes[key] = routes
+            while len(self._routes) > MAX_ROUTES:
+                self._routes.popitem(last=False)
+        return routes
+
+
+def _schema_key(schema: Optional[SchemaSnapshot]) -> Optional[Tuple]:
+    return (schema.id, schema.version) if schema else None
+
+
+@dataclass
+class _Entry:
+    index: RollupIndex
+    checked_at: float
+
+
+class RollupIndexStore:
+    """Per-process rollup indexes, keyed by BigQueryTable id."""
+
+    def __init__(self, recheck_seconds: Optional[float] = None):
+        self.recheck_seconds = (
+            settings.ROLLUP_INDEX_RECHECK_SECONDS if recheck_seconds is None else recheck_seconds
+        )
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(bigquery_table_id, schema: Optional[SchemaSnapshot]) -> Tuple:
+        config = RollupConfig.objects.filter(
+            bigquery_table_id=bigquery_table_id
+        ).values_list('id', 'updated_at').first()
+        rollups = Rollup.objects.filter(bigquery_table_id=bigquery_table_id).aggregate(
+            count=Count('id'), updated_at=Max('updated_at')
+        )
+        return (
+            config,
+            rollups['count'],
+            rollups['updated_at'],
+            _schema_key(schema),
+        )
+
+    def get(self, bigquery_table_id, schema: Optional[SchemaSnapshot]) -> RollupIndex:
+        """Index of a table's rollups, rebuilt if its rollups or schema changed."""
+        key = str(bigquery_table_id)
+        entry = self._entries.get(key)
+        if (
+            entry is not None and _schema_key(entry.index.schema) == _schema_key(schema)
+            and time.monotonic() - entry.checked_at < self.recheck_seconds
+        ):
+            return entry.index
+
+        signature = self._signature(bigquery_table_id, schema)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.index.signature != signature:
+                entry = _Entry(self._build(bigquery_table_id, schema, signature), 0.0)
+                logger.debug(f"Built rollup index for table {key} ({len(entry.index.rollups)} rollups)")
+            entry.checked_at = time.monotonic()
+            self._entries[key] = entry
+        return entry.index
+
+    @staticmethod
+    def _build(bigquery_table_id, schema: Optional[SchemaSnapshot], signature: Tuple) -> RollupIndex:
+        rollup_config = RollupConfig.objects.filter(
+            bigquery_table_id=bigquery_table_id
+        ).select_related('bigquery_table').first()
+        # The table is joined in so rollup paths need no further queries
+        rollups = tuple(
+            Rollup.objects.filter(bigquery_table_id=bigquery_table_id).select_related('bigquery_table')
+        )
+        return RollupIndex(rollup_config, rollups, schema, signature)
+
+    def find_rollup(self, table_path: str) -> Optional[Rollup]:
+        """
+        Rollup stored at a BigQuery table path, among the indexes this process holds.
+
+        Queries on rollups are routed first, which loads the table's index.
+        """
+        for entry in list(self._entries.values()):
+            rollup = entry.index.rollups_by_path.get(table_path)
+            if rollup is not None:
+                return rollup
+        return None
+
+    def invalidate(self, bigquery_table_id) -> None:
+        """Drop the index of a table (after its rollups or config were written)."""
+        with self._lock:
+            self._entries.pop(str(bigquery_table_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Global instance
+_rollup_indexes: Optional[RollupIndexStore] = None
+
+
+def get_rollup_indexes() -> RollupIndexStore:
+    """Get the rollup index store instance (singleton)."""
+    global _rollup_indexes
+    if _rollup_indexes is None:
+        _rollup_indexes = RollupIndexStore()
+    return _rollup_indexes
+
+
+def get_rollup_index(bigquery_table_id, schema: Optional[SchemaSnapshot]) -> RollupIndex:
+    """Index of a table's rollups (see RollupIndexStore.get)."""
+    return get_rollup_indexes().get(bigquery_table_id, schema)
@@ -0,0 +1,155 @@
+"""
+Local Parquet mirrors of small rollup tables.
+
+After a rollup refresh succeeds, rollups up to LOCAL_ROLLUP_MAX_BYTES are
+downloaded and written to LOCAL_ROLLUP_DIR as one Parquet file per table,
+named after the refresh it holds
+("<project>.<dataset>.<table>@<last_refresh_at>.parquet"); the previous
+file is removed once the new one is in place. The local_rollups query
+engine (query_engines.py) answers queries that only read mirrored tables
+with DuckDB instead of a BigQuery job.
+
+A table counts as mirrored only when its file is stamped with the rollup's
+current last_refresh_at, so a host that missed the latest refresh serves
+the table from BigQuery instead of an old copy. Mirrors are replaced on
+refresh, and removed when a refresh fails, the rollup grows past the size
+limit or is deleted. The directory should be shared by the workers of a host
+(each worker keeps its own DuckDB views over it).
+"""
+
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, TYPE_CHECKING
+
+from django.conf import settings
+from google.cloud import bigquery
+
+if TYPE_CHECKING:
+    from apps.rollups.models import Rollup
+
+logger = logging.getLogger(__name__)
+
+# Table paths are project.dataset.table identifiers; anything else is never a file name
+_TABLE_PATH_RE = re.compile(r'^[A-Za-z0-9_.:-]+$')
+
+
+class RollupMirror:
+    """Publishes and locates the Parquet mirrors of rollup tables."""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory or settings.LOCAL_ROLLUP_DIR)
+        self.max_bytes = settings.LOCAL_ROLLUP_MAX_BYTES if max_bytes is None else max_bytes
+
+    @staticmethod
+    def _stamp(refreshed_at: datetime) -> str:
+        return refreshed_at.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+    def _file_name(self, table_path: str, refreshed_at: datetime) -> Path:
+        return self.directory / f"{table_path}@{self._stamp(refreshed_at)}.parquet"
+
+    def _files(self, table_path: str) -> List[Path]:
+        """Every mirror file of a table, whatever refresh it holds."""
+        if not _TABLE_PATH_RE.match(table_path) or not self.directory.is_dir():
+            return []
+        return list(self.directory.glob(f"{table_path}@*.parquet"))
+
+    def path_for(self, table_path: str, refreshed_at: Optional[datetime]) -> Optional[Path]:
+        """
+        Mirror file of a table as of a refresh.
+
+        Args:
+            refreshed_at: The rollup's last_refresh_at
+
+        Returns:
+            The file, or None if the table has no mirror of that refresh
+        """
+        if refreshed_at is None or not _TABLE_PATH_RE.match(table_path):
+            return None
+        path = self._file_name(table_path, refreshed_at)
+        return path if path.exists() else None
+
+    def is_mirrored(self, table_path: str, refreshed_at: Optional[datetime]) -> bool:
+        return self.path_for(table_path, refreshed_at) is not None
+
+    def publish(self, rollup: 'Rollup', client: bigquery.Client) -> bool:
+        """
+        Mirror a freshly refreshed rollup if it is small enough.
+
+        Returns:
+            True if the mirror was written
+        """
+        table_path = rollup.full_rollup_path
+        if rollup.last_refresh_at is None or not _TABLE_PATH_RE.match(table_path):
+            return False
+
+        size_bytes = client.get_table(table_path).num_bytes or 0
+        if size_bytes > self.max_bytes:
+            # An older, smaller mirror would now be stale
+            self.remove(table_path)
+            return False
+
+        import pyarrow.parquet as pq
+
+        table = client.query(f"SELECT * FROM `{table_path}`").to_arrow(create_bqstorage_client=False)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.parquet.tmp')
+        os.close(fd)
+        path = self._file_name(table_path, rollup.last_refresh_at)
+        try:
+            pq.write_table(table, tmp_path)
+            # Atomic: readers see the whole file or none, never a partial write
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._remove_others(table_path, keep=path)
+
+        logger.info(f"Mirrored rollup {rollup.name} ({table.num_rows} rows) to {self.directory}")
+        return True
+
+    def restamp(self, rollup: 'Rollup') -> bool:
+        """
+        Carry the mirror of a rollup that a refresh left unchanged over to its new refresh time.
+
+        Returns:
+            True if the rollup is mirrored as of its last refresh
+        """
+        table_path = rollup.full_rollup_path
+        if self.is_mirrored(table_path, rollup.last_refresh_at):
+            return True
+        files = self._files(table_path)
+        if rollup.last_refresh_at is None or not files:
+            return False
+        path = self._file_name(table_path, rollup.last_refresh_at)
+        os.replace(max(files), path)
+        self._remove_others(table_path, keep=path)
+        return True
+
+    def _remove_others(self, table_path: str, keep: Path) -> None:
+        for path in self._files(table_path):
+            if path != keep:
+                path.unlink(missing_ok=True)
+
+    def remove(self, table_path: str) -> None:
+        files = self._files(table_path)
+        for path in files:
+            path.unlink(missing_ok=True)
+        if files:
+            logger.info(f"Removed local mirror of {table_path}")
+
+
+# Global instance
+_rollup_mirror: Optional[RollupMirror] = None
+
+
+def get_rollup_mirror() -> RollupMirror:
+    """Get the rollup mirror instance (singleton)."""
+    global _rollup_mirror
+    if _rollup_mirror is None:
+        _rollup_mirror = RollupMirror()
+    return _rollup_mirror
@@ -6,9 +6,12 @@ Ported from FastAPI backend/services/statistical_service.py.
 """
 import numpy as np
 from scipy import stats
-from typing import Dict, List, Optional, Literal
+from scipy.special import ndtr
+from typing import Dict, List, Optional, Literal, Sequence, Union
 from dataclasses import dataclass, asdict
 
+ArrayLike = Union[Sequence, np.ndarray]
+
 
 @dataclass
 class SignificanceResult:
@@ -68,16 +71,33 @@ class StatisticalService:
     Statistical Model:
     - Normal-Normal model for comparing means
     - Uses t-distribution for small samples (< 30 days)
-    - Monte Carlo sampling for computing P(treatment > control)
+    - Closed form P(treatment > control) when both groups use the normal
+      posterior; Monte Carlo sampling otherwise
     """
 
     DEFAULT_N_SAMPLES = 10000
+    DEFAULT_SEED = 42
     SIGNIFICANCE_THRESHOLD = 0.95
     MIN_DAYS_FOR_NORMAL = 30
     MIN_DAYS_WARNING = 7
 
-    def __init__(self, n_samples: int = DEFAULT_N_SAMPLES):
+    # Proportion tests
+    P_VALUE_THRESHOLD = 0.05
+    Z_CRITICAL_95 = stats.norm.ppf(0.975)  # 1.96 for 95% CI
+    MIN_EVENTS_WARNING = 30
+    MIN_SUCCESSES_WARNING = 5
+
+    # Floor for daily standard deviations
+    MIN_STD = 1e-10
+
+    def __init__(self, n_samples: int = DEFAULT_N_SAMPLES, seed: Optional[int] = DEFAULT_SEED):
+        """
+        Args:
+            n_samples: Monte Carlo draws per group when sampling is needed
+            seed: Seed of the per-call random generator (reproducible results)
+        """
         self.n_samples = n_samples
+        self.seed = seed
 
     def bayesian_daily_comparison(
         self,
@@ -88,11 +108,7 @@ class StatisticalService:
         """
         Compare two groups using their daily observations.
 
-        Uses Normal-Normal model:
-        - Estimate mean and std from daily values
-        - For small samples (< 30), use t-distribution
-        - Sample from posterior distributions
-        - Compute P(treatment > control)
+        Single-metric form of bayesian_daily_comparison_batch.
 
         Args:
             control_daily_values: List of daily metric values for control
@@ -102,155 +118,202 @@ class StatisticalService:
         Returns:
             Dict with prob_beat_control, credible_interval, mean_difference, etc.
         """
-        # Convert to numpy arrays and filter out NaN/None
-        control = np.array([v for v in control_daily_values if v is not None and not np.isnan(v)])
-        treatment = np.array([v for v in treatment_daily_values if v is not None and not np.isnan(v)])
-
-        n_control = len(control)
-        n_treatment = len(treatment)
-
-        # Handle edge cases
-        if n_control < 2 or n_treatment < 2:
-            return {
-                'prob_beat_control': 0.5,
-                'credible_interval_lower': 0.0,
-                'credible_interval_upper': 0.0,
-                'mean_difference': 0.0,
-                'relative_difference': 0.0,
-                'is_significant': False,
-                'direction': 'neutral',
-                'control_mean': float(np.mean(control)) if n_control > 0 else 0.0,
-                'treatment_mean': float(np.mean(treatment)) if n_treatment > 0 else 0.0,
-                'n_days': min(n_control, n_treatment),
-                'warning': 'Insufficient data (need at least 2 days per group)'
-            }
-
-        # Calculate sample statistics
-        control_mean = np.mean(control)
-        treatment_mean = np.mean(treatment)
-        control_std = np.std(control, ddof=1)  # Sample std
-        treatment_std = np.std(treatment, ddof=1)
-
-        # Prevent zero standard deviation
-        min_std = 1e-10
-        control_std = max(control_std, min_std)
-        treatment_std = max(treatment_std, min_std)
-
-        # Standard error of the mean
-        control_sem = control_std / np.sqrt(n_control)
-        treatment_sem = treatment_std / np.sqrt(n_treatment)
-
-        # Set random seed for reproducibility
-        np.random.seed(42)
-
-        # Sample from posterior distributions
-        # For small samples, use t-distribution; for large samples, use normal
-        if n_control < self.MIN_DAYS_FOR_NORMAL:
-            # Use scaled t-distribution
-            control_samples = stats.t.rvs(
-                df=n_control - 1,
-                loc=control_mean,
-                scale=control_sem,
-                size=self.n_samples
-            )
-        else:
-            control_samples = np.random.normal(control_mean, control_sem, self.n_samples)
-
-        if n_treatment < self.MIN_DAYS_FOR_NORMAL:
-            treatment_samples = stats.t.rvs(
-                df=n_treatment - 1,
-                loc=treatment_mean,
-                scale=treatment_sem,
-                size=self.n_samples
-            )
-        else:
-            treatment_samples = np.random.normal(treatment_mean, treatment_sem, self.n_samples)
+        return self.bayesian_daily_comparison_batch(
+            [control_daily_values],
+            [treatment_daily_values],
+            [higher_is_better]
+        )[0]
+
+    @staticmethod
+    def _daily_matrix(daily_values: Sequence[Sequence[float]]) -> np.ndarray:
+        """Stack per-metric daily values into a NaN-padded (metrics x days) matrix."""
+        rows = [
+            [np.nan if v is None else float(v) for v in values]
+            for values in daily_values
+        ]
+        width = max((len(row) for row in rows), default=0)
+        matrix = np.full((len(rows), width), np.nan)
+        for i, row in enumerate(rows):
+            matrix[i, :len(row)] = row
+        return matrix
+
+    @staticmethod
+    def _daily_stats(matrix: np.ndarray) -> tuple:
+        """Per-row count, mean and sample std (ddof=1) ignoring NaN."""
+        present = ~np.isnan(matrix)
+        n = present.sum(axis=1)
+        values = np.where(present, matrix, 0.0)
+        mean = values.sum(axis=1) / np.maximum(n, 1)
+        squares = np.where(present, (matrix - mean[:, None]) ** 2, 0.0).sum(axis=1)
+        std = np.sqrt(squares / np.maximum(n - 1, 1))
+        return n, mean, std
+
+    def bayesian_daily_comparison_batch(
+        self,
+        control_daily_values: Sequence[Sequence[float]],
+        treatment_daily_values: Sequence[Sequence[float]],
+        higher_is_better: Union[bool, ArrayLike] = True
+    ) -> List[dict]:
+        """
+        Compare control and treatment daily observations for many metrics at once.
 
-        # Probability treatment beats control
-        if higher_is_better:
-            prob_beat_control = np.mean(treatment_samples > control_samples)
-        else:
-            prob_beat_control = np.mean(treatment_samples < control_samples)
+        Uses Normal-Normal model:
+        - Estimate mean and std from daily values
+        - For small samples (< 30), use t-distribution
+        - Both groups normal: the difference is normal, so P(treatment > control)
+          and the credible interval are computed in closed form
+        - Otherwise sample the posteriors (vectorized across metrics). Draws
+          come from a per-call Generator and are shared by metrics with the
+          same number of days.
 
-        # Difference distribution (treatment - control)
-        diff_samples = treatment_samples - control_samples
+        Args:
+            control_daily_values: Daily values for control, one list per metric
+            treatment_daily_values: Daily values for treatment, one list per metric
+            higher_is_better: If True, higher values are better (scalar or per metric)
 
-        # 95% credible interval for the difference
-        ci_lower = float(np.percentile(diff_samples, 2.5))
-        ci_upper = float(np.percentile(diff_samples, 97.5))
+        Returns:
+            List of dicts (one per metric) with prob_beat_control,
+            credible_interval, mean_difference, etc.
+        """
+        control = self._daily_matrix(control_daily_values)
+        treatment = self._daily_matrix(treatment_daily_values)
+        n_metrics = len(control)
+        higher_is_better = np.broadcast_to(np.asarray(higher_is_better, dtype=bool), (n_metrics,))
+
+        n_control, control_mean, control_std = self._daily_stats(control)
+        n_treatment, treatment_mean, treatment_std = self._daily_stats(treatment)
+
+        # Need at least 2 days per group
+        valid = (n_control >= 2) & (n_treatment >= 2)
+
+        # Standard error of the mean (prevent zero standard deviation)
+        control_sem = np.maximum(control_std, self.MIN_STD) / np.sqrt(np.maximum(n_control, 1))
+        treatment_sem = np.maximum(treatment_std, self.MIN_STD) / np.sqrt(np.maximum(n_treatment, 1))
+
+        mean_diff = treatment_mean - control_mean
+        prob_beat_control = np.full(n_metrics, 0.5)
+        ci_lower = np.zeros(n_metrics)
+        ci_upper = np.zeros(n_metrics)
+
+        # Closed form: difference of two normals is normal
+        closed_form = (
+            valid
+            & (n_control >= self.MIN_DAYS_FOR_NORMAL)
+            & (n_treatment >= self.MIN_DAYS_FOR_NORMAL)
+        )
+        if closed_form.any():
+            diff_sd = np.sqrt(control_sem[closed_form] ** 2 + treatment_sem[closed_form] ** 2)
+            prob_greater = ndtr(mean_diff[closed_form] / diff_sd)
+            prob_beat_control[closed_form] = np.where(
+                higher_is_better[closed_form], prob_greater, 1 - prob_greater
+            )
+            ci_lower[closed_form] = mean_diff[closed_form] - self.Z_CRITICAL_95 * diff_sd
+            ci_upper[closed_form] = mean_diff[closed_form] + self.Z_CRITICAL_95 * diff_sd
+
+        # Sampling for metrics with a t-distributed posterior
+        sampled = np.flatnonzero(valid & ~closed_form)
+        if len(sampled):
+            rng = np.random.default_rng(self.seed)
+            draws: Dict[tuple, np.ndarray] = {}
+
+            def standard_draws(group: str, n_days: int) -> np.ndarray:
+                # Standard t (small samples) or normal draws, shared by metrics with the same df
+                df = int(n_days) - 1 if n_days < self.MIN_DAYS_FOR_NORMAL else None
+                key = (group, df)
+                if key not in draws:
+                    if df is None:
+                        draws[key] = rng.standard_normal(self.n_samples)
+                    else:
+                        draws[key] = rng.standard_t(df, self.n_samples)
+                return draws[key]
+
+            control_samples = (
+                control_mean[sampled, None]
+                + control_sem[sampled, None] * np.stack([standard_draws('control', n_control[i]) for i in sampled])
+            )
+            treatment_samples = (
+                treatment_mean[sampled, None]
+                + treatment_sem[sampled, None] * np.stack([standard_draws('treatment', n_treatment[i]) for i in sampled])
+            )
 
-        # Mean difference
-        mean_diff = float(treatment_mean - control_mean)
+            # Difference distribution (treatment - control)
+            diff_samples = treatment_samples - control_samples
+            # Probability treatment beats control
+            prob_beat_control[sampled] = np.where(
+                higher_is_better[sampled],
+                np.mean(diff_samples > 0, axis=1),
+                np.mean(diff_samples < 0, axis=1)
+            )
+            ci_lower[sampled], ci_upper[sampled] = np.percentile(diff_samples, [2.5, 97.5], axis=1)
 
         # Relative difference (as decimal, e.g., 0.05 = 5% improvement)
-        if abs(control_mean) > min_std:
-            relative_diff = mean_diff / abs(control_mean)
-        else:
-            relative_diff = 0.0
-
-        # Determine significance and direction
-        is_significant = (
-            prob_beat_control >= self.SIGNIFICANCE_THRESHOLD or
-            prob_beat_control <= (1 - self.SIGNIFICANCE_THRESHOLD)
+        relative_diff = np.where(
+            np.abs(control_mean) > self.MIN_STD,
+            mean_diff / np.where(np.abs(control_mean) > self.MIN_STD, np.abs(control_mean), 1.0),
+            0.0
         )
 
-        if prob_beat_control >= self.SIGNIFICANCE_THRESHOLD:
-            direction = "better" if higher_is_better else "worse"
-        elif prob_beat_control <= (1 - self.SIGNIFICANCE_THRESHOLD):
-            direction = "worse" if higher_is_better else "better"
-        else:
-            direction = "neutral"
-
-        # Generate warning for small samples
-        warning = None
-        min_days = min(n_control, n_treatment)
-        if min_days < self.MIN_DAYS_WARNING:
-            warning = f"Very small sample size ({min_days} days). Results may be unreliable."
-        elif min_days < self.MIN_DAYS_FOR_NORMAL:
-            warning = f"Small sample size ({min_days} days). Using t-distribution for more conservative estimates."
+        min_days = np.minimum(n_control, n_treatment)
+        results = []
+        for i in range(n_metrics):
+            if not valid[i]:
+                results.append({
+                    'prob_beat_control': 0.5,
+                    'credible_interval_lower': 0.0,
+                    'credible_interval_upper': 0.0,
+                    'mean_difference': 0.0,
+                    'relative_difference': 0.0,
+                    'is_significant': False,
+                    'direction': 'neutral',
+                    'control_mean': float(control_mean[i]) if n_control[i] > 0 else 0.0,
+                    'treatment_mean': float(treatment_mean[i]) if n_treatment[i] > 0 else 0.0,
+                    'n_days': int(min_days[i]),
+                    'warning': 'Insufficient data (need at least 2 days per group)'
+                })
+                continue
+
+            prob = float(prob_beat_control[i])
+
+            # Determine significance and direction
+            if prob >= self.SIGNIFICANCE_THRESHOLD:
+                direction = "better" if higher_is_better[i] else "worse"
+            elif prob <= (1 - self.SIGNIFICANCE_THRESHOLD):
+                direction = "worse" if higher_is_better[i] else "better"
+            else:
+                direction = "neutral"
+
+            # Generate warning for small samples
+            warning = None
+            if min_days[i] < self.MIN_DAYS_WARNING:
+                warning = f"Very small sample size ({min_days[i]} days). Results may be unreliable."
+            elif min_days[i] < self.MIN_DAYS_FOR_NORMAL:
+                warning = f"Small sample size ({min_days[i]} days). Using t-distribution for more conservative estimates."
+
+            results.append({
+                'prob_beat_control': prob,
+                'credible_interval_lower': float(ci_lower[i]),
+                'credible_interval_upper': float(ci_upper[i]),
+                'mean_difference': float(mean_diff[i]),
+                'relative_difference': float(relative_diff[i]),
+                'is_significant': direction != "neutral",
+                'direction': direction,
+                'control_mean': float(control_mean[i]),
+                'treatment_mean': float(treatment_mean[i]),
+                'n_days': int(min_days[i]),
+                'warning': warning
+            })
 
-        return {
-            'prob_beat_control': float(prob_beat_control),
-            'credible_interval_lower': ci_lower,
-            'credible_interval_upper': ci_upper,
-            'mean_difference': mean_diff,
-            'relative_difference': float(relative_diff),
-            'is_significant': is_significant,
-            'direction': direction,
-            'control_mean': float(control_mean),
-            'treatment_mean': float(treatment_mean),
-            'n_days': min_days,
-            'warning': warning
-        }
+        return results
 
-    def analyze_metric(
-        self,
+    @staticmethod
+    def _significance_result(
         metric_id: str,
-        control_daily_values: List[float],
-        treatment_daily_values: List[float],
         column_index: int,
-        higher_is_better: bool = True
+        result: Optional[dict] = None,
+        error: Optional[Exception] = None
     ) -> SignificanceResult:
-        """
-        Run significance test for a single metric.
-
-        Args:
-            metric_id: Identifier for the metric
-            control_daily_values: Daily values for control group
-            treatment_daily_values: Daily values for treatment group
-            column_index: Index of the treatment column
-            higher_is_better: Whether higher values are better
-
-        Returns:
-            SignificanceResult with all test results
-        """
-        try:
-            result = self.bayesian_daily_comparison(
-                control_daily_values,
-                treatment_daily_values,
-                higher_is_better
-            )
-        except Exception as e:
+        """Build a SignificanceResult from a comparison dict (neutral on error)."""
+        if result is None:
             # Return neutral result on error
             return SignificanceResult(
                 metric_id=metric_id,
@@ -265,7 +328,7 @@ class StatisticalService:
                 control_mean=0.0,
                 treatment_mean=0.0,
                 n_days=0,
-                warning=f"Error computing significance: {str(e)}"
+                warning=f"Error computing significance: {str(error)}"
             )
 
         return SignificanceResult(
@@ -284,6 +347,38 @@ class StatisticalService:
             warning=result.get('warning')
         )
 
+    def analyze_metric(
+        self,
+        metric_id: str,
+        control_daily_values: List[float],
+        treatment_daily_values: List[float],
+        column_index: int,
+        higher_is_better: bool = True
+    ) -> SignificanceResult:
+        """
+        Run significance test for a single metric.
+
+        Args:
+            metric_id: Identifier for the metric
+            control_daily_values: Daily values for control group
+            treatment_daily_values: Daily values for treatment group
+            column_index: Index of the treatment column
+            higher_is_better: Whether higher values are better
+
+        Returns:
+            SignificanceResult with all test results
+        """
+        try:
+            result = self.bayesian_daily_comparison(
+                control_daily_values,
+                treatment_daily_values,
+                higher_is_better
+            )
+        except Exception as e:
+            return self._significance_result(metric_id, column_index, error=e)
+
+        return self._significance_result(metric_id, column_index, result)
+
     def analyze_all_metrics(
         self,
         metric_ids: List[str],
@@ -295,6 +390,8 @@ class StatisticalService:
         """
         Analyze all metrics across all treatment columns.
 
+        Each treatment column is compared for all metrics in one batch.
+
         Args:
             metric_ids: List of metric IDs to analyze
             control_daily_data: Dict mapping metric_id to daily values for control
@@ -308,27 +405,32 @@ class StatisticalService:
         if metric_directions is None:
             metric_directions = {}
 
-        results: Dict[str, List[SignificanceResult]] = {}
+        results: Dict[str, List[SignificanceResult]] = {metric_id: [] for metric_id in metric_ids}
+        if not metric_ids:
+            return results
 
-        for metric_id in metric_ids:
-            metric_results = []
-            higher_is_better = metric_directions.get(metric_id, self.get_higher_is_better(metric_id))
-
-            control_values = control_daily_data.get(metric_id, [])
-
-            for treatment_data, col_index in zip(treatment_columns_daily_data, column_indices):
-                treatment_values = treatment_data.get(metric_id, [])
+        control_values = [control_daily_data.get(metric_id, []) for metric_id in metric_ids]
+        directions = [
+            metric_directions.get(metric_id, self.get_higher_is_better(metric_id))
+            for metric_id in metric_ids
+        ]
 
-                result = self.analyze_metric(
-                    metric_id=metric_id,
-                    control_daily_values=control_values,
-                    treatment_daily_values=treatment_values,
-                    column_index=col_index,
-                    higher_is_better=higher_is_better
+        for treatment_data, col_index in zip(treatment_columns_daily_data, column_indices):
+            try:
+                comparisons = self.bayesian_daily_comparison_batch(
+                    control_values,
+                    [treatment_data.get(metric_id, []) for metric_id in metric_ids],
+                    directions
+                )
+                error = None
+            except Exception as e:
+                comparisons = [None] * len(metric_ids)
+                error = e
+
+            for metric_id, comparison in zip(metric_ids, comparisons):
+                results[metric_id].append(
+                    self._significance_result(metric_id, col_index, comparison, error)
                 )
-                metric_results.append(result)
-
-            results[metric_id] = metric_results
 
         return results
 
@@ -370,12 +472,7 @@ class StatisticalService:
         """
         Two-proportion z-test for comparing rates/proportions.
 
-        Uses the standard two-proportion z-test:
-        - p1 = x1/n1 (control proportion)
-        - p2 = x2/n2 (treatment proportion)
-        - p_pooled = (x1 + x2) / (n1 + n2)
-        - SE = sqrt(p_pooled * (1 - p_pooled) * (1/n1 + 1/n2))
-        - z = (p2 - p1) / SE
+        Single-cell form of proportion_comparison_batch.
 
         Args:
             control_successes: Numerator count for control (e.g., queries_pdp)
@@ -387,105 +484,127 @@ class StatisticalService:
         Returns:
             Dict with prob_beat_control, credible_interval, is_significant, etc.
         """
-        # Handle edge cases
-        if control_trials <= 0 or treatment_trials <= 0:
-            return {
-                'prob_beat_control': 0.5,
-                'credible_interval_lower': 0.0,
-                'credible_interval_upper': 0.0,
-                'mean_difference': 0.0,
-                'relative_difference': 0.0,
-                'is_significant': False,
-                'direction': 'neutral',
-                'control_mean': 0.0,
-                'treatment_mean': 0.0,
-                'n_control_events': control_trials,
-                'n_treatment_events': treatment_trials,
-                'control_successes': control_successes,
-                'treatment_successes': treatment_successes,
-                'warning': 'Insufficient data (zero trials in one or both groups)'
-            }
+        batch = self.proportion_comparison_batch(
+            [control_successes],
+            [control_trials],
+            [treatment_successes],
+            [treatment_trials],
+            [higher_is_better]
+        )
+        return {key: values[0] for key, values in self._batch_to_lists(batch).items()}
+
+    def proportion_comparison_batch(
+        self,
+        control_successes: ArrayLike,
+        control_trials: ArrayLike,
+        treatment_successes: ArrayLike,
+        treatment_trials: ArrayLike,
+        higher_is_better: Union[bool, ArrayLike] = True
+    ) -> Dict[str, np.ndarray]:
+        """
+        Two-proportion z-tests for many cells at once (one cell per array element).
+
+        Uses the standard two-proportion z-test:
+        - p1 = x1/n1 (control proportion)
+        - p2 = x2/n2 (treatment proportion)
+        - p_pooled = (x1 + x2) / (n1 + n2)
+        - SE = sqrt(p_pooled * (1 - p_pooled) * (1/n1 + 1/n2))
+        - z = (p2 - p1) / SE
+
+        Args:
+            control_successes: Numerator counts for control
+            control_trials: Denominator counts for control
+            treatment_successes: Numerator counts for treatment
+            treatment_trials: Denominator counts for treatment
+            higher_is_better: Whether higher proportion is better (scalar or per cell)
+
+        Returns:
+            Dict of arrays with the same keys as proportion_comparison
+        """
+        control_successes = np.asarray(control_successes, dtype=np.int64)
+        control_trials = np.asarray(control_trials, dtype=np.int64)
+        treatment_successes = np.asarray(treatment_successes, dtype=np.int64)
+        treatment_trials = np.asarray(treatment_trials, dtype=np.int64)
+        higher_is_better = np.broadcast_to(
+            np.asarray(higher_is_better, dtype=bool), control_trials.shape
+        )
+
+        # Cells with zero trials in one or both groups get a neutral result
+        valid = (control_trials > 0) & (treatment_trials > 0)
 
         # Ensure successes don't exceed trials
-        control_successes = min(control_successes, control_trials)
-        treatment_successes = min(treatment_successes, treatment_trials)
+        control_successes = np.where(valid, np.minimum(control_successes, control_trials), control_successes)
+        treatment_successes = np.where(valid, np.minimum(treatment_successes, treatment_trials), treatment_successes)
+
+        # Substitute 1 for invalid denominators (their results are overwritten below)
+        n_control = np.where(valid, control_trials, 1)
+        n_treatment = np.where(valid, treatment_trials, 1)
 
         # Calculate proportions
-        p_control = control_successes / control_trials
-        p_treatment = treatment_successes / treatment_trials
-
-        # Pooled proportion for standard error calculation
-        total_successes = control_successes + treatment_successes
-        total_trials = control_trials + treatment_trials
-        p_pooled = total_successes / total_trials
-
-        # Standard error of difference in proportions
-        # SE = sqrt(p_pooled * (1 - p_pooled) * (1/n1 + 1/n2))
-        if p_pooled == 0 or p_pooled == 1:
-            # Edge case: all successes or all failures
-            se = 0.0
-        else:
-            se = np.sqrt(p_pooled * (1 - p_pooled) * (1/control_trials + 1/treatment_trials))
-
-        # Difference in proportions
-        diff = p_treatment - p_control
+        p_control = control_successes / n_control
+        p_treatment = treatment_successes / n_treatment
+
+        # Pooled proportion; SE is 0 when all successes or all failures
+        p_pooled = (control_successes + treatment_successes) / (n_control + n_treatment)
+        se = np.where(
+            (p_pooled > 0) & (p_pooled < 1),
+            np.sqrt(np.maximum(p_pooled * (1 - p_pooled), 0.0) * (1 / n_control + 1 / n_treatment)),
+            0.0
+        )
 
-        # Calculate z-statistic
-        if se > 0:
-            z_stat = diff / se
-        else:
-            z_stat = 0.0
+        # Difference in proportions and z-statistic
+        diff = p_treatment - p_control
+        z_stat = np.where(se > 0, diff / np.where(se > 0, se, 1.0), 0.0)
 
         # Two-tailed p-value
-        p_value = 2 * (1 - stats.norm.cdf(abs(z_stat)))
+        p_value = 2 * (1 - ndtr(np.abs(z_stat)))
 
-        # One-tailed probability (P(treatment > control))
-        if higher_is_better:
-            prob_beat_control = 1 - stats.norm.cdf(-z_stat)  # P(Z > -z) = P(diff > 0)
-        else:
-            prob_beat_control = stats.norm.cdf(-z_stat)  # P(Z < -z) = P(diff < 0)
+        # One-tailed probability: P(diff > 0) if higher is better, else P(diff < 0)
+        prob_beat_control = np.where(higher_is_better, 1 - ndtr(-z_stat), ndtr(-z_stat))
 
         # 95% confidence interval for difference in proportions
-        z_critical = stats.norm.ppf(0.975)  # 1.96 for 95% CI
-        ci_lower = diff - z_critical * se
-        ci_upper = diff + z_critical * se
-
-        # Relative difference
-        if p_control > 0:
-            relative_diff = diff / p_control
-        else:
-            relative_diff = 0.0 if diff == 0 else float('inf')
-
-        # Determine significance (using p < 0.05)
-        is_significant = p_value < 0.05
-
-        # Determine direction
-        if is_significant:
-            if diff > 0:
-                direction = "better" if higher_is_better else "worse"
-            else:
-                direction = "worse" if higher_is_better else "better"
-        else:
-            direction = "neutral"
-
-        # Generate warnings for small samples
-        warning = None
-        min_events = min(control_trials, treatment_trials)
-        if min_events < 30:
-            warning = f"Small sample size ({min_events} events). Normal approximation may be unreliable."
-        elif min(control_successes, treatment_successes) < 5:
-            warning = "Very few successes in one group. Consider using exact test."
+        ci_lower = diff - self.Z_CRITICAL_95 * se
+        ci_upper = diff + self.Z_CRITICAL_95 * se
+
+        # Relative difference (inf when control proportion is 0 but treatment is not)
+        relative_diff = np.where(
+            p_control > 0,
+            diff / np.where(p_control > 0, p_control, 1.0),
+            np.where(diff == 0, 0.0, np.inf)
+        )
+
+        # Significance (p < 0.05) and direction
+        is_significant = valid & (p_value < self.P_VALUE_THRESHOLD)
+        direction = np.where(
+            is_significant,
+            np.where((diff > 0) == higher_is_better, "better", "worse"),
+            "neutral"
+        )
+
+        # Warnings for small samples
+        min_events = np.minimum(control_trials, treatment_trials)
+        min_successes = np.minimum(control_successes, treatment_successes)
+        warning = np.full(control_trials.shape, None, dtype=object)
+        few_successes = valid & (min_events >= self.MIN_EVENTS_WARNING) & (min_successes < self.MIN_SUCCESSES_WARNING)
+        warning[few_successes] = "Very few successes in one group. Consider using exact test."
+        small_sample = valid & (min_events < self.MIN_EVENTS_WARNING)
+        for i in np.flatnonzero(small_sample):
+            warning[i] = f"Small sample size ({min_events[i]} events). Normal approximation may be unreliable."
+        warning[~valid] = "Insufficient data (zero trials in one or both groups)"
+
+        def neutral(values, default=0.0):
+            return np.where(valid, values, default)
 
         return {
-            'prob_beat_control': float(prob_beat_control),
-            'credible_interval_lower': float(ci_lower),
-            'credible_interval_upper': float(ci_upper),
-            'mean_difference': float(diff),
-            'relative_difference': float(relative_diff),
+            'prob_beat_control': neutral(prob_beat_control, 0.5),
+            'credible_interval_lower': neutral(ci_lower),
+            'credible_interval_upper': neutral(ci_upper),
+            'mean_difference': neutral(diff),
+            'relative_difference': neutral(relative_diff),
             'is_significant': is_significant,
             'direction': direction,
-            'control_mean': float(p_control),
-            'treatment_mean': float(p_treatment),
+            'control_mean': neutral(p_control),
+            'treatment_mean': neutral(p_treatment),
             'n_control_events': control_trials,
             'n_treatment_events': treatment_trials,
             'control_successes': control_successes,
@@ -493,6 +612,56 @@ class StatisticalService:
             'warning': warning
         }
 
+    @staticmethod
+    def _batch_to_lists(batch: Dict[str, np.ndarray]) -> Dict[str, list]:
+        """Convert batch result arrays to lists of native Python values."""
+        return {key: values.tolist() for key, values in batch.items()}
+
+    def analyze_proportion_metrics_batch(
+        self,
+        metric_ids: Sequence[str],
+        column_indices: Sequence[int],
+        control_successes: ArrayLike,
+        control_trials: ArrayLike,
+        treatment_successes: ArrayLike,
+        treatment_trials: ArrayLike,
+        higher_is_better: Union[bool, ArrayLike] = True
+    ) -> List[ProportionSignificanceResult]:
+        """
+        Run proportion-based significance tests for many cells at once.
+
+        Args:
+            metric_ids: Metric identifier of each cell
+            column_indices: Treatment column index of each cell
+            control_successes: Numerator counts for control
+            control_trials: Denominator counts for control
+            treatment_successes: Numerator counts for treatment
+            treatment_trials: Denominator counts for treatment
+            higher_is_better: Whether higher proportion is better (scalar or per cell)
+
+        Returns:
+            List of ProportionSignificanceResult, one per cell in input order
+        """
+        batch = self._batch_to_lists(self.proportion_comparison_batch(
+            control_successes,
+            control_trials,
+            treatment_successes,
+            treatment_trials,
+            higher_is_better
+        ))
+        keys = list(batch.keys())
+
+        return [
+            ProportionSignificanceResult(
+                metric_id=metric_id,
+                column_index=column_index,
+                **dict(zip(keys, values))
+            )
+            for metric_id, column_index, *values in zip(
+                metric_ids, column_indices, *batch.values()
+            )
+        ]
+
     def analyze_proportion_metric(
         self,
         metric_id: str,
@@ -0,0 +1,178 @@
+"""
+Per-request stage timing for the analytics pipeline.
+
+ServerTimingMiddleware (middleware.py) opens a RequestTimings for each API
+request; code on the hot path records named stages into it:
+
+- route: rollup routing (QueryRouterService via DataService.route_query)
+- schema: schema/metrics configuration loaded from the ORM
+- sql_build: SQL generation
+- cache: query cache lookup
+- cube: totals summed from an in-process rollup cube
+- bq_queue / bq_exec: BigQuery job pending and running time (job statistics)
+- download: fetching results (to_dataframe / to_arrow)
+- local_exec: query run by the local rollup engine (DuckDB)
+- calc_metrics: calculated metrics computed in Python
+- rows: building response rows
+- render: JSON rendering
+
+The stages are reported in the Server-Timing response header (visible in
+browser dev tools) and fed to a rolling per-endpoint, per-stage latency
+summary (get_latency_summary) served by the admin timings endpoint.
+Queries of one request run concurrently, so stage durations are summed
+across threads and can add up to more than 'total'.
+
+Outside a request (management commands, background threads) recording is a
+no-op.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+
+class RequestTimings:
+    """Stage durations (ms) for one request; shared by its query pool threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def record(self, stage: str, duration_ms: float) -> None:
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + duration_ms
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """Stage -> total duration (ms), in the order stages were first recorded."""
+        with self._lock:
+            return dict(self.durations)
+
+    def header(self) -> str:
+        """Server-Timing header value."""
+        with self._lock:
+            counts = dict(self.counts)
+        parts = []
+        for stage, duration in self.snapshot().items():
+            desc = f';desc="{counts[stage]}x"' if counts[stage] > 1 else ''
+            parts.append(f"{stage}{desc};dur={duration:.1f}")
+        return ', '.join(parts)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+
+def start_request_timings() -> Tuple[RequestTimings, object]:
+    """Open timings for the current request. Returns (timings, token for end_request_timings)."""
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def end_request_timings(token) -> None:
+    _current_timings.reset(token)
+
+
+def record(stage: str, duration_ms: float) -> None:
+    """Record a stage duration for the current request (no-op outside a request)."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.record(stage, duration_ms)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the enclosed block as a stage of the current request."""
+    if _current_timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, (time.perf_counter() - start) * 1000)
+
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator form of timed()."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LatencySummary:
+    """Rolling latency samples per (endpoint, stage) for this worker process."""
+
+    def __init__(self, sample_size: Optional[int] = None):
+        self.sample_size = sample_size or settings.LATENCY_SUMMARY_SAMPLE_SIZE
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, str], Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.sample_size)
+        )
+        self._totals: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def add(self, endpoint: str, timings: RequestTimings) -> None:
+        """Add one request's stage durations."""
+        durations = timings.snapshot()
+        with self._lock:
+            for stage, duration in durations.items():
+                self._samples[(endpoint, stage)].append(duration)
+                self._totals[(endpoint, stage)] += 1
+
+    def summary(self, endpoint: Optional[str] = None) -> List[Dict]:
+        """
+        Percentiles over the most recent samples.
+
+        Returns:
+            One dict per (endpoint, stage): count (all time), samples, mean, p50, p95, p99, max (ms)
+        """
+        with self._lock:
+            items = [
+                (key, np.array(samples), self._totals[key])
+                for key, samples in self._samples.items()
+                if samples and (endpoint is None or key[0] == endpoint)
+            ]
+
+        results = []
+        for (ep, stage), values, count in sorted(items, key=lambda item: item[0]):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            results.append({
+                'endpoint': ep,
+                'stage': stage,
+                'count': count,
+                'samples': len(values),
+                'mean_ms': round(float(values.mean()), 2),
+                'p50_ms': round(float(p50), 2),
+                'p95_ms': round(float(p95), 2),
+                'p99_ms': round(float(p99), 2),
+                'max_ms': round(float(values.max()), 2),
+            })
+        return results
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+# Global instance
+_latency_summary: Optional[LatencySummary] = None
+
+
+def get_latency_summary() -> LatencySummary:
+    """Get the latency summary instance (singleton)."""
+    global _latency_summary
+    if _latency_summary is None:
+        _latency_summary = LatencySummary()
+    return _latency_summary
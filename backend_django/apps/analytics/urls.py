@@ -4,6 +4,8 @@ URL configuration for analytics app.
 from django.urls import path
 from .views import (
     PivotView,
+    PivotBatchView,
+    PivotExportView,
     PivotChildrenView,
     DimensionValuesView,
     TableInfoView,
@@ -31,6 +33,8 @@ urlpatterns = [
 
     # Pivot table endpoints
     path('pivot/', PivotView.as_view(), name='pivot'),
+    path('pivot/batch/', PivotBatchView.as_view(), name='pivot-batch'),
+    path('pivot/export/', PivotExportView.as_view(), name='pivot-export'),
     path('pivot/children/', PivotChildrenView.as_view(), name='pivot-children-all'),
     path(
         'pivot/<str:dimension>/<str:value>/children/',
@@ -2,22 +2,31 @@
 Analytics views for pivot tables and data queries.
 """
 import logging
+import re
+from typing import Optional
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from django.utils import timezone
 import json
 
+from apps.core.exceptions import BigQueryError
 from apps.tables.models import BigQueryTable, Visibility
 from apps.tables.serializers import BigQueryTableSerializer, BigQueryTableCreateSerializer
 from .services.data_service import DataService
 from .services import StatisticalService
+from .services.export_writers import EXPORT_FORMATS, encode_batches
+from .services.query_job_registry import get_job_registry
 from .serializers import (
     PivotResponseSerializer,
+    PivotBatchRequestSerializer,
+    PivotBatchResponseSerializer,
     PivotChildRowSerializer,
     TableInfoSerializer,
     SignificanceRequestSerializer,
@@ -39,6 +48,7 @@ def parse_dimension_filters(request) -> dict:
         'table_id', 'skip_count', 'metrics', 'require_rollup', 'pivot_dimensions',
         'custom_dimension', 'custom_metrics',  # Custom dimension/metric params
         'search',  # Search parameter for dimension values
+        'export_format',  # Pivot export format
         '_t', '_'  # Cache-busting parameters
     }
 
@@ -49,6 +59,25 @@ def parse_dimension_filters(request) -> dict:
     return dimension_filters
 
 
+# HTTP status for query errors the caller can act on
+QUERY_ERROR_STATUS = {
+    'query_timeout': status.HTTP_504_GATEWAY_TIMEOUT,
+    'query_too_large': status.HTTP_400_BAD_REQUEST,
+    'budget_exceeded': status.HTTP_429_TOO_MANY_REQUESTS,
+    'query_cancelled': status.HTTP_409_CONFLICT,
+}
+
+
+def query_error_response(e: Exception) -> Optional[Response]:
+    """Structured response for expected query errors (timeout, cost limits, cancellation), else None."""
+    if isinstance(e, BigQueryError) and e.code in QUERY_ERROR_STATUS:
+        return Response(
+            {'error': e.message, 'error_type': e.code, 'details': e.details},
+            status=QUERY_ERROR_STATUS[e.code]
+        )
+    return None
+
+
 def get_table_and_service(request, table_id=None):
     """Get BigQueryTable and DataService for a request."""
     # Get table_id from query param or path param
@@ -147,6 +176,9 @@ class PivotView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
             logger.exception(f"Pivot error: {e}")
             return Response(
                 {'error': str(e)},
@@ -154,6 +186,154 @@ class PivotView(APIView):
             )
 
 
+class PivotBatchView(APIView):
+    """Multi-column pivot endpoint: every table-dimension combination in one scan."""
+    permission_classes = []
+
+    def post(self, request):
+        """
+        Get pivot data for every column of a table-dimension layout.
+
+        Request body:
+        - dimensions: Row dimensions
+        - table_dimensions: Dimensions that split the table into columns
+        - combinations: Table-dimension values of each column
+        - primary_index: Column whose top rows define the rows of every column (default 0)
+        - filters: Base filters (date range, dimension filters)
+        - limit: Max rows per column (default 100)
+        - custom_metrics: List of custom metric IDs
+        - require_rollup: Require rollup availability (default True)
+
+        Query params:
+        - table_id: BigQuery table ID
+        """
+        serializer = PivotBatchRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        request_data = serializer.validated_data
+
+        table, data_service, error = get_table_and_service(request)
+        if error:
+            return error
+
+        try:
+            filters = request_data['filters']
+            filter_dict = {
+                'start_date': str(filters.get('start_date')) if filters.get('start_date') else None,
+                'end_date': str(filters.get('end_date')) if filters.get('end_date') else None,
+                'date_range_type': filters.get('date_range_type', 'absolute'),
+                'relative_date_preset': filters.get('relative_date_preset'),
+                'dimension_filters': filters.get('dimension_filters', {})
+            }
+
+            result = data_service.get_pivot_batch_data(
+                dimensions=request_data['dimensions'],
+                table_dimensions=request_data['table_dimensions'],
+                combinations=request_data['combinations'],
+                filters=filter_dict,
+                primary_index=request_data['primary_index'],
+                limit=request_data['limit'],
+                require_rollup=request_data['require_rollup'],
+                custom_metric_ids=request_data.get('custom_metrics') or None
+            )
+
+            return Response(PivotBatchResponseSerializer(result).data)
+
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
+            logger.exception(f"Batch pivot error: {e}")
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PivotExportView(APIView):
+    """Streaming export of every pivot group as CSV, NDJSON or Parquet."""
+    permission_classes = []
+
+    def get(self, request):
+        """
+        Export the full pivot (all groups, not a page) as a file download.
+
+        The query runs once and result pages are streamed straight into the
+        response, so memory stays constant however many rows are exported.
+
+        Query params:
+        - export_format: "csv" (default), "ndjson" or "parquet"
+        - dimensions: List of dimension columns to group by
+        - start_date, end_date: Date range (YYYY-MM-DD)
+        - date_range_type: "absolute" or "relative"
+        - relative_date_preset: Preset like "last_7_days"
+        - table_id: BigQuery table ID
+        - require_rollup: Require rollup availability (default False)
+        - custom_metrics: List of custom metric IDs to compute
+        - Dynamic dimension filters: ?country=USA&channel=Web
+        """
+        table, data_service, error = get_table_and_service(request)
+        if error:
+            return error
+
+        export_format = request.query_params.get('export_format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Unsupported export_format '{export_format}'. Supported: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            dimensions = request.query_params.getlist('dimensions', [])
+            filters = {
+                'start_date': request.query_params.get('start_date'),
+                'end_date': request.query_params.get('end_date'),
+                'date_range_type': request.query_params.get('date_range_type', 'absolute'),
+                'relative_date_preset': request.query_params.get('relative_date_preset'),
+                'dimension_filters': parse_dimension_filters(request)
+            }
+
+            batches = data_service.stream_pivot_export(
+                dimensions=dimensions,
+                filters=filters,
+                require_rollup=request.query_params.get('require_rollup', '').lower() == 'true',
+                custom_metric_ids=request.query_params.getlist('custom_metrics') or None
+            )
+
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
+            logger.exception(f"Pivot export error: {e}")
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        filename = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{table.name}_{'_'.join(dimensions) or 'total'}")
+        filename = f"{filename}.{extension}"
+        response = StreamingHttpResponse(
+            encode_batches(batches, export_format),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Stop proxies (e.g. nginx) from buffering the whole export
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class PivotChildrenView(APIView):
     """DISABLED: Pivot drill-down to search terms is no longer supported."""
     permission_classes = []
@@ -567,11 +747,36 @@ class BigQueryCancelView(APIView):
     permission_classes = []
 
     def post(self, request):
-        """Cancel running queries (placeholder - not fully implemented)."""
+        """
+        Cancel running queries.
+
+        Body/query params:
+            request_id: X-Request-ID of the request whose queries to cancel
+                (e.g. a pivot load superseded by a filter change). Without it,
+                all of the authenticated user's running queries are cancelled.
+
+        Only the caller's own queries are cancelled (anonymous callers reach
+        only queries started without a user).
+        """
+        request_id = request.data.get('request_id') or request.query_params.get('request_id')
+        registry = get_job_registry()
+
+        if request_id:
+            cancelled = registry.cancel_request(str(request_id), user=request.user)
+            message = f'Cancelled {cancelled} queries for request {request_id}'
+        elif request.user.is_authenticated:
+            cancelled = registry.cancel_user(request.user)
+            message = f'Cancelled {cancelled} running queries'
+        else:
+            return Response(
+                {'error': 'request_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         return Response({
             'success': True,
-            'message': 'Query cancellation not yet implemented in Django',
-            'cancelled_count': 0
+            'message': message,
+            'cancelled_count': cancelled
         })
 
 
@@ -1008,9 +1213,10 @@ class SignificanceView(APIView):
 
             # Get route decision - need rollup with ALL filter dimensions
             from apps.analytics.services.query_router_service import QueryRouterService
-            from apps.rollups.models import RollupConfig
+            from apps.analytics.services.rollup_index import get_rollup_index
 
-            rollup_config = RollupConfig.objects.filter(bigquery_table=table).first()
+            rollup_index = get_rollup_index(table.id, bq_service.schema)
+            rollup_config = rollup_index.rollup_config
             use_rollup = False
             rollup_table_path = None
 
@@ -1027,7 +1233,9 @@ class SignificanceView(APIView):
                 rollup_config=rollup_config,
                 schema_config=schema_config,
                 source_project_id=table.project_id,
-                source_dataset=table.dataset
+                source_dataset=table.dataset,
+                schema=bq_service.schema,
+                index=rollup_index
             )
 
             # Create routing filter dict (values don't matter for routing, just keys)
@@ -1058,174 +1266,117 @@ class SignificanceView(APIView):
             rollup_table_path = route_decision.rollup_table_path
             logger.info(f"Significance test routing: use_rollup=True, rollup={rollup_table_path}")
 
-            # Helper function to fetch aggregated totals with combined filters
-            def fetch_aggregated_totals(extra_filters=None):
-                combined_filters = dict(base_dim_filters)
-                if extra_filters:
-                    combined_filters.update(extra_filters)
-
-                # Always use rollup table (raw table access is not allowed)
-                return bq_service.query_rollup_aggregates(
-                    rollup_table_path=rollup_table_path,
-                    metric_ids=list(base_metrics_needed),
-                    start_date=filter_dict.get('start_date'),
-                    end_date=filter_dict.get('end_date'),
-                    dimension_filters=combined_filters,
-                    date_range_type=filter_dict.get('date_range_type', 'absolute'),
-                    relative_date_preset=filter_dict.get('relative_date_preset')
-                )
+            # Aggregate every (column x row) cell - plus column totals for _pct
+            # metrics - in one conditional-aggregation query on the rollup
+            column_filters = {'control': control_dim_filters}
+            for index, treatment_col in enumerate(treatment_columns):
+                column_filters[f"treatment_{index}"] = treatment_col.get('dimension_filters') or {}
+
+            row_filters_by_key = {
+                f"row_{index}": row.get('dimension_filters') or {}
+                for index, row in enumerate(rows)
+            } if rows else {}
+
+            cells = {}
+            for column_key, col_filters in column_filters.items():
+                if pct_metrics or not rows:
+                    cells[column_key] = col_filters
+                for row_key, row_filters in row_filters_by_key.items():
+                    cells[f"{column_key}:{row_key}"] = {**col_filters, **row_filters}
+
+            # Always use rollup table (raw table access is not allowed)
+            cell_totals = bq_service.query_rollup_aggregates_batch(
+                rollup_table_path=rollup_table_path,
+                metric_ids=list(base_metrics_needed),
+                cells=cells,
+                start_date=filter_dict.get('start_date'),
+                end_date=filter_dict.get('end_date'),
+                dimension_filters=base_dim_filters,
+                date_range_type=filter_dict.get('date_range_type', 'absolute'),
+                relative_date_preset=filter_dict.get('relative_date_preset')
+            )
+
+            def fetch_aggregated_totals(column_key, row_key=None):
+                return cell_totals[f"{column_key}:{row_key}" if row_key else column_key]
 
-            # Helper function to run proportion test for a specific row
-            def run_test_for_row(row_filters=None, row_id=None):
-                # Fetch control aggregated totals
-                control_combined = dict(control_dim_filters)
-                if row_filters:
-                    control_combined.update(row_filters)
-                control_totals = fetch_aggregated_totals(control_combined)
-
-                # Build results for each treatment column
-                all_metric_results = {}
-
-                for treatment_col in treatment_columns:
-                    # Fetch treatment aggregated totals
-                    treatment_combined = dict(treatment_col.get('dimension_filters') or {})
-                    if row_filters:
-                        treatment_combined.update(row_filters)
-                    treatment_totals = fetch_aggregated_totals(treatment_combined)
-
-                    # Run proportion test for each eligible metric
+            # Collect every (row x treatment x metric) cell, then test them all at once
+            cell_metric_ids = []
+            cell_column_indices = []
+            cell_row_ids = []
+            cell_counts = []  # (control_successes, control_trials, treatment_successes, treatment_trials)
+            cell_higher_is_better = []
+
+            row_keys = [(f"row_{index}", row.get('row_id')) for index, row in enumerate(rows)] if rows else [(None, None)]
+            higher_is_better_by_metric = {
+                metric_id: stat_service.get_higher_is_better(metric_id) for metric_id in eligible_metrics
+            }
+
+            for row_key, row_id in row_keys:
+                control_totals = fetch_aggregated_totals('control', row_key)
+
+                for index, treatment_col in enumerate(treatment_columns):
+                    treatment_totals = fetch_aggregated_totals(f"treatment_{index}", row_key)
+
+                    # Rate metrics: numerator / denominator
                     for metric_id, components in eligible_metrics.items():
                         numerator_id = components['numerator_metric_id']
                         denominator_id = components['denominator_metric_id']
-
-                        # Get counts
-                        control_successes = int(control_totals.get(numerator_id, 0))
-                        control_trials = int(control_totals.get(denominator_id, 0))
-                        treatment_successes = int(treatment_totals.get(numerator_id, 0))
-                        treatment_trials = int(treatment_totals.get(denominator_id, 0))
-
+                        counts = (
+                            int(control_totals.get(numerator_id, 0)),
+                            int(control_totals.get(denominator_id, 0)),
+                            int(treatment_totals.get(numerator_id, 0)),
+                            int(treatment_totals.get(denominator_id, 0)),
+                        )
                         # Skip if no trials (avoid division by zero)
-                        if control_trials == 0 and treatment_trials == 0:
+                        if counts[1] == 0 and counts[3] == 0:
                             continue
 
-                        # Get direction preference
-                        higher_is_better = stat_service.get_higher_is_better(metric_id)
-
-                        # Run proportion significance test
-                        result = stat_service.analyze_proportion_metric(
-                            metric_id=metric_id,
-                            control_successes=control_successes,
-                            control_trials=control_trials,
-                            treatment_successes=treatment_successes,
-                            treatment_trials=treatment_trials,
-                            column_index=treatment_col['column_index'],
-                            higher_is_better=higher_is_better
-                        )
+                        cell_metric_ids.append(metric_id)
+                        cell_column_indices.append(treatment_col['column_index'])
+                        cell_row_ids.append(row_id)
+                        cell_counts.append(counts)
+                        cell_higher_is_better.append(higher_is_better_by_metric[metric_id])
 
-                        # Convert to dict for serializer
-                        result_item = {
-                            'metric_id': result.metric_id,
-                            'column_index': result.column_index,
-                            'row_id': row_id,
-                            'prob_beat_control': result.prob_beat_control,
-                            'credible_interval_lower': result.credible_interval_lower,
-                            'credible_interval_upper': result.credible_interval_upper,
-                            'mean_difference': result.mean_difference,
-                            'relative_difference': result.relative_difference,
-                            'is_significant': result.is_significant,
-                            'direction': result.direction,
-                            'control_mean': result.control_mean,
-                            'treatment_mean': result.treatment_mean,
-                            'n_control_events': result.n_control_events,
-                            'n_treatment_events': result.n_treatment_events,
-                            'control_successes': result.control_successes,
-                            'treatment_successes': result.treatment_successes,
-                            'warning': result.warning
-                        }
-
-                        if metric_id not in all_metric_results:
-                            all_metric_results[metric_id] = []
-                        all_metric_results[metric_id].append(result_item)
-
-                    # Fetch column totals ONCE per treatment column (for _pct metrics)
-                    # These don't change per metric, so fetch outside the loop
+                    # _pct metrics: cell value / column total
                     if pct_metrics:
-                        control_column_totals = fetch_aggregated_totals(control_dim_filters)
-                        treatment_column_totals = fetch_aggregated_totals(
-                            treatment_col.get('dimension_filters') or {}
-                        )
+                        control_column_totals = fetch_aggregated_totals('control')
+                        treatment_column_totals = fetch_aggregated_totals(f"treatment_{index}")
 
-                    # Run proportion test for _pct metrics
                     for metric_id, pct_info in pct_metrics.items():
                         base_metric_id = pct_info['base_metric_id']
-
-                        # Get counts
-                        control_successes = int(control_totals.get(base_metric_id, 0))
-                        control_trials = int(control_column_totals.get(base_metric_id, 0))
-                        treatment_successes = int(treatment_totals.get(base_metric_id, 0))
-                        treatment_trials = int(treatment_column_totals.get(base_metric_id, 0))
-
-                        # Skip if no trials
-                        if control_trials == 0 and treatment_trials == 0:
+                        counts = (
+                            int(control_totals.get(base_metric_id, 0)),
+                            int(control_column_totals.get(base_metric_id, 0)),
+                            int(treatment_totals.get(base_metric_id, 0)),
+                            int(treatment_column_totals.get(base_metric_id, 0)),
+                        )
+                        if counts[1] == 0 and counts[3] == 0:
                             continue
 
+                        cell_metric_ids.append(metric_id)
+                        cell_column_indices.append(treatment_col['column_index'])
+                        cell_row_ids.append(row_id)
+                        cell_counts.append(counts)
                         # For _pct metrics, higher percentage is typically better
-                        higher_is_better = True
-
-                        # Run proportion significance test
-                        result = stat_service.analyze_proportion_metric(
-                            metric_id=metric_id,
-                            control_successes=control_successes,
-                            control_trials=control_trials,
-                            treatment_successes=treatment_successes,
-                            treatment_trials=treatment_trials,
-                            column_index=treatment_col['column_index'],
-                            higher_is_better=higher_is_better
-                        )
-
-                        result_item = {
-                            'metric_id': result.metric_id,
-                            'column_index': result.column_index,
-                            'row_id': row_id,
-                            'prob_beat_control': result.prob_beat_control,
-                            'credible_interval_lower': result.credible_interval_lower,
-                            'credible_interval_upper': result.credible_interval_upper,
-                            'mean_difference': result.mean_difference,
-                            'relative_difference': result.relative_difference,
-                            'is_significant': result.is_significant,
-                            'direction': result.direction,
-                            'control_mean': result.control_mean,
-                            'treatment_mean': result.treatment_mean,
-                            'n_control_events': result.n_control_events,
-                            'n_treatment_events': result.n_treatment_events,
-                            'control_successes': result.control_successes,
-                            'treatment_successes': result.treatment_successes,
-                            'warning': result.warning
-                        }
-
-                        if metric_id not in all_metric_results:
-                            all_metric_results[metric_id] = []
-                        all_metric_results[metric_id].append(result_item)
-
-                return all_metric_results
+                        cell_higher_is_better.append(True)
+
+            all_results = {}
+            if cell_counts:
+                control_successes, control_trials, treatment_successes, treatment_trials = zip(*cell_counts)
+                results = stat_service.analyze_proportion_metrics_batch(
+                    metric_ids=cell_metric_ids,
+                    column_indices=cell_column_indices,
+                    control_successes=control_successes,
+                    control_trials=control_trials,
+                    treatment_successes=treatment_successes,
+                    treatment_trials=treatment_trials,
+                    higher_is_better=cell_higher_is_better
+                )
 
-            # Check if per-row testing is requested
-            if rows:
-                # Run per-row significance tests
-                all_results = {}
-                for row in rows:
-                    row_results = run_test_for_row(
-                        row.get('dimension_filters'),
-                        row.get('row_id')
-                    )
-                    # Merge results
-                    for metric_id, metric_results in row_results.items():
-                        if metric_id not in all_results:
-                            all_results[metric_id] = []
-                        all_results[metric_id].extend(metric_results)
-            else:
-                # Run totals-only significance test
-                all_results = run_test_for_row(None, None)
+                for result, row_id in zip(results, cell_row_ids):
+                    result_item = result.to_dict()
+                    result_item['row_id'] = row_id
+                    all_results.setdefault(result.metric_id, []).append(result_item)
 
             return Response({
                 'control_column_index': control_column['column_index'],
@@ -1238,6 +1389,9 @@ class SignificanceView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
             logger.exception(f"Error calculating significance: {e}")
             return Response(
                 {'error': f"Error calculating significance: {str(e)}"},
@@ -1390,6 +1544,9 @@ class OverviewView(APIView):
             return Response(result)
 
         except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
             logger.exception(f"Error getting overview metrics: {e}")
             return Response(
                 {'error': str(e)},
@@ -1442,6 +1599,9 @@ class TrendsView(APIView):
             return Response(result)
 
         except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
             logger.exception(f"Error getting trends data: {e}")
             return Response(
                 {'error': str(e)},
@@ -1497,6 +1657,9 @@ class BreakdownView(APIView):
             return Response(result)
 
         except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
             logger.exception(f"Error getting breakdown data: {e}")
             return Response(
                 {'error': str(e)},
@@ -1551,6 +1714,9 @@ class SearchTermsView(APIView):
             return Response(result)
 
         except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
             logger.exception(f"Error getting search terms: {e}")
             return Response(
                 {'error': str(e)},
@@ -1595,6 +1761,9 @@ class FilterOptionsView(APIView):
             return Response(result)
 
         except Exception as e:
+            response = query_error_response(e)
+            if response is not None:
+                return response
             logger.exception(f"Error getting filter options: {e}")
             return Response(
                 {'error': str(e)},
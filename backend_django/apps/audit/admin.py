@@ -2,7 +2,7 @@
 Admin configuration for audit app.
 """
 from django.contrib import admin
-from .models import QueryLog, CacheEntry
+from .models import QueryLog, CacheEntry, ActiveQueryJob
 
 
 @admin.register(QueryLog)
@@ -17,6 +17,7 @@ class QueryLogAdmin(admin.ModelAdmin):
                        'execution_time_ms', 'bytes_processed', 'bytes_billed', 'row_count',
                        'is_success', 'error', 'cache_hit')
     date_hierarchy = 'created_at'
+    show_full_result_count = False  # Avoid COUNT(*) over the whole partitioned log
 
     fieldsets = (
         (None, {'fields': ('id', 'query_type', 'endpoint')}),
@@ -38,7 +39,7 @@ class QueryLogAdmin(admin.ModelAdmin):
 class CacheEntryAdmin(admin.ModelAdmin):
     """Admin for CacheEntry model."""
 
-    list_display = ('cache_key_short', 'query_type', 'bigquery_table', 'row_count', 'hit_count', 'expires_at', 'is_expired_display')
+    list_display = ('cache_key_short', 'query_type', 'bigquery_table', 'row_count', 'size_bytes', 'hit_count', 'expires_at', 'is_expired_display')
     list_filter = ('query_type', 'created_at')
     search_fields = ('cache_key', 'bigquery_table__name')
     autocomplete_fields = ['bigquery_table']
@@ -49,7 +50,7 @@ class CacheEntryAdmin(admin.ModelAdmin):
         (None, {'fields': ('id', 'cache_key', 'query_type')}),
         ('Context', {'fields': ('bigquery_table',)}),
         ('Query', {'fields': ('sql_query',)}),
-        ('Data', {'fields': ('result_data', 'row_count')}),
+        ('Data', {'fields': ('result_data', 'row_count', 'size_bytes')}),
         ('Usage', {'fields': ('hit_count', 'last_accessed_at')}),
         ('Expiration', {'fields': ('created_at', 'expires_at')}),
     )
@@ -61,3 +62,20 @@ class CacheEntryAdmin(admin.ModelAdmin):
     @admin.display(boolean=True, description='Expired')
     def is_expired_display(self, obj):
         return obj.is_expired()
+
+
+@admin.register(ActiveQueryJob)
+class ActiveQueryJobAdmin(admin.ModelAdmin):
+    """Admin for ActiveQueryJob model."""
+
+    list_display = ('job_id', 'query_type', 'bigquery_table', 'user', 'request_id', 'created_at')
+    list_filter = ('query_type', 'created_at')
+    search_fields = ('job_id', 'request_id', 'bigquery_table__name', 'user__email')
+    readonly_fields = ('job_id', 'billing_project', 'location', 'request_id', 'bigquery_table',
+                       'user', 'query_type', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,39 @@
+"""
+Create upcoming QueryLog partitions and drop expired ones.
+
+The query log writer already does this hourly in each worker; run this
+from cron or a deploy hook to apply a retention change right away.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.audit import partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly QueryLog partitions and drop those past retention."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-months', type=int, default=None,
+            help="Override QUERY_LOG_RETENTION_MONTHS (0 keeps everything)"
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=None,
+            help="Override QUERY_LOG_PARTITIONS_AHEAD"
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            self.stdout.write("audit_querylog is not partitioned (PostgreSQL only); nothing to do")
+            return
+
+        result = partitions.maintain(options['ahead'], options['retention_months'])
+        if result is None:
+            self.stdout.write("Partition maintenance is running in another process; try again later")
+            return
+
+        created, dropped = result
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} partitions {[f'{m:%Y-%m}' for m in created]}, "
+            f"dropped {len(dropped)} {[f'{m:%Y-%m}' for m in dropped]}"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_gcp_oauth_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cacheentry',
+            name='size_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='cacheentry',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cacheentry',
+            index=models.Index(fields=['last_accessed_at'], name='audit_cache_last_ac_eb6578_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cacheentry',
+            index=models.Index(fields=['hit_count', 'last_accessed_at'], name='audit_cache_hit_cou_bef676_idx'),
+        ),
+    ]
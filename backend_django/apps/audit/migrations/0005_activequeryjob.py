@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-16 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_cacheentry_size_and_eviction'),
+        ('tables', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveQueryJob',
+            fields=[
+                ('job_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('billing_project', models.CharField(max_length=255)),
+                ('location', models.CharField(blank=True, default='', max_length=64)),
+                ('request_id', models.CharField(blank=True, default='', max_length=128)),
+                ('query_type', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('bigquery_table', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='active_query_jobs', to='tables.bigquerytable')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='active_query_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['request_id'], name='audit_activ_request_e7ea89_idx'),
+                    models.Index(fields=['user', 'created_at'], name='audit_activ_user_id_f843e3_idx'),
+                    models.Index(fields=['created_at'], name='audit_activ_created_a5ed31_idx'),
+                ],
+            },
+        ),
+    ]
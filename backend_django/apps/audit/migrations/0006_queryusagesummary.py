@@ -0,0 +1,90 @@
+# Generated by Django 5.2.9 on 2026-10-16 12:00
+
+import django.db.models.deletion
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+
+
+def backfill_usage_summary(apps, schema_editor):
+    """Build summary rows from the query logs written so far."""
+    QueryLog = apps.get_model('audit', 'QueryLog')
+    QueryUsageSummary = apps.get_model('audit', 'QueryUsageSummary')
+
+    grains = (
+        QueryLog.objects
+        .annotate(hour=TruncHour('created_at', tzinfo=dt_timezone.utc))
+        .values('hour', 'bigquery_table_id', 'user_id', 'query_type', 'endpoint')
+        .annotate(
+            query_count=Count('id'),
+            error_count=Count('id', filter=Q(is_success=False)),
+            cache_hit_count=Count('id', filter=Q(cache_hit=True)),
+            total_bytes_processed=Sum('bytes_processed'),
+            total_bytes_billed=Sum('bytes_billed'),
+            total_execution_time_ms=Sum('execution_time_ms'),
+        )
+        .order_by()
+    )
+
+    batch = []
+    for grain in grains.iterator(chunk_size=2000):
+        batch.append(QueryUsageSummary(
+            hour=grain['hour'],
+            bigquery_table_id=grain['bigquery_table_id'],
+            user_id=grain['user_id'],
+            query_type=grain['query_type'],
+            endpoint=grain['endpoint'],
+            query_count=grain['query_count'],
+            error_count=grain['error_count'],
+            cache_hit_count=grain['cache_hit_count'],
+            bytes_processed=grain['total_bytes_processed'] or 0,
+            bytes_billed=grain['total_bytes_billed'] or 0,
+            execution_time_ms=grain['total_execution_time_ms'] or 0,
+        ))
+        if len(batch) >= 2000:
+            QueryUsageSummary.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        QueryUsageSummary.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_activequeryjob'),
+        ('tables', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryUsageSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('query_type', models.CharField(max_length=50)),
+                ('endpoint', models.CharField(max_length=255)),
+                ('query_count', models.BigIntegerField(default=0)),
+                ('error_count', models.BigIntegerField(default=0)),
+                ('cache_hit_count', models.BigIntegerField(default=0)),
+                ('bytes_processed', models.BigIntegerField(default=0)),
+                ('bytes_billed', models.BigIntegerField(default=0)),
+                ('execution_time_ms', models.BigIntegerField(default=0)),
+                ('bigquery_table', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='usage_summaries', to='tables.bigquerytable')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='usage_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'indexes': [
+                    models.Index(fields=['hour'], name='audit_query_hour_777082_idx'),
+                    models.Index(fields=['user', 'hour'], name='audit_query_user_id_7502e2_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('hour', 'bigquery_table', 'user', 'query_type', 'endpoint'), name='audit_usage_summary_grain', nulls_distinct=False),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_usage_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.2.9 on 2026-10-16 12:00
+
+from datetime import date, datetime, time, timezone
+
+from django.db import migrations, models
+
+PARENT_TABLE = 'audit_querylog'
+
+# Months of partitions created ahead of the current month
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+        [PARENT_TABLE]
+    )
+    return cursor.fetchone() is not None
+
+
+def _recreate_constraints(schema_editor, constraints, partitioned):
+    """Recreate the primary key, foreign keys and indexes of a rebuilt audit_querylog."""
+    quote = schema_editor.quote_name
+    for name, info in constraints.items():
+        if info['primary_key']:
+            columns = [col for col in info['columns'] if col != 'created_at']
+            if partitioned:
+                columns.append('created_at')
+            schema_editor.execute(
+                f"ALTER TABLE {PARENT_TABLE} ADD CONSTRAINT {quote(name)} "
+                f"PRIMARY KEY ({', '.join(columns)})"
+            )
+        elif info['foreign_key']:
+            to_table, to_column = info['foreign_key']
+            schema_editor.execute(
+                f"ALTER TABLE {PARENT_TABLE} ADD CONSTRAINT {quote(name)} "
+                f"FOREIGN KEY ({info['columns'][0]}) REFERENCES {quote(to_table)} ({quote(to_column)}) "
+                f"DEFERRABLE INITIALLY DEFERRED"
+            )
+        elif info['index'] and not info['unique']:
+            orders = info.get('orders') or ['ASC'] * len(info['columns'])
+            columns = ', '.join(f"{quote(col)} {order}" for col, order in zip(info['columns'], orders))
+            schema_editor.execute(f"CREATE INDEX {quote(name)} ON {PARENT_TABLE} ({columns})")
+
+
+def partition_querylog(apps, schema_editor):
+    """
+    Rebuild audit_querylog as a table partitioned by month on created_at.
+
+    Rows are copied into the new table; indexes and foreign keys are
+    recreated with their original names. The primary key becomes
+    (id, created_at), as PostgreSQL requires the partition key in unique
+    constraints; Django still addresses rows by id. A DEFAULT partition
+    catches rows outside the monthly partitions (e.g. if maintenance
+    stopped), so inserts never fail for lack of a partition.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        if _is_partitioned(cursor):
+            return
+        constraints = connection.introspection.get_constraints(cursor, PARENT_TABLE)
+        cursor.execute(f"SELECT MIN(created_at) FROM {PARENT_TABLE}")
+        oldest = cursor.fetchone()[0]
+
+    new_table = f"{PARENT_TABLE}_partitioned"
+    schema_editor.execute(
+        f"CREATE TABLE {new_table} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE (created_at)"
+    )
+
+    now = datetime.now(timezone.utc)
+    first = date((oldest or now).year, (oldest or now).month, 1)
+    last = _add_months(date(now.year, now.month, 1), PARTITIONS_AHEAD)
+    month = first
+    while month <= last:
+        lower = datetime.combine(month, time.min, tzinfo=timezone.utc)
+        upper = datetime.combine(_add_months(month, 1), time.min, tzinfo=timezone.utc)
+        schema_editor.execute(
+            f"CREATE TABLE {PARENT_TABLE}_p{month:%Y%m} PARTITION OF {new_table} "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    schema_editor.execute(f"CREATE TABLE {PARENT_TABLE}_default PARTITION OF {new_table} DEFAULT")
+
+    schema_editor.execute(f"INSERT INTO {new_table} SELECT * FROM {PARENT_TABLE}")
+    schema_editor.execute(f"DROP TABLE {PARENT_TABLE}")
+    schema_editor.execute(f"ALTER TABLE {new_table} RENAME TO {PARENT_TABLE}")
+
+    _recreate_constraints(schema_editor, constraints, partitioned=True)
+
+
+def unpartition_querylog(apps, schema_editor):
+    """Rebuild audit_querylog as a plain table (reverse of partition_querylog)."""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            return
+        constraints = connection.introspection.get_constraints(cursor, PARENT_TABLE)
+
+    new_table = f"{PARENT_TABLE}_plain"
+    schema_editor.execute(f"CREATE TABLE {new_table} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)")
+    schema_editor.execute(f"INSERT INTO {new_table} SELECT * FROM {PARENT_TABLE}")
+    # Drops every partition with it
+    schema_editor.execute(f"DROP TABLE {PARENT_TABLE}")
+    schema_editor.execute(f"ALTER TABLE {new_table} RENAME TO {PARENT_TABLE}")
+
+    _recreate_constraints(schema_editor, constraints, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0006_queryusagesummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_querylog, unpartition_querylog),
+        migrations.AddIndex(
+            model_name='querylog',
+            index=models.Index(fields=['-created_at', '-id'], name='audit_query_created_8aa61f_idx'),
+        ),
+    ]
@@ -7,7 +7,12 @@ from django.utils import timezone
 
 
 class QueryLog(models.Model):
-    """Log of BigQuery queries executed."""
+    """
+    Log of BigQuery queries executed.
+
+    On PostgreSQL the table is partitioned by month on created_at (see
+    apps/audit/partitions.py); its primary key is (id, created_at).
+    """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
     # Reference to the table
@@ -54,6 +59,7 @@ class QueryLog(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
+            models.Index(fields=['-created_at', '-id']),  # Keyset pagination
             models.Index(fields=['query_type']),
             models.Index(fields=['bigquery_table', '-created_at']),
             models.Index(fields=['user', '-created_at']),
@@ -63,6 +69,59 @@ class QueryLog(models.Model):
         return f"{self.query_type} at {self.created_at}"
 
 
+class QueryUsageSummary(models.Model):
+    """
+    QueryLog counters pre-aggregated per (hour, table, user, query_type, endpoint).
+
+    Updated incrementally whenever query logs are written (see
+    apps/audit/usage_summary.py), so usage statistics read a few rows per hour
+    instead of scanning every log.
+    """
+    hour = models.DateTimeField()  # Start of the hour (UTC)
+
+    bigquery_table = models.ForeignKey(
+        'tables.BigQueryTable',
+        on_delete=models.CASCADE,
+        related_name='usage_summaries',
+        null=True,
+        blank=True
+    )
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='usage_summaries',
+        null=True,
+        blank=True
+    )
+    query_type = models.CharField(max_length=50)
+    endpoint = models.CharField(max_length=255)
+
+    # Counters (sums over the grain)
+    query_count = models.BigIntegerField(default=0)
+    error_count = models.BigIntegerField(default=0)
+    cache_hit_count = models.BigIntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0)
+    bytes_billed = models.BigIntegerField(default=0)
+    execution_time_ms = models.BigIntegerField(default=0)  # Total; average = / query_count
+
+    class Meta:
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'bigquery_table', 'user', 'query_type', 'endpoint'],
+                name='audit_usage_summary_grain',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+            models.Index(fields=['user', 'hour']),
+        ]
+
+    def __str__(self):
+        return f"{self.query_type} {self.endpoint} at {self.hour}: {self.query_count} queries"
+
+
 class CacheEntry(models.Model):
     """Cache entry for BigQuery query results."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -84,10 +143,11 @@ class CacheEntry(models.Model):
     # Cached data
     result_data = models.JSONField()
     row_count = models.IntegerField(default=0)
+    size_bytes = models.BigIntegerField(default=0)
 
     # Timestamps
     created_at = models.DateTimeField(default=timezone.now)
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(null=True, blank=True)  # None = no expiration
     last_accessed_at = models.DateTimeField(default=timezone.now)
 
     # Usage tracking
@@ -99,6 +159,8 @@ class CacheEntry(models.Model):
             models.Index(fields=['cache_key']),
             models.Index(fields=['expires_at']),
             models.Index(fields=['bigquery_table', 'query_type']),
+            models.Index(fields=['last_accessed_at']),
+            models.Index(fields=['hit_count', 'last_accessed_at']),
         ]
 
     def __str__(self):
@@ -106,4 +168,48 @@ class CacheEntry(models.Model):
 
     def is_expired(self) -> bool:
         """Check if cache entry is expired."""
-        return timezone.now() > self.expires_at
+        return self.expires_at is not None and timezone.now() > self.expires_at
+
+
+class ActiveQueryJob(models.Model):
+    """
+    BigQuery job currently running, with the request and user it belongs to.
+
+    Rows are shared by every gunicorn worker, so a cancel request handled by
+    one worker can stop jobs started by another.
+    """
+    job_id = models.CharField(max_length=255, primary_key=True)
+    billing_project = models.CharField(max_length=255)
+    location = models.CharField(max_length=64, blank=True, default='')
+
+    # Client-supplied X-Request-ID of the API request that started the job
+    request_id = models.CharField(max_length=128, blank=True, default='')
+
+    bigquery_table = models.ForeignKey(
+        'tables.BigQueryTable',
+        on_delete=models.CASCADE,
+        related_name='active_query_jobs',
+        null=True,
+        blank=True
+    )
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='active_query_jobs',
+        null=True,
+        blank=True
+    )
+    query_type = models.CharField(max_length=50)
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['request_id']),
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} ({self.query_type})"
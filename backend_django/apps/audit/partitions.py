@@ -0,0 +1,250 @@
+"""
+Monthly range partitions for the QueryLog table (PostgreSQL).
+
+audit_querylog is partitioned by created_at, one partition per calendar
+month (audit_querylog_pYYYYMM, see migration 0007), plus a DEFAULT
+partition (audit_querylog_default) that catches rows no monthly partition
+covers, so inserts never fail if maintenance falls behind. This module
+keeps partitions created QUERY_LOG_PARTITIONS_AHEAD months ahead of time and
+applies retention by detaching and dropping whole partitions older than
+QUERY_LOG_RETENTION_MONTHS, instead of running DELETEs over the log.
+
+maintain() is called periodically by the query log writer (with or without
+write-behind) and by the manage_query_log_partitions management command.
+On other databases (or before the migration) it does nothing.
+"""
+import logging
+import re
+import time
+import zlib
+from datetime import date, datetime, time as dt_time, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'audit_querylog'
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+
+_PARTITION_RE = re.compile(rf'^{PARENT_TABLE}_p(\d{{4}})(\d{{2}})$')
+
+# Serializes maintenance across workers (pg_try_advisory_xact_lock key)
+_LOCK_KEY = zlib.crc32(b'audit_querylog_partitions')
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value: Optional[date] = None) -> date:
+    """First day of the month containing value (default: current month)."""
+    value = value or timezone.now().date()
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+def is_partitioned() -> bool:
+    """Whether audit_querylog is a partitioned table on this database."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [PARENT_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> List[date]:
+    """Months that have a partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [PARENT_TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    months = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def ensure_default_partition() -> None:
+    """Create the DEFAULT partition if it does not exist."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT")
+
+
+def create_partition(month: date) -> None:
+    """
+    Create the partition for a month if it does not exist.
+
+    Rows of that month already in the DEFAULT partition are moved into it
+    (PostgreSQL refuses to add a partition whose range the default holds).
+    """
+    # Bounds are generated here, not user input; DDL takes no bind parameters
+    lower = datetime.combine(month, dt_time.min, tzinfo=dt_timezone.utc)
+    upper = datetime.combine(_add_months(month, 1), dt_time.min, tzinfo=dt_timezone.utc)
+    bounds = [lower, upper]
+    name = partition_name(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT to_regclass(%s) IS NOT NULL, to_regclass(%s) IS NOT NULL",
+            [name, DEFAULT_PARTITION]
+        )
+        exists, has_default = cursor.fetchone()
+        if exists:
+            return
+
+        stray = False
+        if has_default:
+            cursor.execute(
+                f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s LIMIT 1",
+                bounds
+            )
+            stray = cursor.fetchone() is not None
+
+        if stray:
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        if stray:
+            cursor.execute(
+                f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} "
+                f"WHERE created_at >= %s AND created_at < %s",
+                bounds
+            )
+            cursor.execute(
+                f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s",
+                bounds
+            )
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+
+
+def ensure_partitions(months_ahead: Optional[int] = None) -> List[date]:
+    """
+    Create partitions from the current month to months_ahead months later
+    (and the DEFAULT partition if missing).
+
+    Returns:
+        Months whose partition was created
+    """
+    if months_ahead is None:
+        months_ahead = settings.QUERY_LOG_PARTITIONS_AHEAD
+
+    ensure_default_partition()
+    existing = set(list_partitions())
+    current = month_start()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        if month not in existing:
+            create_partition(month)
+            created.append(month)
+    return created
+
+
+def drop_expired_partitions(retention_months: Optional[int] = None) -> List[date]:
+    """
+    Drop partitions whose whole month is older than the retention period.
+
+    A retention of 0 keeps everything.
+
+    Returns:
+        Months whose partition was dropped
+    """
+    if retention_months is None:
+        retention_months = settings.QUERY_LOG_RETENTION_MONTHS
+    if not retention_months:
+        return []
+
+    # Keep the current month plus retention_months full months before it
+    cutoff = _add_months(month_start(), -retention_months)
+    dropped = []
+    with connection.cursor() as cursor:
+        for month in list_partitions():
+            if month >= cutoff:
+                break
+            name = partition_name(month)
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+            dropped.append(month)
+    return dropped
+
+
+def maintain(
+    months_ahead: Optional[int] = None,
+    retention_months: Optional[int] = None
+) -> Optional[Tuple[List[date], List[date]]]:
+    """
+    Create upcoming partitions and apply retention.
+
+    Only one worker runs maintenance at a time; the others skip.
+
+    Args:
+        months_ahead: Override QUERY_LOG_PARTITIONS_AHEAD
+        retention_months: Override QUERY_LOG_RETENTION_MONTHS (0 keeps everything)
+
+    Returns:
+        (created, dropped) months, or None if maintenance did not run (not
+        partitioned, or another worker holds the lock)
+    """
+    if not is_partitioned():
+        return None
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [_LOCK_KEY])
+            if not cursor.fetchone()[0]:
+                return None
+
+        created = ensure_partitions(months_ahead)
+        dropped = drop_expired_partitions(retention_months)
+
+    if created or dropped:
+        logger.info(
+            f"Query log partitions: created {[f'{m:%Y-%m}' for m in created]}, "
+            f"dropped {[f'{m:%Y-%m}' for m in dropped]}"
+        )
+    return created, dropped
+
+
+def truncate() -> None:
+    """Remove every query log at once (all partitions)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"TRUNCATE {PARENT_TABLE}")
+        else:
+            cursor.execute(f"DELETE FROM {PARENT_TABLE}")
+
+
+class PartitionMaintainer:
+    """Runs maintain() at most once per QUERY_LOG_PARTITION_CHECK_SECONDS."""
+
+    def __init__(self):
+        self.interval = settings.QUERY_LOG_PARTITION_CHECK_SECONDS
+        self._last_run: Optional[float] = None
+
+    def maybe_run(self) -> None:
+        now = time.monotonic()
+        if self._last_run is not None and now - self._last_run < self.interval:
+            return
+        self._last_run = now
+        try:
+            maintain()
+        except Exception as e:
+            logger.warning(f"Query log partition maintenance failed: {e}")
@@ -28,8 +28,10 @@ class QueryLogResponseSerializer(serializers.Serializer):
     """Serializer for paginated query log response."""
     logs = QueryLogSerializer(many=True)
     total = serializers.IntegerField()
+    total_is_estimate = serializers.BooleanField(default=False)
     limit = serializers.IntegerField()
     offset = serializers.IntegerField()
+    next_cursor = serializers.CharField(allow_null=True, required=False)
 
 
 class UsageStatsSerializer(serializers.Serializer):
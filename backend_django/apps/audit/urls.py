@@ -5,6 +5,8 @@ from django.urls import path
 from .views import (
     QueryLogListView,
     QueryLogClearView,
+    QueryLogWriterStatsView,
+    LatencySummaryView,
     UsageStatsView,
     TodayUsageStatsView,
     UsageTimeSeriesView,
@@ -18,6 +20,10 @@ urlpatterns = [
     # Query logging endpoints
     path('bigquery/logs/', QueryLogListView.as_view(), name='query-logs'),
     path('bigquery/logs/clear/', QueryLogClearView.as_view(), name='query-logs-clear'),
+    path('bigquery/logs/writer/', QueryLogWriterStatsView.as_view(), name='query-logs-writer'),
+
+    # Request latency breakdown (Server-Timing stages)
+    path('bigquery/timings/', LatencySummaryView.as_view(), name='latency-summary'),
 
     # Usage statistics endpoints
     path('bigquery/usage/stats/', UsageStatsView.as_view(), name='usage-stats'),
@@ -0,0 +1,114 @@
+"""
+Incremental maintenance of QueryUsageSummary.
+
+Query log records are folded into hourly summary rows as they are written:
+records are grouped by (hour, table, user, query_type, endpoint) in Python
+and merged with a single INSERT ... ON CONFLICT DO UPDATE that adds to the
+existing counters. Usage statistics then aggregate summary rows (at most one
+per grain per hour) instead of the raw log table.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Tuple
+
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import QueryUsageSummary
+
+GrainKey = Tuple[Any, Any, Any, str, str]
+
+COUNTERS = (
+    'query_count', 'error_count', 'cache_hit_count',
+    'bytes_processed', 'bytes_billed', 'execution_time_ms',
+)
+
+
+def _grain_key(record: Dict[str, Any]) -> GrainKey:
+    created_at = record.get('created_at') or timezone.now()
+    return (
+        created_at.replace(minute=0, second=0, microsecond=0),
+        record.get('bigquery_table_id'),
+        record.get('user_id'),
+        record.get('query_type', ''),
+        record.get('endpoint', ''),
+    )
+
+
+def accumulate(records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Add query log records (QueryLog field dicts) to the hourly summary.
+
+    Returns:
+        Number of summary rows inserted or updated
+    """
+    grains: Dict[GrainKey, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for record in records:
+        counters = grains[_grain_key(record)]
+        counters['query_count'] += 1
+        counters['error_count'] += 0 if record.get('is_success', True) else 1
+        counters['cache_hit_count'] += 1 if record.get('cache_hit') else 0
+        counters['bytes_processed'] += record.get('bytes_processed') or 0
+        counters['bytes_billed'] += record.get('bytes_billed') or 0
+        counters['execution_time_ms'] += record.get('execution_time_ms') or 0
+
+    if not grains:
+        return 0
+
+    table = connection.ops.quote_name(QueryUsageSummary._meta.db_table)
+    columns = ['hour', 'bigquery_table_id', 'user_id', 'query_type', 'endpoint', *COUNTERS]
+    row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+    updates = ', '.join(f"{c} = {table}.{c} + EXCLUDED.{c}" for c in COUNTERS)
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES {', '.join([row_placeholder] * len(grains))} "
+        f"ON CONFLICT (hour, bigquery_table_id, user_id, query_type, endpoint) "
+        f"DO UPDATE SET {updates}"
+    )
+    params = []
+    # Fixed row order: concurrent flushes from several workers lock rows in the same order
+    for key, counters in sorted(grains.items(), key=lambda item: tuple(str(v) for v in item[0])):
+        params.extend(key)
+        params.extend(counters[c] for c in COUNTERS)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return len(grains)
+
+
+def usage_totals(queryset) -> Dict[str, Any]:
+    """
+    Usage statistics over summary rows (the UsageStatsSerializer shape).
+
+    Args:
+        queryset: QueryUsageSummary queryset, already filtered
+    """
+    totals = queryset.aggregate(**{c: Sum(c) for c in COUNTERS})
+    total_queries = totals['query_count'] or 0
+    if total_queries == 0:
+        return {
+            'total_queries': 0,
+            'total_bytes_processed': 0,
+            'total_bytes_billed': 0,
+            'avg_execution_time_ms': 0,
+            'cache_hit_rate': 0,
+            'queries_by_type': {},
+            'error_count': 0
+        }
+
+    queries_by_type = dict(
+        queryset.values('query_type')
+        .annotate(count=Sum('query_count'))
+        .values_list('query_type', 'count')
+    )
+
+    return {
+        'total_queries': total_queries,
+        'total_bytes_processed': totals['bytes_processed'] or 0,
+        'total_bytes_billed': totals['bytes_billed'] or 0,
+        'avg_execution_time_ms': (totals['execution_time_ms'] or 0) / total_queries,
+        'cache_hit_rate': (totals['cache_hit_count'] or 0) / total_queries,
+        'queries_by_type': queries_by_type,
+        'error_count': totals['error_count'] or 0
+    }
@@ -1,8 +1,9 @@
 """
 Audit views for query logging and usage statistics.
 """
-from datetime import timedelta
-from django.db.models import Sum, Avg, Count, F
+import uuid
+from datetime import datetime, timedelta
+from django.db.models import Q, Sum, Count
 from django.db.models.functions import TruncHour, TruncDay, TruncWeek
 from django.utils import timezone
 from rest_framework import status
@@ -10,7 +11,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from .models import QueryLog, CacheEntry
+from apps.core.pagination import decode_keyset_cursor, encode_keyset_cursor, estimated_count
+from . import partitions
+from .models import QueryLog, QueryUsageSummary, CacheEntry
 from .serializers import (
     QueryLogSerializer,
     QueryLogResponseSerializer,
@@ -20,50 +23,95 @@ from .serializers import (
     CacheClearResponseSerializer,
     ClearLogsResponseSerializer
 )
+from .usage_summary import usage_totals
+
+
+def _start_of_day(value: str) -> datetime:
+    """Start of a YYYY-MM-DD day in the current timezone."""
+    day = datetime.strptime(value, '%Y-%m-%d').date()
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
 
 
 class QueryLogListView(APIView):
-    """Get query logs with filtering and pagination."""
+    """Get query logs with filtering and keyset pagination."""
     permission_classes = []
 
+    MAX_LIMIT = 1000
+
     def get(self, request):
         """
-        Get query logs.
+        Get query logs, newest first.
 
         Query params:
-        - limit: Max entries (default 100)
-        - offset: Skip entries (default 0)
+        - limit: Max entries (default 100, max 1000)
+        - cursor: next_cursor from the previous page (keyset pagination)
+        - offset: Skip entries (default 0; legacy, ignored with cursor)
         - start_date: Filter by date (YYYY-MM-DD)
         - end_date: Filter by date (YYYY-MM-DD)
         - query_type: Filter by query type
         - endpoint: Filter by endpoint
+
+        The total is the planner's estimate (total_is_estimate), so listing
+        costs the same however many logs are kept.
         """
-        limit = int(request.query_params.get('limit', 100))
+        limit = min(int(request.query_params.get('limit', 100)), self.MAX_LIMIT)
         offset = int(request.query_params.get('offset', 0))
+        cursor = request.query_params.get('cursor')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         query_type = request.query_params.get('query_type')
         endpoint = request.query_params.get('endpoint')
 
-        queryset = QueryLog.objects.all()
-
-        if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+        queryset = QueryLog.objects.select_related('bigquery_table')
+
+        # Range filters on created_at itself (not created_at::date) so only the
+        # matching monthly partitions are scanned
+        try:
+            if start_date:
+                queryset = queryset.filter(created_at__gte=_start_of_day(start_date))
+            if end_date:
+                queryset = queryset.filter(created_at__lt=_start_of_day(end_date) + timedelta(days=1))
+        except ValueError:
+            return Response(
+                {'error': 'Dates must be YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         if query_type:
             queryset = queryset.filter(query_type=query_type)
         if endpoint:
             queryset = queryset.filter(endpoint__icontains=endpoint)
 
-        total = queryset.count()
-        logs = queryset[offset:offset + limit]
+        total = estimated_count(queryset)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        if cursor:
+            try:
+                created_at, log_id = decode_keyset_cursor(cursor, 2)
+                created_at = datetime.fromisoformat(created_at)
+                log_id = uuid.UUID(log_id)
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=log_id)
+                )
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid cursor'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            offset = 0
+
+        logs = list(queryset[offset:offset + limit + 1])
+        next_cursor = None
+        if len(logs) > limit:
+            logs = logs[:limit]
+            next_cursor = encode_keyset_cursor(logs[-1].created_at.isoformat(), logs[-1].id)
 
         serializer = QueryLogResponseSerializer({
             'logs': logs,
             'total': total,
+            'total_is_estimate': True,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': next_cursor
         })
         return Response(serializer.data)
 
@@ -73,18 +121,58 @@ class QueryLogClearView(APIView):
     permission_classes = []
 
     def post(self, request):
-        """Clear all query logs."""
-        count = QueryLog.objects.count()
-        QueryLog.objects.all().delete()
+        """Clear all query logs (and the usage statistics derived from them)."""
+        # Estimate + TRUNCATE: constant time however many logs are kept
+        count = estimated_count(QueryLog.objects.all())
+        partitions.truncate()
+        QueryUsageSummary.objects.all().delete()
 
         serializer = ClearLogsResponseSerializer({
             'success': True,
-            'message': f'Successfully cleared {count} log entries',
+            'message': f'Successfully cleared about {count} log entries',
             'logs_deleted': count
         })
         return Response(serializer.data)
 
 
+class QueryLogWriterStatsView(APIView):
+    """Get write-behind audit buffer counters for the worker serving the request."""
+    permission_classes = []
+
+    def get(self, request):
+        """Get queued/written/dropped query log counts."""
+        from apps.analytics.services.query_log_writer import get_query_log_writer
+
+        return Response(get_query_log_writer().stats())
+
+
+class LatencySummaryView(APIView):
+    """Get rolling per-endpoint, per-stage request latencies for the worker serving the request."""
+    permission_classes = []
+
+    def get(self, request):
+        """
+        Get latency percentiles.
+
+        Query params:
+        - endpoint: Only this endpoint (e.g. "GET /api/pivot/")
+        """
+        from apps.analytics.services.timing import get_latency_summary
+
+        latency_summary = get_latency_summary()
+        return Response({
+            'sample_size': latency_summary.sample_size,
+            'stages': latency_summary.summary(request.query_params.get('endpoint'))
+        })
+
+    def delete(self, request):
+        """Reset the latency samples."""
+        from apps.analytics.services.timing import get_latency_summary
+
+        get_latency_summary().reset()
+        return Response({'success': True, 'message': 'Latency summary reset'})
+
+
 class UsageStatsView(APIView):
     """Get aggregated usage statistics."""
     permission_classes = []
@@ -100,53 +188,15 @@ class UsageStatsView(APIView):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
 
-        queryset = QueryLog.objects.all()
+        # Hourly summary rows, maintained as logs are written (usage_summary.py)
+        queryset = QueryUsageSummary.objects.all()
 
         if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
+            queryset = queryset.filter(hour__date__gte=start_date)
         if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
-
-        # Calculate statistics
-        total_queries = queryset.count()
-        if total_queries == 0:
-            stats = {
-                'total_queries': 0,
-                'total_bytes_processed': 0,
-                'total_bytes_billed': 0,
-                'avg_execution_time_ms': 0,
-                'cache_hit_rate': 0,
-                'queries_by_type': {},
-                'error_count': 0
-            }
-        else:
-            aggregates = queryset.aggregate(
-                total_bytes_processed=Sum('bytes_processed'),
-                total_bytes_billed=Sum('bytes_billed'),
-                avg_execution_time_ms=Avg('execution_time_ms')
-            )
-
-            cache_hits = queryset.filter(cache_hit=True).count()
-            error_count = queryset.filter(is_success=False).count()
+            queryset = queryset.filter(hour__date__lte=end_date)
 
-            # Get query counts by type
-            queries_by_type = dict(
-                queryset.values('query_type')
-                .annotate(count=Count('id'))
-                .values_list('query_type', 'count')
-            )
-
-            stats = {
-                'total_queries': total_queries,
-                'total_bytes_processed': aggregates['total_bytes_processed'] or 0,
-                'total_bytes_billed': aggregates['total_bytes_billed'] or 0,
-                'avg_execution_time_ms': aggregates['avg_execution_time_ms'] or 0,
-                'cache_hit_rate': cache_hits / total_queries if total_queries > 0 else 0,
-                'queries_by_type': queries_by_type,
-                'error_count': error_count
-            }
-
-        serializer = UsageStatsSerializer(stats)
+        serializer = UsageStatsSerializer(usage_totals(queryset))
         return Response(serializer.data)
 
 
@@ -157,46 +207,9 @@ class TodayUsageStatsView(APIView):
     def get(self, request):
         """Get today's usage stats."""
         today = timezone.now().date()
-        queryset = QueryLog.objects.filter(created_at__date=today)
-
-        total_queries = queryset.count()
-        if total_queries == 0:
-            stats = {
-                'total_queries': 0,
-                'total_bytes_processed': 0,
-                'total_bytes_billed': 0,
-                'avg_execution_time_ms': 0,
-                'cache_hit_rate': 0,
-                'queries_by_type': {},
-                'error_count': 0
-            }
-        else:
-            aggregates = queryset.aggregate(
-                total_bytes_processed=Sum('bytes_processed'),
-                total_bytes_billed=Sum('bytes_billed'),
-                avg_execution_time_ms=Avg('execution_time_ms')
-            )
-
-            cache_hits = queryset.filter(cache_hit=True).count()
-            error_count = queryset.filter(is_success=False).count()
-
-            queries_by_type = dict(
-                queryset.values('query_type')
-                .annotate(count=Count('id'))
-                .values_list('query_type', 'count')
-            )
+        queryset = QueryUsageSummary.objects.filter(hour__date=today)
 
-            stats = {
-                'total_queries': total_queries,
-                'total_bytes_processed': aggregates['total_bytes_processed'] or 0,
-                'total_bytes_billed': aggregates['total_bytes_billed'] or 0,
-                'avg_execution_time_ms': aggregates['avg_execution_time_ms'] or 0,
-                'cache_hit_rate': cache_hits / total_queries if total_queries > 0 else 0,
-                'queries_by_type': queries_by_type,
-                'error_count': error_count
-            }
-
-        serializer = UsageStatsSerializer(stats)
+        serializer = UsageStatsSerializer(usage_totals(queryset))
         return Response(serializer.data)
 
 
@@ -217,31 +230,31 @@ class UsageTimeSeriesView(APIView):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
 
-        queryset = QueryLog.objects.all()
+        queryset = QueryUsageSummary.objects.all()
 
         if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
+            queryset = queryset.filter(hour__date__gte=start_date)
         if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+            queryset = queryset.filter(hour__date__lte=end_date)
 
         # Select truncation function based on granularity
         if granularity == 'hourly':
-            trunc_func = TruncHour('created_at')
+            trunc_func = TruncHour('hour')
         elif granularity == 'weekly':
-            trunc_func = TruncWeek('created_at')
+            trunc_func = TruncWeek('hour')
         else:
-            trunc_func = TruncDay('created_at')
+            trunc_func = TruncDay('hour')
 
-        # Aggregate by time period
+        # Aggregate summary rows by time period
         data = (
             queryset
             .annotate(period=trunc_func)
             .values('period')
             .annotate(
-                query_count=Count('id'),
+                query_count=Sum('query_count'),
                 bytes_processed=Sum('bytes_processed'),
                 bytes_billed=Sum('bytes_billed'),
-                avg_execution_time_ms=Avg('execution_time_ms')
+                execution_time_ms=Sum('execution_time_ms')
             )
             .order_by('period')
         )
@@ -249,12 +262,13 @@ class UsageTimeSeriesView(APIView):
         # Format results
         results = []
         for row in data:
+            query_count = row['query_count'] or 0
             results.append({
                 'period': row['period'].isoformat() if row['period'] else None,
-                'query_count': row['query_count'],
+                'query_count': query_count,
                 'bytes_processed': row['bytes_processed'] or 0,
                 'bytes_billed': row['bytes_billed'] or 0,
-                'avg_execution_time_ms': row['avg_execution_time_ms'] or 0
+                'avg_execution_time_ms': (row['execution_time_ms'] or 0) / query_count if query_count else 0
             })
 
         serializer = UsageTimeSeriesSerializer(results, many=True)
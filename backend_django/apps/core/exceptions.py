@@ -95,3 +95,8 @@ class ConfigurationError(ServiceError):
 class BigQueryError(ServiceError):
     """BigQuery related error."""
     pass
+
+
+class QueryBudgetError(BigQueryError):
+    """Query rejected before running: too large or over a byte budget."""
+    pass
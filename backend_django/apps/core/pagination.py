@@ -1,6 +1,11 @@
 """
 Custom pagination classes for the application.
 """
+import base64
+import json
+from typing import Any, List
+
+from django.db import connection
 from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination
 
 
@@ -29,3 +34,43 @@ class OffsetPagination(LimitOffsetPagination):
     """Offset-based pagination (limit/offset style)."""
     default_limit = 50
     max_limit = 1000
+
+
+def encode_keyset_cursor(*values: Any) -> str:
+    """Opaque cursor for keyset pagination from the last row's sort key values."""
+    payload = json.dumps([str(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_keyset_cursor(cursor: str, size: int) -> List[str]:
+    """
+    Sort key values from a cursor made by encode_keyset_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def estimated_count(queryset) -> int:
+    """
+    Planner row estimate for a queryset (PostgreSQL), without counting rows.
+
+    Constant time regardless of table size; exact count on other databases.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -5,3 +5,6 @@ class RollupsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.rollups'
     verbose_name = 'Rollups'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -10,8 +10,7 @@ Key design principles:
 import re
 import time
 import logging
-from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple, TYPE_CHECKING, Any
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 from datetime import datetime
 
 from google.cloud import bigquery
@@ -20,9 +19,9 @@ from django.utils import timezone
 
 from .models import Rollup, RollupStatus, RollupConfig
 from apps.schemas.models import (
-    SchemaConfig, CalculatedMetric, Dimension, OptimizedSourceConfig,
-    JoinedDimensionSource, JoinedDimensionColumn, JoinedDimensionStatus
+    SchemaConfig, CalculatedMetric, OptimizedSourceConfig, JoinedDimensionSource
 )
+from apps.schemas.snapshot import DimensionInfo, SchemaSnapshot, get_schema_snapshot
 
 if TYPE_CHECKING:
     from apps.tables.models import BigQueryTable
@@ -30,16 +29,6 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class DimensionInfo:
-    """Unified dimension info for both regular and joined dimensions."""
-    dimension_id: str
-    column_name: str
-    is_joined: bool
-    data_type: str = "STRING"
-    source: Optional[Any] = None  # JoinedDimensionSource if is_joined
-
-
 def generate_key_column_name(columns: List[str]) -> str:
     """Generate deterministic key column name from source columns."""
     sorted_cols = sorted([c.strip().lower() for c in columns])
@@ -119,38 +108,26 @@ class RollupService:
             pass
         return self.bigquery_table.full_table_path, None
 
+    def _get_schema(self, schema_config: SchemaConfig) -> SchemaSnapshot:
+        """Current schema snapshot (version checked now: rollups outlive the request)."""
+        schema = get_schema_snapshot(schema_config.bigquery_table_id, recheck=True)
+        if schema is None:
+            raise SchemaConfig.DoesNotExist(
+                f"No schema configuration for table {schema_config.bigquery_table_id}"
+            )
+        return schema
+
     def get_volume_metrics(self, schema_config: SchemaConfig) -> List[CalculatedMetric]:
         """Get all volume-category metrics from the schema."""
-        return list(schema_config.calculated_metrics.filter(category='volume'))
+        return list(self._get_schema(schema_config).volume_metrics)
 
-    def get_all_dimensions(self, schema_config: SchemaConfig) -> Dict[str, 'DimensionInfo']:
+    def get_all_dimensions(self, schema_config: SchemaConfig) -> Dict[str, DimensionInfo]:
         """Get all dimensions (regular and joined) as a dict keyed by dimension_id."""
-        result = {}
-
-        # Regular dimensions
-        for d in schema_config.dimensions.all():
-            result[d.dimension_id] = DimensionInfo(
-                dimension_id=d.dimension_id,
-                column_name=d.column_name,
-                is_joined=False,
-                data_type=d.data_type,
-                source=None
-            )
-
-        # Joined dimensions
-        for source in schema_config.joined_dimension_sources.filter(
-            status=JoinedDimensionStatus.READY
-        ).prefetch_related('columns'):
-            for col in source.columns.all():
-                result[col.dimension_id] = DimensionInfo(
-                    dimension_id=col.dimension_id,
-                    column_name=col.source_column_name,
-                    is_joined=True,
-                    data_type=col.data_type,
-                    source=source
-                )
-
-        return result
+        return {
+            dimension_id: info
+            for dimension_id, info in self._get_schema(schema_config).dimension_catalog.items()
+            if not info.is_calculated
+        }
 
     def _get_joined_sources_for_dims(
         self,
@@ -158,15 +135,7 @@ class RollupService:
         dim_ids: List[str]
     ) -> List[JoinedDimensionSource]:
         """Get the joined dimension sources needed for the given dimension IDs."""
-        needed_sources = set()
-        for source in schema_config.joined_dimension_sources.filter(
-            status=JoinedDimensionStatus.READY
-        ).prefetch_related('columns'):
-            for col in source.columns.all():
-                if col.dimension_id in dim_ids:
-                    needed_sources.add(source)
-                    break
-        return list(needed_sources)
+        return list(self._get_schema(schema_config).joined_sources_for(dim_ids))
 
     def _build_join_clauses(
         self,
@@ -184,16 +153,11 @@ class RollupService:
             lookup_table_path = source.bq_table_path
 
             # Get the target dimension's column name and data type
-            source_data_type = 'STRING'  # Default fallback
-            try:
-                target_dim = schema_config.dimensions.get(
-                    dimension_id=source.target_dimension_id
-                )
-                source_join_column = target_dim.column_name
-                source_data_type = target_dim.data_type
-            except Dimension.DoesNotExist:
+            target_dim = self._get_schema(schema_config).dimensions_by_id.get(source.target_dimension_id)
+            if target_dim is None:
                 logger.warning(f"Target dimension {source.target_dimension_id} not found")
                 continue
+            source_join_column = target_dim.column_name
 
             # Build LEFT JOIN clause
             # No casting needed - lookup table join key is created with matching type
@@ -207,7 +171,7 @@ LEFT JOIN `{lookup_table_path}` AS {alias}
 
     def _get_dim_select_expression(
         self,
-        dim_info: 'DimensionInfo',
+        dim_info: DimensionInfo,
         source_alias: str,
         joined_sources: List[JoinedDimensionSource],
         use_optimized_source: bool = False
@@ -498,13 +462,14 @@ GROUP BY {group_by_clause}"""
 
         try:
             if incremental:
-                return self._refresh_incremental(rollup, schema_config, target_path)
+                result = self._refresh_incremental(rollup, schema_config, target_path)
             else:
-                return self._refresh_batched(rollup, schema_config, target_path, batch_size)
+                result = self._refresh_batched(rollup, schema_config, target_path, batch_size)
 
         except Exception as e:
             logger.exception(f"Rollup refresh failed for {rollup.name}: {e}")
             rollup.mark_error(str(e))
+            self._drop_local_copies(rollup)
             return {
                 'success': False,
                 'message': f"Refresh failed: {str(e)}",
@@ -512,6 +477,50 @@ GROUP BY {group_by_clause}"""
                 'status': rollup.status
             }
 
+        if result.get('success'):
+            from apps.analytics.services.rollup_cube import get_rollup_cubes
+
+            self._invalidate_query_cache()
+            # Only an incremental refresh that added nothing keeps its mirror;
+            # a full refresh rebuilds the table even when no dates came back
+            self._mirror_locally(rollup, changed=not incremental or bool(result.get('dates_added')))
+            # Rebuilt from the new data on first use
+            get_rollup_cubes().discard(rollup)
+
+        return result
+
+    def _mirror_locally(self, rollup: Rollup, changed: bool = True) -> None:
+        """Refresh the local Parquet mirror served by the local_rollups query engine."""
+        from apps.analytics.services.rollup_mirror import get_rollup_mirror
+
+        mirror = get_rollup_mirror()
+        if not changed and mirror.restamp(rollup):
+            return
+        try:
+            mirror.publish(rollup, self.client)
+        except Exception as e:
+            # Without a mirror, queries on this rollup keep running on BigQuery
+            mirror.remove(rollup.full_rollup_path)
+            logger.warning(f"Failed to mirror rollup {rollup.name} locally: {e}")
+
+    @staticmethod
+    def _drop_local_copies(rollup: Rollup) -> None:
+        """Forget the mirror and cube of a rollup whose table may be partially refreshed."""
+        from apps.analytics.services.rollup_cube import get_rollup_cubes
+        from apps.analytics.services.rollup_mirror import get_rollup_mirror
+
+        get_rollup_mirror().remove(rollup.full_rollup_path)
+        get_rollup_cubes().discard(rollup)
+
+    def _invalidate_query_cache(self) -> None:
+        """Drop cached query results for this table after its rollups change."""
+        try:
+            from apps.analytics.services.query_cache_service import get_query_cache
+            cleared = get_query_cache().clear_by_table(str(self.bigquery_table.id))
+            logger.info(f"Cleared {cleared} cached queries for table {self.bigquery_table.id}")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate query cache: {e}")
+
     def _refresh_incremental(
         self,
         rollup: Rollup,
@@ -755,6 +764,7 @@ PARTITION BY date{cluster_clause}"""
                         'message': f"Failed to drop table: {str(e)}"
                     }
 
+            self._drop_local_copies(rollup)
             rollup.delete()
             return {
                 'success': True,
@@ -0,0 +1,31 @@
+"""
+Rollup routing index bookkeeping.
+
+Every write to a table's rollups or rollup config drops this process's
+rollup index (apps/analytics/services/rollup_index.py); other processes
+notice the change on their next recheck. Bulk writes that bypass model
+signals (bulk_create, QuerySet.update) must call invalidate_rollup_index
+themselves.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Rollup, RollupConfig
+
+
+def invalidate_rollup_index(bigquery_table_id) -> None:
+    """Mark a table's rollups as changed."""
+    from apps.analytics.services.rollup_index import get_rollup_indexes
+
+    # After commit, so a concurrent rebuild cannot cache the pre-write rollups
+    transaction.on_commit(lambda: get_rollup_indexes().invalidate(bigquery_table_id))
+
+
+@receiver(post_save, sender=Rollup)
+@receiver(post_delete, sender=Rollup)
+@receiver(post_save, sender=RollupConfig)
+@receiver(post_delete, sender=RollupConfig)
+def rollups_changed(sender, instance, **kwargs):
+    invalidate_rollup_index(instance.bigquery_table_id)
@@ -8,3 +8,6 @@ class SchemasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.schemas'
     verbose_name = 'Schema Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,74 @@
+"""
+Schema version bookkeeping.
+
+Every write to a schema's metrics, dimensions or joined dimensions bumps
+SchemaConfig.version and drops this process's schema snapshot (snapshot.py);
+other processes notice the new version on their next recheck. Bulk writes
+that bypass model signals (bulk_create, QuerySet.update) must call
+bump_schema_version themselves.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    CalculatedDimension,
+    CalculatedMetric,
+    Dimension,
+    JoinedDimensionColumn,
+    JoinedDimensionSource,
+    SchemaConfig,
+)
+from .snapshot import get_schema_snapshots
+
+
+def _invalidate_snapshot(schema_config_id) -> None:
+    # After commit, so a concurrent rebuild cannot cache the pre-write schema
+    transaction.on_commit(lambda: get_schema_snapshots().invalidate(schema_config_id))
+
+
+def bump_schema_version(schema_config_id) -> None:
+    """Mark a schema as changed."""
+    SchemaConfig.objects.filter(pk=schema_config_id).update(version=F('version') + 1)
+    _invalidate_snapshot(schema_config_id)
+
+
+@receiver(pre_save, sender=SchemaConfig)
+def schema_config_pre_save(sender, instance, update_fields=None, **kwargs):
+    # A stale instance must not write an older version back over a bumped one
+    if update_fields is None or 'version' in update_fields:
+        current = SchemaConfig.objects.filter(pk=instance.pk).values_list('version', flat=True).first()
+        if current is not None:
+            instance.version = current + 1
+
+
+@receiver(post_save, sender=SchemaConfig)
+def schema_config_post_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'version' not in update_fields:
+        bump_schema_version(instance.pk)
+    else:
+        _invalidate_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=CalculatedMetric)
+@receiver(post_delete, sender=CalculatedMetric)
+@receiver(post_save, sender=Dimension)
+@receiver(post_delete, sender=Dimension)
+@receiver(post_save, sender=CalculatedDimension)
+@receiver(post_delete, sender=CalculatedDimension)
+@receiver(post_save, sender=JoinedDimensionSource)
+@receiver(post_delete, sender=JoinedDimensionSource)
+def schema_member_changed(sender, instance, **kwargs):
+    bump_schema_version(instance.schema_config_id)
+
+
+@receiver(post_save, sender=JoinedDimensionColumn)
+@receiver(post_delete, sender=JoinedDimensionColumn)
+def joined_column_changed(sender, instance, **kwargs):
+    schema_config_id = JoinedDimensionSource.objects.filter(
+        pk=instance.source_id
+    ).values_list('schema_config_id', flat=True).first()
+    if schema_config_id is not None:
+        bump_schema_version(schema_config_id)
@@ -0,0 +1,256 @@
+"""
+Compiled, versioned snapshots of a table's schema for the query hot path.
+
+Building SQL for one analytics request needs the table's metrics,
+dimensions, calculated and joined dimensions, their data types and which
+metrics are volume metrics. A SchemaSnapshot holds all of it, loaded in a
+few queries and indexed by id. Its dimension catalog (dimension_id ->
+DimensionInfo) is shared by filter building, breakdowns, calculated-dimension
+subqueries and rollup SQL generation. Snapshots are cached per process by
+BigQueryTable and tagged with SchemaConfig.version.
+
+Schema writes bump the version (signals.py) and drop this process's
+snapshot immediately. Other processes revalidate a cached snapshot's
+version at most every SCHEMA_SNAPSHOT_RECHECK_SECONDS, so between checks a
+request costs no schema queries.
+
+Snapshots are shared between requests and threads: treat them, and the
+model instances they hold, as read-only.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from django.conf import settings
+
+from .models import (
+    CalculatedDimension,
+    CalculatedMetric,
+    Dimension,
+    JoinedDimensionColumn,
+    JoinedDimensionSource,
+    JoinedDimensionStatus,
+    SchemaConfig,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DimensionInfo:
+    """Unified dimension info for regular, joined and calculated dimensions."""
+    dimension_id: str
+    column_name: str  # Base table column; lookup table column if joined; dimension_id if calculated
+    is_joined: bool = False
+    data_type: str = "STRING"
+    source: Optional[JoinedDimensionSource] = None  # Owning source if is_joined
+    is_calculated: bool = False
+    sql_expression: Optional[str] = None  # Expression if is_calculated
+    is_filterable: bool = True
+    is_groupable: bool = True
+
+
+def _build_dimension_catalog(
+    dimensions: Tuple[Dimension, ...],
+    calculated_dimensions: Tuple[CalculatedDimension, ...],
+    joined: Mapping[str, Tuple[JoinedDimensionColumn, JoinedDimensionSource]]
+) -> Dict[str, DimensionInfo]:
+    """Index every dimension; on id clashes regular beats calculated beats joined."""
+    catalog = {}
+    for dimension_id, (column, source) in joined.items():
+        catalog[dimension_id] = DimensionInfo(
+            dimension_id=dimension_id,
+            column_name=column.source_column_name,
+            is_joined=True,
+            data_type=column.data_type,
+            source=source,
+            is_filterable=column.is_filterable,
+            is_groupable=column.is_groupable,
+        )
+    for d in calculated_dimensions:
+        catalog[d.dimension_id] = DimensionInfo(
+            dimension_id=d.dimension_id,
+            column_name=d.dimension_id,
+            data_type=d.data_type,
+            is_calculated=True,
+            sql_expression=d.sql_expression,
+            is_filterable=d.is_filterable,
+            is_groupable=d.is_groupable,
+        )
+    for d in dimensions:
+        catalog[d.dimension_id] = DimensionInfo(
+            dimension_id=d.dimension_id,
+            column_name=d.column_name,
+            data_type=d.data_type,
+            is_filterable=d.is_filterable,
+            is_groupable=d.is_groupable,
+        )
+    return catalog
+
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    """Immutable view of one schema version."""
+    schema_config: SchemaConfig
+    version: int
+    metrics: Tuple[CalculatedMetric, ...]
+    metrics_by_id: Mapping[str, CalculatedMetric]
+    volume_metrics: Tuple[CalculatedMetric, ...]
+    dimensions: Tuple[Dimension, ...]
+    dimensions_by_id: Mapping[str, Dimension]
+    calculated_dimensions_by_id: Mapping[str, CalculatedDimension]
+    # Columns of READY joined sources: dimension_id -> (column, source)
+    joined_columns_by_id: Mapping[str, Tuple[JoinedDimensionColumn, JoinedDimensionSource]]
+    dimension_catalog: Mapping[str, DimensionInfo]
+
+    @property
+    def id(self):
+        return self.schema_config.id
+
+    @property
+    def metric_ids(self) -> Tuple[str, ...]:
+        return tuple(m.metric_id for m in self.metrics)
+
+    @property
+    def volume_metric_ids(self) -> Tuple[str, ...]:
+        return tuple(m.metric_id for m in self.volume_metrics)
+
+    def dimension(self, dimension_id: str) -> Optional[DimensionInfo]:
+        return self.dimension_catalog.get(dimension_id)
+
+    def joined_sources_for(self, dimension_ids) -> Tuple[JoinedDimensionSource, ...]:
+        """Distinct READY sources owning any of the given joined dimensions."""
+        sources = {}
+        for dimension_id in dimension_ids:
+            info = self.dimension_catalog.get(dimension_id)
+            if info is not None and info.is_joined:
+                sources.setdefault(info.source.id, info.source)
+        return tuple(sources.values())
+
+    def is_volume_metric(self, metric_id: str) -> bool:
+        metric = self.metrics_by_id.get(metric_id)
+        return metric is not None and metric.category == 'volume'
+
+    @property
+    def groupable_dimension_ids(self) -> Tuple[str, ...]:
+        """Groupable regular dimensions, then groupable joined columns."""
+        return tuple(d.dimension_id for d in self.dimensions if d.is_groupable) + tuple(
+            dimension_id for dimension_id, (column, _) in self.joined_columns_by_id.items()
+            if column.is_groupable
+        )
+
+    @property
+    def filterable_dimensions(self) -> Tuple[Dimension, ...]:
+        return tuple(d for d in self.dimensions if d.is_filterable)
+
+    @classmethod
+    def build(cls, schema_config: SchemaConfig) -> 'SchemaSnapshot':
+        """Load and index everything the query path needs from a schema."""
+        metrics = tuple(schema_config.calculated_metrics.all())
+        dimensions = tuple(schema_config.dimensions.all())
+        joined: Dict[str, Tuple[JoinedDimensionColumn, JoinedDimensionSource]] = {}
+        for source in schema_config.joined_dimension_sources.filter(
+            status=JoinedDimensionStatus.READY
+        ).prefetch_related('columns'):
+            for column in source.columns.all():
+                # First READY source wins, as in the lookups this replaces
+                joined.setdefault(column.dimension_id, (column, source))
+
+        calculated_dimensions = tuple(schema_config.calculated_dimensions.all())
+
+        return cls(
+            schema_config=schema_config,
+            version=schema_config.version,
+            metrics=metrics,
+            metrics_by_id=MappingProxyType({m.metric_id: m for m in metrics}),
+            volume_metrics=tuple(m for m in metrics if m.category == 'volume'),
+            dimensions=dimensions,
+            dimensions_by_id=MappingProxyType({d.dimension_id: d for d in dimensions}),
+            calculated_dimensions_by_id=MappingProxyType({d.dimension_id: d for d in calculated_dimensions}),
+            joined_columns_by_id=MappingProxyType(joined),
+            dimension_catalog=MappingProxyType(
+                _build_dimension_catalog(dimensions, calculated_dimensions, joined)
+            ),
+        )
+
+
+@dataclass
+class _Entry:
+    snapshot: SchemaSnapshot
+    checked_at: float
+
+
+class SchemaSnapshotCache:
+    """Per-process schema snapshots, keyed by BigQueryTable id."""
+
+    def __init__(self, recheck_seconds: Optional[float] = None):
+        self.recheck_seconds = (
+            settings.SCHEMA_SNAPSHOT_RECHECK_SECONDS if recheck_seconds is None else recheck_seconds
+        )
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, bigquery_table_id, recheck: bool = False) -> Optional[SchemaSnapshot]:
+        """
+        Snapshot of a table's schema, or None if the table has no schema.
+
+        Args:
+            recheck: Validate the version now, even if it was checked recently
+                     (for writes derived from the schema, e.g. rollup DDL)
+        """
+        key = str(bigquery_table_id)
+        entry = self._entries.get(key)
+        if (
+            not recheck and entry is not None
+            and time.monotonic() - entry.checked_at < self.recheck_seconds
+        ):
+            return entry.snapshot
+
+        current = SchemaConfig.objects.filter(
+            bigquery_table_id=bigquery_table_id
+        ).values_list('id', 'version').first()
+        if current is None:
+            self._entries.pop(key, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry.snapshot.id, entry.snapshot.version) != current:
+                schema_config = SchemaConfig.objects.get(id=current[0])
+                entry = _Entry(SchemaSnapshot.build(schema_config), 0.0)
+                logger.debug(f"Built schema snapshot v{entry.snapshot.version} for table {key}")
+            entry.checked_at = time.monotonic()
+            self._entries[key] = entry
+        return entry.snapshot
+
+    def invalidate(self, schema_config_id) -> None:
+        """Drop the snapshot of a schema (after it was written)."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if str(entry.snapshot.id) == str(schema_config_id):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Global instance
+_schema_snapshots: Optional[SchemaSnapshotCache] = None
+
+
+def get_schema_snapshots() -> SchemaSnapshotCache:
+    """Get the schema snapshot cache instance (singleton)."""
+    global _schema_snapshots
+    if _schema_snapshots is None:
+        _schema_snapshots = SchemaSnapshotCache()
+    return _schema_snapshots
+
+
+def get_schema_snapshot(bigquery_table_id, recheck: bool = False) -> Optional[SchemaSnapshot]:
+    """Snapshot of a table's schema (see SchemaSnapshotCache.get)."""
+    return get_schema_snapshots().get(bigquery_table_id, recheck=recheck)
@@ -326,5 +326,9 @@ class GCPOAuthService:
         user.clear_gcp_tokens()
         user.save()
 
+        # Drop pooled BigQuery clients still holding the revoked token
+        from apps.analytics.services.bigquery_client_registry import get_client_registry
+        get_client_registry().invalidate_user(user)
+
         logger.info(f"Cleared GCP tokens for user {user.email}")
         return True
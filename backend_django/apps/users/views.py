@@ -158,6 +158,10 @@ class GCPAuthCallbackView(APIView):
         # Store tokens for user
         GCPOAuthService.store_tokens_for_user(request.user, tokens)
 
+        # Pooled BigQuery clients were built with the previous credentials
+        from apps.analytics.services.bigquery_client_registry import get_client_registry
+        get_client_registry().invalidate_user(request.user)
+
         return Response({
             'success': True,
             'has_bigquery_access': request.user.has_bigquery_access(),
@@ -5,6 +5,8 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -56,6 +58,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'apps.analytics.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +66,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.analytics.middleware.QueryCancellationMiddleware',
 ]
 
 ROOT_URLCONF = 'search_analytics.urls'
@@ -138,13 +142,16 @@ REST_FRAMEWORK = {
     ],
     'EXCEPTION_HANDLER': 'apps.core.exceptions.custom_exception_handler',
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.analytics.renderers.TimedJSONRenderer',
     ],
 }
 
 # CORS Settings (will be overridden in development/production)
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = []
+# X-Request-ID identifies a request's BigQuery jobs for cancellation
+CORS_ALLOW_HEADERS = (*default_headers, 'x-request-id')
+CORS_EXPOSE_HEADERS = ['X-Request-ID', 'Server-Timing']
 
 # Caching
 CACHES = {
@@ -154,6 +161,86 @@ CACHES = {
     }
 }
 
+# BigQuery result cache (read-through at BigQueryService.execute_query)
+QUERY_CACHE_ENABLED = os.environ.get('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+# 'database' (audit.CacheEntry, shared by all workers), 'django' (CACHES) or a dotted path
+QUERY_CACHE_BACKEND = os.environ.get('QUERY_CACHE_BACKEND', 'database')
+QUERY_CACHE_MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+QUERY_CACHE_EVICTION_POLICY = os.environ.get('QUERY_CACHE_EVICTION_POLICY', 'lru')  # lru | lfu
+QUERY_CACHE_TTL_SECONDS = int(os.environ.get('QUERY_CACHE_TTL_SECONDS', '0'))  # 0 = no expiration
+QUERY_CACHE_PURGE_INTERVAL_SECONDS = int(os.environ.get('QUERY_CACHE_PURGE_INTERVAL_SECONDS', '300'))
+
+# Pooled BigQuery clients per (user, billing project)
+BIGQUERY_CLIENT_IDLE_SECONDS = int(os.environ.get('BIGQUERY_CLIENT_IDLE_SECONDS', '900'))
+BIGQUERY_HTTP_POOL_SIZE = int(os.environ.get('BIGQUERY_HTTP_POOL_SIZE', '32'))
+# Download large results through the BigQuery Storage Read API (Arrow record batches)
+BIGQUERY_USE_STORAGE_API = os.environ.get('BIGQUERY_USE_STORAGE_API', 'true').lower() == 'true'
+
+# Concurrent execution of a request's independent queries
+BIGQUERY_QUERY_WORKERS = int(os.environ.get('BIGQUERY_QUERY_WORKERS', '16'))
+ANALYTICS_REQUEST_TIMEOUT_SECONDS = int(os.environ.get('ANALYTICS_REQUEST_TIMEOUT_SECONDS', '120'))
+
+# Single-flight coalescing of identical in-flight queries (per worker + cross-worker lease)
+QUERY_COALESCING_ENABLED = os.environ.get('QUERY_COALESCING_ENABLED', 'true').lower() == 'true'
+QUERY_COALESCE_WAIT_SECONDS = int(os.environ.get('QUERY_COALESCE_WAIT_SECONDS', '300'))
+
+# Pre-flight cost control (dry-run estimates; 0 disables a limit)
+QUERY_COST_ESTIMATOR = os.environ.get('QUERY_COST_ESTIMATOR', 'dry_run')  # 'dry_run' or a dotted path
+QUERY_DRY_RUN_CACHE_SECONDS = int(os.environ.get('QUERY_DRY_RUN_CACHE_SECONDS', '3600'))
+QUERY_MAX_BYTES_PER_QUERY = int(os.environ.get('QUERY_MAX_BYTES_PER_QUERY', '0'))
+QUERY_BUDGET_WINDOW_SECONDS = int(os.environ.get('QUERY_BUDGET_WINDOW_SECONDS', str(24 * 60 * 60)))
+QUERY_BUDGET_USER_BYTES = int(os.environ.get('QUERY_BUDGET_USER_BYTES', '0'))
+QUERY_BUDGET_TABLE_BYTES = int(os.environ.get('QUERY_BUDGET_TABLE_BYTES', '0'))
+QUERY_BUDGET_ENDPOINT_BYTES = int(os.environ.get('QUERY_BUDGET_ENDPOINT_BYTES', '0'))
+
+# Query cancellation: stop a request's BigQuery jobs when its client disconnects
+# (gunicorn sync workers only; POST /api/bigquery/cancel/ works everywhere)
+QUERY_CANCEL_ON_DISCONNECT = os.environ.get('QUERY_CANCEL_ON_DISCONNECT', 'true').lower() == 'true'
+QUERY_DISCONNECT_POLL_SECONDS = float(os.environ.get('QUERY_DISCONNECT_POLL_SECONDS', '0.5'))
+# Running jobs are shared with other workers (for cancellation) in batches this often
+QUERY_JOB_PERSIST_SECONDS = float(os.environ.get('QUERY_JOB_PERSIST_SECONDS', '1'))
+
+# Write-behind audit logging: QueryLog rows are bulk-inserted off the request path
+QUERY_LOG_WRITE_BEHIND = os.environ.get('QUERY_LOG_WRITE_BEHIND', 'true').lower() == 'true'
+QUERY_LOG_BUFFER_SIZE = int(os.environ.get('QUERY_LOG_BUFFER_SIZE', '10000'))  # Records dropped beyond this
+QUERY_LOG_BATCH_SIZE = int(os.environ.get('QUERY_LOG_BATCH_SIZE', '200'))
+QUERY_LOG_FLUSH_SECONDS = float(os.environ.get('QUERY_LOG_FLUSH_SECONDS', '2'))
+
+# QueryLog monthly partitions (PostgreSQL): created ahead, dropped after retention
+QUERY_LOG_PARTITIONS_AHEAD = int(os.environ.get('QUERY_LOG_PARTITIONS_AHEAD', '3'))
+QUERY_LOG_RETENTION_MONTHS = int(os.environ.get('QUERY_LOG_RETENTION_MONTHS', '0'))  # 0 = keep all
+QUERY_LOG_PARTITION_CHECK_SECONDS = int(os.environ.get('QUERY_LOG_PARTITION_CHECK_SECONDS', '3600'))
+
+# Per-stage request timing: Server-Timing header on /api/ responses, plus a
+# rolling latency summary (last LATENCY_SUMMARY_SAMPLE_SIZE requests per
+# endpoint and stage, per worker) at /api/audit/bigquery/timings/
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+LATENCY_SUMMARY_SAMPLE_SIZE = int(os.environ.get('LATENCY_SUMMARY_SAMPLE_SIZE', '500'))
+
+# Query engines, tried in order (see apps/analytics/services/query_engines.py).
+# local_rollups answers queries on small rollups from local Parquet mirrors
+# with DuckDB (written after each refresh); bigquery answers everything.
+QUERY_ENGINES = [
+    name.strip() for name in os.environ.get('QUERY_ENGINES', 'local_rollups,bigquery').split(',') if name.strip()
+]
+LOCAL_ROLLUP_DIR = os.environ.get('LOCAL_ROLLUP_DIR', str(BASE_DIR / 'var' / 'rollups'))
+LOCAL_ROLLUP_MAX_BYTES = int(os.environ.get('LOCAL_ROLLUP_MAX_BYTES', str(256 * 1024 * 1024)))  # Larger rollups stay on BigQuery
+
+# In-process prefix-sum cubes (apps/analytics/services/rollup_cube.py) answer
+# overview KPIs and baseline totals from rollups with at most this many
+# (dimension combination x date) cells, 8 bytes per cell and metric. 0 disables.
+ROLLUP_CUBE_MAX_CELLS = int(os.environ.get('ROLLUP_CUBE_MAX_CELLS', '200000'))
+
+# Schema snapshots (apps/schemas/snapshot.py) are cached per process; writes in
+# the same process invalidate them at once, other processes recheck the
+# SchemaConfig.version this often.
+SCHEMA_SNAPSHOT_RECHECK_SECONDS = float(os.environ.get('SCHEMA_SNAPSHOT_RECHECK_SECONDS', '5'))
+
+# Rollup routing indexes (apps/analytics/services/rollup_index.py) are cached
+# per process; rollup and rollup config writes in the same process invalidate
+# them at once, other processes recheck the rollups this often.
+ROLLUP_INDEX_RECHECK_SECONDS = float(os.environ.get('ROLLUP_INDEX_RECHECK_SECONDS', '5'))
+
 # Logging
 LOGGING = {
     'version': 1,